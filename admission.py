@@ -0,0 +1,178 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from models import WarehouseData, warehouse
+
+
+# Traffic class -> (requests served at once, requests allowed to wait for a turn)
+DEFAULT_LIMITS: Dict[str, Tuple[int, int]] = {
+    "read": (16, 64),
+    "chat": (16, 32),
+    "write": (32, 256)
+}
+MAX_QUEUE_WAIT_SECONDS = 2.0
+MAX_CACHED_READS = 256
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; ``retry_after`` is the suggested wait in seconds"""
+
+    def __init__(self, traffic_class: str, retry_after: int):
+        super().__init__(f"Too many {traffic_class} requests, retry in {retry_after}s")
+        self.traffic_class = traffic_class
+        self.retry_after = retry_after
+
+
+class _Lane:
+    """Concurrency slots and a bounded wait queue for one traffic class"""
+
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(limit)
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.avg_seconds = 0.05  # moving average of time in the handler, for Retry-After
+
+    def retry_after(self) -> int:
+        # Time for the queue ahead to drain through the concurrency slots, at least a second
+        return max(1, math.ceil((self.waiting + self.running) * self.avg_seconds / self.limit))
+
+
+class AdmissionController:
+    """
+    Per-class admission control: separate lanes for reads, chat and writes.
+
+    A lane serves ``limit`` requests at once and lets at most ``max_queue`` more wait, each
+    for at most ``MAX_QUEUE_WAIT_SECONDS``. Anything beyond that is shed with ``Overloaded``
+    (429 + Retry-After) right away, so a read burst cannot queue ahead of chat or writes.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, int]], max_wait: float = MAX_QUEUE_WAIT_SECONDS):
+        self.limits = dict(limits)
+        self.max_wait = max_wait
+        self._lanes: Dict[str, _Lane] = {}
+
+    def _lane(self, traffic_class: str) -> _Lane:
+        # Semaphores bind to the running loop on first wait, so lanes are built lazily inside it
+        lane = self._lanes.get(traffic_class)
+        if lane is None:
+            lane = self._lanes[traffic_class] = _Lane(*self.limits[traffic_class])
+        return lane
+
+    @asynccontextmanager
+    async def admit(self, traffic_class: str):
+        lane = self._lane(traffic_class)
+        if lane.semaphore.locked():
+            if lane.waiting >= lane.max_queue:
+                lane.rejected += 1
+                raise Overloaded(traffic_class, lane.retry_after())
+            lane.waiting += 1
+            try:
+                await asyncio.wait_for(lane.semaphore.acquire(), self.max_wait)
+            except asyncio.TimeoutError:
+                lane.rejected += 1
+                raise Overloaded(traffic_class, lane.retry_after())
+            finally:
+                lane.waiting -= 1
+        else:
+            await lane.semaphore.acquire()
+
+        lane.running += 1
+        lane.admitted += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            lane.running -= 1
+            lane.avg_seconds += (time.perf_counter() - started - lane.avg_seconds) * 0.1
+            lane.semaphore.release()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "limit": lane.limit,
+                "max_queue": lane.max_queue,
+                "running": lane.running,
+                "waiting": lane.waiting,
+                "admitted": lane.admitted,
+                "rejected": lane.rejected,
+                "avg_ms": round(lane.avg_seconds * 1000, 2)
+            }
+            for name, lane in self._lanes.items()
+        }
+
+
+class ReadCoalescer:
+    """
+    Single-flight cache for read results, keyed by request and valid for one warehouse version.
+
+    Identical reads that arrive while one is computing await that computation instead of
+    starting their own; later reads reuse the result until any mutation bumps
+    ``warehouse.version``. Results are tagged with the version read *before* computing, so a
+    write that lands mid-computation makes the result stale rather than wrongly fresh.
+    """
+
+    def __init__(self, warehouse: WarehouseData, max_entries: int = MAX_CACHED_READS):
+        self.warehouse = warehouse
+        self.max_entries = max_entries
+        self._results: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Tuple[int, asyncio.Future]] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.computed = 0
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[Any]],
+                  cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        version = self.warehouse.version
+        cached = self._results.get(key)
+        if cached is not None and cached[0] == version:
+            self._results.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] == version:
+            self.coalesced += 1
+            # Shielded so one cancelled waiter does not cancel the shared computation
+            return await asyncio.shield(inflight[1])
+
+        # A task of its own, so a disconnecting first caller does not cancel it for the others
+        task = asyncio.ensure_future(self._compute(key, version, compute, cacheable))
+        self._inflight[key] = (version, task)
+        self.computed += 1
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: Hashable, version: int, compute: Callable[[], Awaitable[Any]],
+                       cacheable: Optional[Callable[[Any], bool]]) -> Any:
+        try:
+            result = await compute()
+            if cacheable is None or cacheable(result):
+                self._results[key] = (version, result)
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+            return result
+        finally:
+            if self._inflight.get(key, (None, None))[1] is asyncio.current_task():
+                del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._results),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "computed": self.computed
+        }
+
+
+# Global admission controller and read coalescer
+admission = AdmissionController(DEFAULT_LIMITS)
+read_cache = ReadCoalescer(warehouse)
@@ -1,32 +1,57 @@
 import re
 import json
+import asyncio
 from typing import Dict, Any, List, Optional
-from tools import AVAILABLE_TOOLS, execute_tool
+from tools import AVAILABLE_TOOLS, execute_tool, execute_tool_async, openai_tool_schemas, tool_is_read_only
 from models import warehouse
-import openai
+from sessions import Session, sessions
 import os
 from dotenv import load_dotenv
 import string
 
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+_client = None
+
+
+def get_client():
+    """OpenAI client, built on first use so importing the agent stays cheap"""
+    global _client
+    if _client is None:
+        import openai  # heavy import, deferred until the first LLM call
+        load_dotenv()
+        _client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
+# "router": regex intents with an LLM reply; "function_calling": the router answers on its own
+# when it is confident, otherwise one LLM call picks and parameterizes the read-only tools
+# (changes only ever come from an explicit command the router matched)
+AGENT_MODE = os.getenv("OPTISLOT_AGENT_MODE", "router")
+CHAT_MODEL = "gpt-3.5-turbo"
+MAX_TOOL_CALLS = 8
+
+SYSTEM_PROMPT = "You are a helpful warehouse management assistant. If the user asks about warehouse slotting, inventory, or assignments, respond with clear, concise, and actionable information. If the user asks for a specific action (like assigning an item to a slot), respond with a short confirmation and the action taken."
+TOOL_SYSTEM_PROMPT = "You are a warehouse slotting assistant. Use the provided tools to answer; call several tools at once when the request needs them. The tools only read: to assign or move an item, tell the user the exact command to send, such as: assign ITEM_001 to A-01-01-01. Use item IDs (ITEM_001) and slot IDs (A-01-01-01). If the request is not about warehouse slotting, inventory or assignments, reply only: Sorry, I can only answer questions related to Slotting Inventory Management"
+
+# Follow-up references resolved from the session's last item and slot
+ITEM_REFERENCES = {"it", "that", "this", "that item", "this item", "the same item", "them"}
+SLOT_REFERENCES = {"THERE", "THAT SLOT", "THE SAME SLOT"}
 
 
 class WarehouseAgent:
     def __init__(self):
         self.tools = AVAILABLE_TOOLS
-        self.conversation_history = []
     
-    def openai_chat(self, user_message: str) -> str:
+    def openai_chat(self, user_message: str, context: Optional[str] = None) -> str:
         """Call OpenAI Chat API for a response (v1.x syntax)"""
         try:
             messages = [
-                {"role": "system", "content": "You are a helpful warehouse management assistant. If the user asks about warehouse slotting, inventory, or assignments, respond with clear, concise, and actionable information. If the user asks for a specific action (like assigning an item to a slot), respond with a short confirmation and the action taken."},
-                {"role": "user", "content": user_message}
+                {"role": "system", "content": SYSTEM_PROMPT}
             ]
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            if context:
+                # Bounded session summary instead of the full history, so prompts stay the same size
+                messages.append({"role": "system", "content": f"Conversation context:\n{context}"})
+            messages.append({"role": "user", "content": user_message})
+            response = get_client().chat.completions.create(
+                model=CHAT_MODEL,
                 messages=messages,
                 max_tokens=200,
                 temperature=0.2
@@ -35,13 +60,121 @@ class WarehouseAgent:
         except Exception as e:
             return f"[OpenAI API error: {str(e)}]"
 
-    def process_message(self, user_message: str) -> dict:
+    def process_message(self, user_message: str, session: Optional[Session] = None) -> dict:
         """
         Use OpenAI for all chat. If the message matches a warehouse action, execute it and append the result to the OpenAI response.
+        
+        With a session, "it"/"there" resolve to the last item and slot the session referred to.
         """
         user_message = user_message.strip()
         # First, try to match a warehouse action
-        intent_result = self._analyze_intent(user_message.lower())
+        intent_result = self._analyze_intent(user_message.lower(), session)
+        result = self._respond(user_message, intent_result, session)
+        self._remember(session, user_message, intent_result["parameters"], result)
+        return result
+    
+    async def process_message_async(self, user_message: str, session: Optional[Session] = None) -> dict:
+        """
+        Chat entry point for the API. In function-calling mode a confident router match is answered
+        without any LLM call; anything else takes a single LLM round trip that chooses the tools.
+        """
+        if AGENT_MODE != "function_calling":
+            # Tools and the narrating LLM call block (mutators wait for the journal's fsync)
+            return await asyncio.to_thread(self.process_message, user_message, session)
+        
+        user_message = user_message.strip()
+        intent_result = self._analyze_intent(user_message.lower(), session)
+        if self._is_confident(intent_result):
+            result = await asyncio.to_thread(self._respond, user_message, intent_result, session, False)
+            parameters = intent_result["parameters"]
+        else:
+            result, parameters = await self._plan_with_tools(user_message, session)
+        self._remember(session, user_message, parameters, result)
+        return result
+    
+    def _is_confident(self, intent_result: Dict[str, Any]) -> bool:
+        """A router match is trusted only if every parameter it extracted was resolved"""
+        if not intent_result["action"]:
+            return False
+        return all(value is not None for key, value in intent_result["parameters"].items()
+                   if key != "item_description")
+    
+    async def _plan_with_tools(self, user_message: str, session: Optional[Session]) -> tuple:
+        """One LLM call with the read-only tool schemas; the tool calls it returns run concurrently"""
+        messages = [{"role": "system", "content": TOOL_SYSTEM_PROMPT}]
+        if session is not None:
+            context = session.context_summary()
+            if context:
+                messages.append({"role": "system", "content": f"Conversation context:\n{context}"})
+        messages.append({"role": "user", "content": user_message})
+        try:
+            completion = await asyncio.to_thread(
+                get_client().chat.completions.create,
+                model=CHAT_MODEL,
+                messages=messages,
+                tools=openai_tool_schemas(read_only=True),
+                tool_choice="auto",
+                max_tokens=300,
+                temperature=0
+            )
+        except Exception as e:
+            return {"response": f"[OpenAI API error: {str(e)}]", "success": False, "tool_used": None,
+                    "tool_result": None, "llm_calls": 1}, {}
+        
+        message = completion.choices[0].message
+        tool_calls = (message.tool_calls or [])[:MAX_TOOL_CALLS]
+        if not tool_calls:
+            return {"response": (message.content or "").strip(), "success": True, "tool_used": None,
+                    "tool_result": None, "llm_calls": 1}, {}
+        
+        calls = []
+        for tool_call in tool_calls:
+            try:
+                arguments = json.loads(tool_call.function.arguments or "{}")
+            except json.JSONDecodeError:
+                arguments = None
+            calls.append((tool_call.function.name, arguments))
+        results = await asyncio.gather(*(self._call_tool(name, arguments) for name, arguments in calls))
+        
+        lines = [message.content.strip()] if message.content else []
+        for result in results:
+            lines.append(self._format_success_response(result) if result["success"] else result["message"])
+        last_name, last_arguments = calls[-1]
+        return {
+            "response": "\n\n".join(lines),
+            "success": all(result["success"] for result in results),
+            "tool_used": last_name,
+            "tool_result": results[-1],
+            "tool_calls": [{"tool": name, "arguments": arguments, "success": result["success"]}
+                           for (name, arguments), result in zip(calls, results)],
+            "llm_calls": 1
+        }, last_arguments or {}
+    
+    async def _call_tool(self, name: str, arguments: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if name not in AVAILABLE_TOOLS:
+            return {"success": False, "message": f"Tool '{name}' not found", "action": "unknown"}
+        if not tool_is_read_only(AVAILABLE_TOOLS[name]):
+            # The model never gets mutating schemas; a hallucinated call still must not change anything
+            return {"success": False, "action": name,
+                    "message": f"'{name}' changes the warehouse, so it only runs on an explicit command "
+                               "(e.g. 'assign ITEM_001 to A-01-01-01')"}
+        if not isinstance(arguments, dict):
+            return {"success": False, "message": f"Invalid arguments for tool '{name}'", "action": name}
+        try:
+            return await execute_tool_async(name, **arguments)
+        except TypeError as e:
+            return {"success": False, "message": f"Invalid arguments for tool '{name}': {e}", "action": name}
+    
+    def _remember(self, session: Optional[Session], user_message: str, parameters: Dict[str, Any], result: dict) -> None:
+        """Record the turn and what it referred to on the session"""
+        if session is None:
+            return
+        item_id, slot_id = self._references(parameters, result["tool_result"])
+        sessions.record_turn(session, user_message, result["response"], item_id=item_id, slot_id=slot_id)
+    
+    def _respond(self, user_message: str, intent_result: Dict[str, Any], session: Optional[Session],
+                 narrate: bool = True) -> dict:
+        """Run the matched tool and build the chat response; ``narrate`` adds an LLM reply to actions"""
         tool_result = None
         action_response = ""
         # GUARDRAIL: If not a warehouse action, block with red error bubble
@@ -51,7 +184,8 @@ class WarehouseAgent:
                 "success": False,
                 "error": True,
                 "tool_used": None,
-                "tool_result": None
+                "tool_result": None,
+                "llm_calls": 0
             }
         if intent_result["action"]:
             filtered_params = {}
@@ -62,6 +196,14 @@ class WarehouseAgent:
                     filtered_params["item_id"] = intent_result["parameters"]["item_id"]
             else:
                 filtered_params = intent_result["parameters"]
+            if intent_result["action"] == "change_slot_assignment" and not filtered_params.get("slot_id"):
+                return {
+                    "response": "Which slot do you mean? Please give a slot ID like A-01-01-02.",
+                    "success": False,
+                    "tool_used": intent_result["action"],
+                    "tool_result": None,
+                    "llm_calls": 0
+                }
             tool_result = execute_tool(intent_result["action"], **filtered_params)
             if tool_result["success"]:
                 action_response = self._format_success_response(tool_result)
@@ -71,31 +213,42 @@ class WarehouseAgent:
                     "response": tool_result["message"],
                     "success": False,
                     "tool_used": intent_result["action"],
-                    "tool_result": tool_result
+                    "tool_result": tool_result,
+                    "llm_calls": 0
                 }
-        # Call OpenAI for a natural language response
-        openai_response = self.openai_chat(user_message)
         # Combine OpenAI response and action result if any
-        if action_response:
-            if intent_result["action"] == "get_warehouse_status":
-                # Use real occupancy rate for summary
-                occupancy = tool_result["summary"]["overall_occupancy_rate"]
-                summary = f"The warehouse currently has {occupancy:.1f}% capacity utilization."
-                response = f"{summary}\n\n{action_response}"
-            elif intent_result["action"] == "find_available_slots":
-                response = action_response
-            else:
-                response = f"{openai_response}\n\n{action_response}"
+        llm_calls = 0
+        if intent_result["action"] == "get_warehouse_status":
+            # Use real occupancy rate for summary
+            occupancy = tool_result["summary"]["overall_occupancy_rate"]
+            summary = f"The warehouse currently has {occupancy:.1f}% capacity utilization."
+            response = f"{summary}\n\n{action_response}"
+        elif intent_result["action"] == "find_available_slots" or not narrate:
+            # The tool output is the whole answer; no LLM call needed
+            response = action_response
         else:
-            response = openai_response
+            # Call OpenAI for a natural language response
+            openai_response = self.openai_chat(user_message, session.context_summary() if session else None)
+            llm_calls = 1
+            response = f"{openai_response}\n\n{action_response}"
         return {
             "response": response,
             "success": tool_result["success"] if tool_result else True,
             "tool_used": intent_result["action"],
-            "tool_result": tool_result
+            "tool_result": tool_result,
+            "llm_calls": llm_calls
         }
     
-    def _analyze_intent(self, message: str) -> Dict[str, Any]:
+    def _references(self, parameters: Dict[str, Any], tool_result: Optional[Dict[str, Any]]) -> tuple:
+        """Item and slot a turn referred to, for resolving "it" and "there" in the next turn"""
+        item_id = parameters.get("item_id")
+        slot_id = parameters.get("slot_id")
+        if tool_result and tool_result.get("success") and tool_result.get("action") == "find_slots" and tool_result["slots"]:
+            # "put it there" after a search means the best suggestion
+            slot_id = tool_result["slots"][0]["slot_id"]
+        return item_id, slot_id
+    
+    def _analyze_intent(self, message: str, session: Optional[Session] = None) -> Dict[str, Any]:
         """
         Analyze user message to determine intent and extract parameters
         """
@@ -111,7 +264,8 @@ class WarehouseAgent:
                     r"put\s+(.+?)\s+in\s+slot\s+([a-z]-\d+-\d+-\d+)",
                     r"put\s+(.+?)\s+in\s+([a-z]-\d+-\d+-\d+)",  # Without "slot"
                     r"move\s+(.+?)\s+to\s+slot\s+([a-z]-\d+-\d+-\d+)",
-                    r"move\s+(.+?)\s+to\s+([a-z]-\d+-\d+-\d+)"  # Without "slot"
+                    r"move\s+(.+?)\s+to\s+([a-z]-\d+-\d+-\d+)",  # Without "slot"
+                    r"(?:assign|put|move)\s+(.+?)(?:\s+(?:to|in|into))?\s+(there|that\s+slot|the\s+same\s+slot)"  # Follow-up
                 ],
                 "action": "change_slot_assignment",
                 "extractor": self._extract_assignment_params
@@ -126,7 +280,7 @@ class WarehouseAgent:
                     r"how\s+full\s+is\s+the\s+warehouse"
                 ],
                 "action": "get_warehouse_status",
-                "extractor": lambda m: {}
+                "extractor": lambda m, session: {}
             },
             # Find slots patterns
             {
@@ -148,7 +302,7 @@ class WarehouseAgent:
             for pattern in pattern_group["patterns"]:
                 match = re.search(pattern, message)
                 if match:
-                    parameters = pattern_group["extractor"](match)
+                    parameters = pattern_group["extractor"](match, session)
                     return {
                         "action": pattern_group["action"],
                         "parameters": parameters,
@@ -157,13 +311,15 @@ class WarehouseAgent:
         
         return {"action": None, "parameters": {}, "matched_pattern": None}
     
-    def _extract_assignment_params(self, match) -> Dict[str, Any]:
+    def _extract_assignment_params(self, match, session: Optional[Session] = None) -> Dict[str, Any]:
         """Extract parameters for slot assignment"""
         item_description = match.group(1).strip()
         slot_id = match.group(2).upper()
+        if " ".join(slot_id.split()) in SLOT_REFERENCES:
+            slot_id = session.last_slot_id if session else None
         
         # Try to find item by name or ID
-        item_id = self._find_item_by_description(item_description)
+        item_id = self._resolve_item(item_description, session)
         
         return {
             "slot_id": slot_id,
@@ -171,7 +327,7 @@ class WarehouseAgent:
             "item_description": item_description
         }
     
-    def _extract_find_slots_params(self, match) -> Dict[str, Any]:
+    def _extract_find_slots_params(self, match, session: Optional[Session] = None) -> Dict[str, Any]:
         """Extract parameters for finding slots"""
         params = {}
 
@@ -184,13 +340,17 @@ class WarehouseAgent:
             if len(text) == 1 and text.upper() in ['A', 'B', 'C']:
                 params["zone"] = text.upper()
             else:
-                # Try to find item
-                item_id = self._find_item_by_description(text)
-                if item_id:
-                    params["item_id"] = item_id
+                # Try to find item; an unresolved item stays None so the match is not trusted blindly
+                params["item_id"] = self._resolve_item(text, session)
 
         return params
     
+    def _resolve_item(self, description: str, session: Optional[Session] = None) -> Optional[str]:
+        """Resolve an item description, using the session's last item for pronouns"""
+        if description.lower().strip() in ITEM_REFERENCES:
+            return session.last_item_id if session else None
+        return self._find_item_by_description(description)
+    
     def _find_item_by_description(self, description: str) -> Optional[str]:
         """Find item ID by description (name or ID), with hardcoded mapping for monitor and laptop."""
         description = description.lower().strip()
@@ -253,7 +413,8 @@ class WarehouseAgent:
             return f"✅ {tool_result['message']}"
         
         elif tool_result["action"] == "find_slots":
-            if tool_result["total_slots"] == 0:
+            total = tool_result["total_slots"]  # None unless the call asked for include_total
+            if not tool_result["slots"]:
                 return "❌ No available slots found matching your criteria."
             
             # Get item name if available
@@ -265,12 +426,15 @@ class WarehouseAgent:
                 if item:
                     item_name = f" for {item.name}"
 
-            slots_text = f"Found {tool_result['total_slots']} available slots{item_name} in Zone A:\n\n"
+            found = total if total is not None else f"at least {tool_result['offset'] + len(tool_result['slots'])}"
+            slots_text = f"Found {found} available slots{item_name} in Zone A:\n\n"
             for slot in tool_result["slots"][:10]:  # Show first 10
                 slots_text += f"📦 {slot['slot_id']} - Zone {slot['zone']}, {slot['slot_type'].replace('_', ' ').title()}\n"
             
-            if tool_result["total_slots"] > 10:
-                slots_text += f"\n... and {tool_result['total_slots'] - 10} more slots"
+            if total is not None and total > 10:
+                slots_text += f"\n... and {total - 10} more slots"
+            elif total is None and len(tool_result["slots"]) > 10:
+                slots_text += "\n... and more slots"
                 
             return slots_text
         
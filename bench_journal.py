@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Assignment throughput with the journal enabled.
+
+Each writer thread moves its own item back and forth between two empty slots for a fixed
+time. Runs compare no journal, the journal without fsync, one writer per fsync (group commit
+has nothing to group), many writers sharing fsyncs (group commit), and batches of moves
+under one wait (``defer_durability``). Usage: python bench_journal.py [--seconds 2] [--threads 16]
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+
+from journal import AssignmentJournal
+from models import Item, SlotStatus, WarehouseData
+
+BATCH_SIZE = 32
+
+
+def _warehouse(threads: int) -> WarehouseData:
+    warehouse = WarehouseData()
+    for index in range(threads):
+        warehouse.add_item(Item(item_id=f"BENCH_{index:03d}", name=f"Bench item {index}", category="Bench",
+                                weight=1.0, dimensions={"length": 10, "width": 10, "height": 10}))
+    return warehouse
+
+
+def _worker(warehouse: WarehouseData, item_id: str, slot_ids, deadline: float, batch: int, counts, index: int) -> None:
+    moves = 0
+    while time.perf_counter() < deadline:
+        with warehouse.defer_durability():
+            for _ in range(batch):
+                warehouse.assign_item_to_slot(slot_ids[moves % 2], item_id)
+                moves += 1
+        warehouse.wait_durable()
+    counts[index] = moves
+
+
+def run(label: str, threads: int, seconds: float, journal: bool, fsync: bool = True, batch: int = 1) -> float:
+    warehouse = _warehouse(threads)
+    empty = [slot.slot_id for slot in warehouse.slots.values()
+             if slot.status == SlotStatus.EMPTY and slot.zone == "A"]
+    with tempfile.TemporaryDirectory() as directory:
+        assignment_journal = None
+        if journal:
+            assignment_journal = AssignmentJournal(directory, fsync=fsync)
+            assignment_journal.attach(warehouse)
+        counts = [0] * threads
+        deadline = time.perf_counter() + seconds
+        workers = [
+            threading.Thread(target=_worker, args=(warehouse, f"BENCH_{index:03d}", empty[2 * index:2 * index + 2],
+                                                   deadline, batch, counts, index))
+            for index in range(threads)
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        stats = assignment_journal.stats() if assignment_journal is not None else None
+        if assignment_journal is not None:
+            assignment_journal.close()
+
+    rate = sum(counts) / elapsed
+    grouping = f"{stats['records_written'] / max(stats['flushes'], 1):6.1f} records/fsync" if stats else ""
+    print(f"{label:<44} {threads:>3} threads  {rate:>10,.0f} assignments/s  {grouping}")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+    threads = min(args.threads, 28)  # two empty zone A slots per writer
+
+    run("in memory (no journal)", threads, args.seconds, journal=False)
+    run("journal, fsync off", threads, args.seconds, journal=True, fsync=False)
+    run("journal, fsync, one writer", 1, args.seconds, journal=True)
+    run("journal, fsync, group commit", threads, args.seconds, journal=True)
+    run(f"journal, fsync, group commit, batches of {BATCH_SIZE}", threads, args.seconds, journal=True, batch=BATCH_SIZE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import math
+from typing import Dict, Iterator, Set, Tuple
+
+
+class CapacityIndex:
+    """
+    Two-dimensional bucket index over free slot capacity.
+
+    Slots are filed under (log2 free volume, log2 free weight). A query for at least
+    X cm3 and Y kg only visits buckets at or above the query's own bucket; every bucket
+    strictly above it in both dimensions matches without checking individual slots. Each
+    bucket also keeps the largest free capacity ever filed in it (an upper bound, never
+    lowered until the bucket empties), so buckets that cannot match are skipped whole.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[int, int], Dict[str, Tuple[float, float]]] = {}
+        self._bucket_max: Dict[Tuple[int, int], Tuple[float, float]] = {}
+        self._slot_bucket: Dict[str, Tuple[int, int]] = {}
+
+    @staticmethod
+    def _bucket(value: float) -> int:
+        if value < 1.0:
+            return -1 if value > 0 else -2
+        return int(math.log2(value))
+
+    def update(self, slot_id: str, free_volume: float, free_weight: float) -> None:
+        """(Re)file a slot under its current free capacity"""
+        key = (self._bucket(free_volume), self._bucket(free_weight))
+        old_key = self._slot_bucket.get(slot_id)
+        if old_key is not None and old_key != key:
+            self._unfile(slot_id, old_key)
+        self._buckets.setdefault(key, {})[slot_id] = (free_volume, free_weight)
+        max_volume, max_weight = self._bucket_max.get(key, (free_volume, free_weight))
+        self._bucket_max[key] = (max(max_volume, free_volume), max(max_weight, free_weight))
+        self._slot_bucket[slot_id] = key
+
+    def remove(self, slot_id: str) -> None:
+        key = self._slot_bucket.pop(slot_id, None)
+        if key is not None:
+            self._unfile(slot_id, key)
+
+    def _unfile(self, slot_id: str, key: Tuple[int, int]) -> None:
+        bucket = self._buckets[key]
+        del bucket[slot_id]
+        if not bucket:
+            del self._buckets[key]
+            del self._bucket_max[key]
+
+    def _candidate_buckets(self, min_volume: float, min_weight: float
+                           ) -> Iterator[Tuple[Tuple[int, int], Dict[str, Tuple[float, float]]]]:
+        """(bucket key, bucket) pairs that may hold a match"""
+        volume_floor = self._bucket(min_volume)
+        weight_floor = self._bucket(min_weight)
+        bucket_max = self._bucket_max
+        for key, bucket in list(self._buckets.items()):
+            if key[0] < volume_floor or key[1] < weight_floor:
+                continue
+            max_volume, max_weight = bucket_max.get(key, (math.inf, math.inf))
+            if max_volume >= min_volume and max_weight >= min_weight:
+                yield key, bucket
+
+    def query(self, min_volume: float = 0.0, min_weight: float = 0.0) -> Iterator[str]:
+        """Yield slot IDs with at least ``min_volume`` free volume and ``min_weight`` free weight"""
+        volume_floor = self._bucket(min_volume)
+        weight_floor = self._bucket(min_weight)
+        for (volume_bucket, weight_bucket), bucket in self._candidate_buckets(min_volume, min_weight):
+            if volume_bucket > volume_floor and weight_bucket > weight_floor:
+                yield from list(bucket)
+                continue
+            for slot_id, (free_volume, free_weight) in list(bucket.items()):
+                if free_volume >= min_volume and free_weight >= min_weight:
+                    yield slot_id
+
+    def estimate(self, min_volume: float = 0.0, min_weight: float = 0.0) -> int:
+        """Upper bound on ``query``'s result size, from bucket sizes alone"""
+        return sum(len(bucket) for _, bucket in self._candidate_buckets(min_volume, min_weight))
+
+    def slot_ids(self) -> Set[str]:
+        return set(self._slot_bucket)
+
+    def __len__(self) -> int:
+        return len(self._slot_bucket)
@@ -0,0 +1,462 @@
+import csv
+import gzip
+import io
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from models import SlotStatus, WarehouseData, warehouse
+from serialization import dumps_json
+
+try:
+    import numpy
+except ImportError:  # optional: vectorized utilization aggregates
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional: Parquet exports
+    pyarrow = None
+
+
+# Dataset -> (column, type) in output order; types name the Parquet column types
+DATASETS: Dict[str, List[Tuple[str, str]]] = {
+    "slots": [
+        ("slot_id", "string"), ("zone", "string"), ("aisle", "string"), ("level", "int64"),
+        ("position", "int64"), ("slot_type", "string"), ("status", "string"),
+        ("assigned_item_id", "string"), ("units", "int64"), ("skus", "int64"),
+        ("max_weight", "float64"), ("used_weight", "float64"), ("weight_fill_pct", "float64"),
+        ("volume", "float64"), ("used_volume", "float64"), ("volume_fill_pct", "float64")
+    ],
+    "items": [
+        ("item_id", "string"), ("name", "string"), ("category", "string"), ("weight", "float64"),
+        ("length", "float64"), ("width", "float64"), ("height", "float64"), ("volume", "float64"),
+        ("temperature_requirement", "string"), ("is_hazardous", "bool_"), ("slots", "int64"), ("units", "int64")
+    ],
+    "assignments": [
+        ("slot_id", "string"), ("zone", "string"), ("aisle", "string"), ("item_id", "string"),
+        ("quantity", "int64"), ("assigned_date", "string"), ("weight", "float64"), ("volume", "float64")
+    ],
+    "utilization": [
+        ("grouping", "string"), ("key", "string"), ("slots", "int64"), ("occupied", "int64"),
+        ("reserved", "int64"), ("max_weight", "float64"), ("used_weight", "float64"),
+        ("weight_fill_pct", "float64"), ("volume", "float64"), ("used_volume", "float64"),
+        ("volume_fill_pct", "float64")
+    ]
+}
+FORMATS = ("csv", "jsonl", "parquet")
+STREAM_FORMATS = ("csv", "jsonl")  # Parquet needs a seekable file, so it is only built by jobs
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet"
+}
+GROUPINGS = ("all", "zone", "aisle", "slot_type")
+# Rows read per lock acquisition: bounds both the pause a writer can see and the memory held
+CHUNK_ROWS = 2000
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+MAX_KEPT_JOBS = 50
+
+# Column positions in slot rows, used by the utilization pass
+_SLOT_COLUMNS = [name for name, _ in DATASETS["slots"]]
+_ZONE, _AISLE, _TYPE, _STATUS = (_SLOT_COLUMNS.index(name) for name in ("zone", "aisle", "slot_type", "status"))
+_MAX_WEIGHT, _USED_WEIGHT, _VOLUME, _USED_VOLUME = (
+    _SLOT_COLUMNS.index(name) for name in ("max_weight", "used_weight", "volume", "used_volume"))
+
+
+def _pct(used: float, total: float) -> float:
+    return round(used * 100.0 / total, 2) if total else 0.0
+
+
+def _slot_row(slot) -> Tuple:
+    used_weight = round(slot.max_weight - slot.remaining_weight, 6)
+    volume = slot.volume
+    used_volume = round(volume - slot.remaining_volume, 6)
+    return (slot.slot_id, slot.zone, slot.aisle, slot.level, slot.position, slot.slot_type.value,
+            slot.status.value, slot.assigned_item_id, sum(slot.contents.values()), len(slot.contents),
+            slot.max_weight, used_weight, _pct(used_weight, slot.max_weight),
+            volume, used_volume, _pct(used_volume, volume))
+
+
+def _slot_chunks(warehouse: WarehouseData) -> Iterator[List[Tuple]]:
+    """Slot rows shard by shard; each chunk is read under its shard lock, released before yielding"""
+    for shard in warehouse.ordered_shards():
+        slot_ids = list(shard.slots)
+        for start in range(0, len(slot_ids), CHUNK_ROWS):
+            with shard.lock:
+                rows = [_slot_row(shard.slots[slot_id]) for slot_id in slot_ids[start:start + CHUNK_ROWS]]
+            yield rows
+
+
+def _item_chunks(warehouse: WarehouseData) -> Iterator[List[Tuple]]:
+    """Item rows; locations span zones, so each chunk is read under every shard lock, released before yielding"""
+    item_ids = list(warehouse.items)
+    shards = warehouse.ordered_shards()
+    for start in range(0, len(item_ids), CHUNK_ROWS):
+        rows = []
+        with warehouse.locked():
+            for item_id in item_ids[start:start + CHUNK_ROWS]:
+                item = warehouse.items.get(item_id)
+                if item is None:
+                    continue
+                held_in = units = 0
+                for shard in shards:
+                    for slot_id in shard.item_slots.get(item_id, ()):
+                        held_in += 1
+                        units += shard.slots[slot_id].contents.get(item_id, 0)
+                dimensions = item.dimensions
+                rows.append((item.item_id, item.name, item.category, item.weight, dimensions["length"],
+                             dimensions["width"], dimensions["height"], item.volume, item.temperature_requirement,
+                             item.is_hazardous, held_in, units))
+        yield rows
+
+
+def _assignment_chunks(warehouse: WarehouseData) -> Iterator[List[Tuple]]:
+    """One row per SKU stocked in a slot, chunked by slots read under the shard lock"""
+    for shard in warehouse.ordered_shards():
+        slot_ids = list(shard.slots)
+        for start in range(0, len(slot_ids), CHUNK_ROWS):
+            rows = []
+            with shard.lock:
+                for slot_id in slot_ids[start:start + CHUNK_ROWS]:
+                    slot = shard.slots[slot_id]
+                    for item_id, quantity in slot.contents.items():
+                        item = warehouse.items.get(item_id)
+                        assignment = shard.assignments.get(f"{slot_id}_{item_id}")
+                        rows.append((slot_id, slot.zone, slot.aisle, item_id, quantity,
+                                     assignment.assigned_date if assignment else None,
+                                     round(item.weight * quantity, 6) if item else None,
+                                     round(item.volume * quantity, 6) if item else None))
+            if rows:
+                yield rows
+
+
+class UtilizationAccumulator:
+    """
+    Weight and volume fill per zone, aisle and slot type, built from slot rows in one pass.
+
+    Each chunk is turned into columns and every grouping is summed at once: with numpy one
+    ``bincount`` per metric over the chunk's group codes, otherwise a single loop over the
+    rows. Memory is one row of sums per group, however many slots there are.
+    """
+
+    METRICS = ("slots", "occupied", "reserved", "max_weight", "used_weight", "volume", "used_volume")
+
+    def __init__(self):
+        self.codes: Dict[str, Dict[str, int]] = {grouping: {} for grouping in GROUPINGS}  # key -> group index
+        self.sums: Dict[str, List[List[float]]] = {grouping: [] for grouping in GROUPINGS}
+
+    def add(self, rows: List[Tuple]) -> None:
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        statuses = columns[_STATUS]
+        values = [
+            [1.0] * len(rows),
+            [1.0 if status == SlotStatus.OCCUPIED.value else 0.0 for status in statuses],
+            [1.0 if status == SlotStatus.RESERVED.value else 0.0 for status in statuses],
+            columns[_MAX_WEIGHT], columns[_USED_WEIGHT], columns[_VOLUME], columns[_USED_VOLUME]
+        ]
+        for grouping in GROUPINGS:
+            codes = self._encode(grouping, self._keys(grouping, columns))
+            sums = self.sums[grouping]
+            if numpy is not None:
+                code_array = numpy.asarray(codes)
+                totals = numpy.stack([numpy.bincount(code_array, weights=numpy.asarray(column, dtype=float),
+                                                     minlength=len(sums)) for column in values])
+                for code, group_totals in enumerate(totals.T.tolist()):
+                    row = sums[code]
+                    for metric, value in enumerate(group_totals):
+                        row[metric] += value
+            else:
+                for code, *row_values in zip(codes, *values):
+                    row = sums[code]
+                    for metric, value in enumerate(row_values):
+                        row[metric] += value
+
+    @staticmethod
+    def _keys(grouping: str, columns: List[Tuple]) -> List[str]:
+        if grouping == "all":
+            return ["all"] * len(columns[0])
+        if grouping == "aisle":
+            # Aisle numbers repeat across zones
+            return [f"{zone}-{aisle}" for zone, aisle in zip(columns[_ZONE], columns[_AISLE])]
+        return list(columns[_ZONE if grouping == "zone" else _TYPE])
+
+    def _encode(self, grouping: str, keys: List[str]) -> List[int]:
+        known = self.codes[grouping]
+        codes = []
+        for key in keys:
+            code = known.get(key)
+            if code is None:
+                code = known[key] = len(known)
+                self.sums[grouping].append([0.0] * len(self.METRICS))
+            codes.append(code)
+        return codes
+
+    def rows(self) -> List[Tuple]:
+        """Rows of the ``utilization`` dataset, groupings in order and keys sorted"""
+        rows = []
+        for grouping in GROUPINGS:
+            sums = self.sums[grouping]
+            for key, code in sorted(self.codes[grouping].items()):
+                slots, occupied, reserved, max_weight, used_weight, volume, used_volume = sums[code]
+                rows.append((grouping, key, int(slots), int(occupied), int(reserved),
+                             round(max_weight, 3), round(used_weight, 3), _pct(used_weight, max_weight),
+                             round(volume, 3), round(used_volume, 3), _pct(used_volume, volume)))
+        return rows
+
+    def report(self) -> Dict[str, List[Dict[str, Any]]]:
+        """The aggregates as JSON, keyed by grouping"""
+        columns = [name for name, _ in DATASETS["utilization"]][1:]
+        report: Dict[str, List[Dict[str, Any]]] = {grouping: [] for grouping in GROUPINGS}
+        for row in self.rows():
+            report[row[0]].append(dict(zip(columns, row[1:])))
+        return report
+
+
+def iter_rows(warehouse: WarehouseData, dataset: str,
+              utilization: Optional[UtilizationAccumulator] = None) -> Iterator[List[Tuple]]:
+    """
+    Chunks of rows for a dataset; raises ValueError for unknown datasets.
+
+    Slot chunks are also fed to ``utilization`` when given, so a slot export yields the
+    aggregates from the same pass.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset '{dataset}'; known: {', '.join(DATASETS)}")
+    if dataset == "items":
+        yield from _item_chunks(warehouse)
+    elif dataset == "assignments":
+        yield from _assignment_chunks(warehouse)
+    else:
+        accumulator = utilization if utilization is not None else UtilizationAccumulator()
+        for rows in _slot_chunks(warehouse):
+            accumulator.add(rows)
+            if dataset == "slots":
+                yield rows
+        if dataset == "utilization":
+            yield accumulator.rows()
+
+
+def encode_chunk(fmt: str, columns: List[str], rows: List[Tuple], header: bool = False) -> bytes:
+    """CSV or JSON Lines bytes for one chunk of rows"""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if header:
+            writer.writerow(columns)
+        writer.writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+    return b"".join(dumps_json(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def iter_encoded(warehouse: WarehouseData, dataset: str, fmt: str) -> Iterator[bytes]:
+    """Stream a dataset as CSV or JSON Lines, one encoded chunk at a time"""
+    if fmt not in STREAM_FORMATS:
+        raise ValueError(f"Format '{fmt}' cannot be streamed; use one of {', '.join(STREAM_FORMATS)}")
+    columns = [name for name, _ in DATASETS[dataset]]
+    if fmt == "csv":
+        yield encode_chunk(fmt, columns, [], header=True)
+    for rows in iter_rows(warehouse, dataset):
+        yield encode_chunk(fmt, columns, rows)
+
+
+def _expected_rows(warehouse: WarehouseData, dataset: str) -> int:
+    """Row count used for job progress (assignments are counted from the stock records)"""
+    if dataset == "items":
+        return len(warehouse.items)
+    if dataset == "assignments":
+        return sum(len(shard.assignments) for shard in warehouse.ordered_shards())
+    return len(warehouse.slots)
+
+
+def check_request(dataset: str, fmt: str) -> None:
+    """Raise ValueError for datasets and formats this build cannot export"""
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset '{dataset}'; known: {', '.join(DATASETS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'; known: {', '.join(FORMATS)}")
+    if fmt == "parquet" and pyarrow is None:
+        raise ValueError("Parquet exports need pyarrow, which is not installed")
+
+
+class ExportJobManager:
+    """
+    Runs exports in a thread pool and keeps their artifacts on disk for download.
+
+    Jobs read the live warehouse chunk by chunk (see ``CHUNK_ROWS``), so memory stays bounded
+    and writers only ever wait for one chunk. Artifacts are written to a temporary name and
+    renamed when complete; the oldest finished jobs and their files are dropped beyond
+    ``MAX_KEPT_JOBS``.
+    """
+
+    def __init__(self, directory: str = "data/exports", max_workers: int = 2):
+        self.directory = directory
+        self.max_workers = max_workers
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, warehouse: WarehouseData, dataset: str, fmt: str = "csv", compress: bool = False) -> str:
+        """Queue an export; raises ValueError for unsupported requests; returns the job ID"""
+        check_request(dataset, fmt)
+        compress = compress and fmt != "parquet"  # Parquet pages are compressed already
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="export")
+            job_id = uuid.uuid4().hex[:12]
+            filename = f"{dataset}-{job_id}.{fmt}" + (".gz" if compress else "")
+            job = {
+                "job_id": job_id,
+                "dataset": dataset,
+                "format": fmt,
+                "compressed": compress,
+                "filename": filename,
+                "path": os.path.join(self.directory, filename),
+                "status": "queued",
+                "submitted_at": time.time(),
+                "finished_at": None,
+                "rows": 0,
+                "expected_rows": _expected_rows(warehouse, dataset),
+                "result": None,
+                "error": None
+            }
+            self.jobs[job_id] = job
+            future = self._executor.submit(self._run, job, warehouse)
+            future.add_done_callback(lambda f, job=job: self._finish(job, f))
+            self._prune()
+        return job_id
+
+    def _run(self, job: Dict[str, Any], warehouse: WarehouseData) -> Dict[str, Any]:
+        job["status"] = "running"
+        os.makedirs(self.directory, exist_ok=True)
+        partial = job["path"] + ".part"
+        utilization = UtilizationAccumulator()
+        try:
+            if job["format"] == "parquet":
+                self._write_parquet(job, warehouse, partial, utilization)
+            else:
+                self._write_text(job, warehouse, partial, utilization)
+            os.replace(partial, job["path"])
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        result = {"rows": job["rows"], "bytes": os.path.getsize(job["path"])}
+        if job["dataset"] in ("slots", "utilization"):
+            result["utilization"] = utilization.report()
+        return result
+
+    def _write_text(self, job: Dict[str, Any], warehouse: WarehouseData, path: str,
+                    utilization: UtilizationAccumulator) -> None:
+        columns = [name for name, _ in DATASETS[job["dataset"]]]
+        opener = gzip.open if job["compressed"] else open
+        with opener(path, "wb") as f:
+            if job["format"] == "csv":
+                f.write(encode_chunk("csv", columns, [], header=True))
+            for rows in iter_rows(warehouse, job["dataset"], utilization):
+                f.write(encode_chunk(job["format"], columns, rows))
+                job["rows"] += len(rows)
+
+    def _write_parquet(self, job: Dict[str, Any], warehouse: WarehouseData, path: str,
+                       utilization: UtilizationAccumulator) -> None:
+        """One row group per chunk, with an explicit schema so all-null chunks keep their types"""
+        schema = pyarrow.schema([(name, getattr(pyarrow, type_name)()) for name, type_name in DATASETS[job["dataset"]]])
+        with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+            for rows in iter_rows(warehouse, job["dataset"], utilization):
+                if not rows:
+                    continue
+                arrays = [pyarrow.array(column, type=field.type) for column, field in zip(zip(*rows), schema)]
+                writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+                job["rows"] += len(rows)
+
+    def _finish(self, job: Dict[str, Any], future: Future) -> None:
+        job["finished_at"] = time.time()
+        try:
+            job["result"] = future.result()
+            job["status"] = "completed"
+        except Exception as e:
+            job["error"] = str(e)
+            job["status"] = "failed"
+
+    def _prune(self) -> None:
+        """
+        Forget the oldest finished jobs beyond MAX_KEPT_JOBS and delete their artifacts (lock held).
+
+        Downloads hold their file open (see ``open_artifact``), so a file unlinked here stays
+        readable until the download that is streaming it closes it.
+        """
+        finished = [job for job in self.jobs.values() if job["finished_at"] is not None]
+        for job in sorted(finished, key=lambda job: job["finished_at"])[:max(0, len(self.jobs) - MAX_KEPT_JOBS)]:
+            del self.jobs[job["job_id"]]
+            try:
+                os.remove(job["path"])
+            except FileNotFoundError:
+                pass
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a JSON-friendly view of a job"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        progress = min(job["rows"] / job["expected_rows"], 0.99) if job["expected_rows"] else 0.0
+        view = {
+            "job_id": job_id,
+            "dataset": job["dataset"],
+            "format": job["format"],
+            "compressed": job["compressed"],
+            "status": job["status"],
+            "rows": job["rows"],
+            "progress": 1.0 if job["status"] == "completed" else round(progress, 4),
+            "submitted_at": job["submitted_at"],
+            "finished_at": job["finished_at"],
+            "error": job["error"]
+        }
+        if job["result"] is not None:
+            view.update(job["result"])
+        return view
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [self.get(job_id) for job_id in list(self.jobs)]
+
+    def open_artifact(self, job_id: str) -> Optional[Tuple[BinaryIO, str, str, int]]:
+        """
+        Open a completed job's file for download: (file, filename, media type, size), or None if not ready.
+
+        The file is opened under the lock that pruning takes, so the caller reads it whole
+        even if the job is pruned mid-download; the caller closes it (``iter_file`` does).
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] != "completed":
+                return None
+            try:
+                handle = open(job["path"], "rb")
+            except FileNotFoundError:
+                return None
+        media_type = "application/gzip" if job["compressed"] else MEDIA_TYPES[job["format"]]
+        return handle, job["filename"], media_type, os.fstat(handle.fileno()).st_size
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def iter_file(handle: BinaryIO) -> Iterator[bytes]:
+    """Read an open artifact in chunks and close it when done (or when the download is abandoned)"""
+    with handle:
+        while True:
+            chunk = handle.read(DOWNLOAD_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+# Global export job manager; main points it at OPTISLOT_EXPORT_DIR
+export_jobs = ExportJobManager()
@@ -0,0 +1,350 @@
+import asyncio
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from models import WarehouseData
+
+
+# crc32, timestamp, quantity after the change, slot_id length, item_id length
+RECORD_HEADER = struct.Struct("<IdiHH")
+
+SEGMENT_PREFIX = "journal."
+SEGMENT_SUFFIX = ".log"
+SNAPSHOT_NAME = "snapshot.json"
+
+# Compact once the live segment grows past this many bytes
+DEFAULT_COMPACT_BYTES = 16 * 1024 * 1024
+
+
+def encode_record(slot_id: str, item_id: str, quantity: int, timestamp: float) -> bytes:
+    slot_bytes = slot_id.encode("utf-8")
+    item_bytes = item_id.encode("utf-8")
+    body = struct.pack("<diHH", timestamp, quantity, len(slot_bytes), len(item_bytes)) + slot_bytes + item_bytes
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+def iter_records(data: bytes) -> Iterator[Tuple[int, str, str, int, float]]:
+    """Yield (end offset, slot_id, item_id, quantity, timestamp); stops at the first torn or corrupt record"""
+    offset = 0
+    size = len(data)
+    while offset + RECORD_HEADER.size <= size:
+        crc, timestamp, quantity, slot_len, item_len = RECORD_HEADER.unpack_from(data, offset)
+        end = offset + RECORD_HEADER.size + slot_len + item_len
+        if end > size or zlib.crc32(data[offset + 4:end]) != crc:
+            return
+        names = data[offset + RECORD_HEADER.size:end]
+        yield end, names[:slot_len].decode("utf-8"), names[slot_len:].decode("utf-8"), quantity, timestamp
+        offset = end
+
+
+class AssignmentJournal:
+    """
+    Append-only binary journal of slot stock changes, with group commit.
+
+    Every record stores a slot's quantity of an item *after* the change (0 means unassigned),
+    so replay is idempotent. Mutators append under the warehouse lock; a single writer thread
+    writes everything queued since its last flush and fsyncs once, so concurrent writers
+    share the cost of one fsync. ``sync`` blocks until the caller's last record is durable.
+
+    Compaction rotates to a new segment, writes a snapshot of all assignments tagged with
+    that segment's generation, then deletes older segments. Recovery loads the snapshot and
+    replays segments from its generation on. The rotation is queued as a marker behind the
+    records already appended, so the warehouse locks are held only while assignments are
+    copied; the writer thread switches segments and all file I/O happens after they are released.
+    """
+
+    def __init__(self, directory: str, fsync: bool = True, compact_bytes: int = DEFAULT_COMPACT_BYTES):
+        self.directory = directory
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        self.warehouse: Optional[WarehouseData] = None
+        # Stock in zones this process did not load, carried through compaction untouched
+        self._foreign: Dict[Tuple[str, str], Tuple[int, str]] = {}
+
+        self._cond = threading.Condition()
+        self._pending: List[Union[bytes, int]] = []  # records, or the generation to rotate to
+        self._appended_seq = 0
+        self._durable_seq = 0
+        self._local = threading.local()
+        self._io_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._file = None
+        self.generation = 0
+        self.segment_bytes = 0
+        self._closed = False
+        self._compact_wanted = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._compactor: Optional[threading.Thread] = None
+
+        self.records_written = 0
+        self.flushes = 0
+        self.compactions = 0
+        self.compaction_failures = 0
+        self.last_error: Optional[str] = None
+        self.replayed = 0
+
+    # Writing
+
+    def append(self, slot_id: str, item_id: str, quantity: int, timestamp: float) -> int:
+        """Queue a record; returns its sequence number"""
+        record = encode_record(slot_id, item_id, quantity, timestamp)
+        with self._cond:
+            self._pending.append(record)
+            self._appended_seq += 1
+            seq = self._local.seq = self._appended_seq
+            self._cond.notify_all()
+        return seq
+
+    def last_seq(self) -> int:
+        """Sequence number of the last record appended by the calling thread"""
+        return getattr(self._local, "seq", 0)
+
+    def sync(self, seq: Optional[int] = None) -> None:
+        """Block until ``seq`` (default: this thread's last record) is on disk"""
+        seq = self.last_seq() if seq is None else seq
+        with self._cond:
+            while self._durable_seq < seq:
+                if self._closed:
+                    raise RuntimeError("Journal closed before the record was written")
+                self._cond.wait()
+
+    async def wait(self, seq: int) -> None:
+        """Async variant of ``sync`` for callers on the event loop"""
+        if self._durable_seq < seq:
+            await asyncio.get_running_loop().run_in_executor(None, self.sync, seq)
+
+    def flush(self) -> None:
+        """Wait until everything appended so far is durable"""
+        with self._cond:
+            seq = self._appended_seq
+        self.sync(seq)
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                seq = self._appended_seq
+
+            records = []
+            with self._io_lock:
+                for entry in batch:
+                    if isinstance(entry, int):
+                        # Everything queued before the rotation belongs to the old segment
+                        self._write_records(records)
+                        self._open_segment(entry)
+                    else:
+                        records.append(entry)
+                self._write_records(records)
+                oversized = self.segment_bytes >= self.compact_bytes
+
+            with self._cond:
+                self.records_written += sum(1 for entry in batch if not isinstance(entry, int))
+                self.flushes += 1
+                self._durable_seq = seq
+                self._cond.notify_all()
+            if oversized:
+                self._compact_wanted.set()
+
+    def _write_records(self, records: List[bytes]) -> None:
+        """Write and fsync queued records to the current segment, then clear the list (I/O lock held)"""
+        if not records:
+            return
+        data = b"".join(records)
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fdatasync(self._file.fileno())
+        self.segment_bytes += len(data)
+        records.clear()
+
+    # Segments and snapshots
+
+    def _segment_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{generation:08d}{SEGMENT_SUFFIX}")
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                generation = name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+                if generation.isdigit():
+                    segments.append((int(generation), os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def _open_segment(self, generation: int) -> None:
+        if self._file is not None:
+            self._file.close()
+        self.generation = generation
+        self._file = open(self._segment_path(generation), "ab")
+        self.segment_bytes = self._file.tell()
+        self._fsync_directory()
+
+    def _fsync_directory(self) -> None:
+        if self.fsync:
+            fd = os.open(self.directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _write_snapshot(self, generation: int, assignments: List[Tuple[str, str, int, str]]) -> None:
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"generation": generation, "created_at": time.time(), "assignments": assignments}, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._fsync_directory()
+
+    def _load_snapshot(self) -> Optional[Dict]:
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def compact(self) -> Dict[str, int]:
+        """Snapshot current assignments and drop the segments the snapshot covers"""
+        warehouse = self.warehouse
+        with self._compact_lock:
+            generation = self.generation + 1
+            with warehouse.locked():
+                # Nothing can append while every shard lock is held, so records queued before the
+                # rotation marker are exactly those the copied assignments already include
+                with self._cond:
+                    self._pending.append(generation)
+                    self._appended_seq += 1
+                    rotation_seq = self._appended_seq
+                    self._cond.notify_all()
+                assignments = [(a.slot_id, a.item_id, a.quantity, a.assigned_date)
+                               for a in warehouse.assignments.values()]
+            # The writer thread closes the old segment and opens the new one
+            self.sync(rotation_seq)
+            assignments.extend((slot_id, item_id, quantity, assigned_date)
+                               for (slot_id, item_id), (quantity, assigned_date) in self._foreign.items())
+
+            self._write_snapshot(generation, assignments)
+            removed = 0
+            for old_generation, path in self._segments():
+                if old_generation < generation:
+                    os.remove(path)
+                    removed += 1
+            self.compactions += 1
+        return {"generation": generation, "assignments": len(assignments), "segments_removed": removed}
+
+    def _compact_loop(self) -> None:
+        while True:
+            self._compact_wanted.wait()
+            self._compact_wanted.clear()
+            if self._closed:
+                return
+            try:
+                self.compact()
+            except OSError as e:
+                # Reported through stats(); the next oversized flush retries
+                self.compaction_failures += 1
+                self.last_error = f"Compaction failed: {e}"
+
+    # Recovery
+
+    def recover(self, warehouse: WarehouseData) -> int:
+        """Rebuild assignments from the snapshot and journal segments; returns records replayed"""
+        snapshot = self._load_snapshot()
+        start_generation = 0
+        replayed = 0
+        foreign = self._foreign
+        with warehouse.locked():
+            if snapshot is not None:
+                start_generation = snapshot["generation"]
+                wanted = {(slot_id, item_id): (quantity, assigned_date)
+                          for slot_id, item_id, quantity, assigned_date in snapshot["assignments"]}
+                for assignment in list(warehouse.assignments.values()):
+                    if (assignment.slot_id, assignment.item_id) not in wanted:
+                        warehouse.set_stock(assignment.slot_id, assignment.item_id, 0)
+                for (slot_id, item_id), (quantity, assigned_date) in wanted.items():
+                    if slot_id not in warehouse.slots:
+                        foreign[slot_id, item_id] = (quantity, assigned_date)
+                    elif item_id in warehouse.items:
+                        warehouse.set_stock(slot_id, item_id, quantity)
+                        warehouse.assignments[f"{slot_id}_{item_id}"].assigned_date = assigned_date
+
+            for generation, path in self._segments():
+                if generation < start_generation:
+                    continue
+                with open(path, "rb") as f:
+                    data = f.read()
+                good = 0
+                for good, slot_id, item_id, quantity, timestamp in iter_records(data):
+                    if slot_id not in warehouse.slots:
+                        # A zone served elsewhere (partial load): keep its latest stock for the snapshot
+                        if quantity:
+                            assigned_date = foreign.get((slot_id, item_id), (0, None))[1] or \
+                                datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+                            foreign[slot_id, item_id] = (quantity, assigned_date)
+                        else:
+                            foreign.pop((slot_id, item_id), None)
+                    elif item_id in warehouse.items:
+                        warehouse.set_stock(slot_id, item_id, quantity, when=timestamp)
+                    replayed += 1
+                if good < len(data):
+                    # Torn write from a crash: drop the partial tail so new records follow good ones
+                    with open(path, "r+b") as f:
+                        f.truncate(good)
+                self.generation = max(self.generation, generation)
+        self.replayed = replayed
+        return replayed
+
+    # Lifecycle
+
+    def attach(self, warehouse: WarehouseData) -> int:
+        """Recover ``warehouse`` from disk, then journal every further stock change"""
+        os.makedirs(self.directory, exist_ok=True)
+        replayed = self.recover(warehouse)
+        self.warehouse = warehouse
+        self._open_segment(self.generation)
+        self._writer = threading.Thread(target=self._write_loop, name="journal-writer", daemon=True)
+        self._writer.start()
+        warehouse.journal = self
+        # Pin the recovered state (including anything not yet journaled) in a fresh snapshot
+        self.compact()
+        self._compactor = threading.Thread(target=self._compact_loop, name="journal-compactor", daemon=True)
+        self._compactor.start()
+        return replayed
+
+    def close(self) -> None:
+        if self.warehouse is not None and self.warehouse.journal is self:
+            self.flush()
+            self.warehouse.journal = None
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._compact_wanted.set()
+        if self._writer is not None:
+            self._writer.join()
+        if self._file is not None:
+            self._file.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "segment_bytes": self.segment_bytes,
+            "records_written": self.records_written,
+            "flushes": self.flushes,
+            "pending": self._appended_seq - self._durable_seq,
+            "compactions": self.compactions,
+            "compaction_failures": self.compaction_failures,
+            "last_error": self.last_error,
+            "replayed_on_boot": self.replayed
+        }
@@ -1,20 +1,143 @@
+from startup import startup_profile
 import os
 from dotenv import load_dotenv
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Directory for the assignment journal and snapshots; empty disables persistence
+JOURNAL_DIR = os.getenv("OPTISLOT_JOURNAL_DIR", "data/journal")
+JOURNAL_FSYNC = os.getenv("OPTISLOT_JOURNAL_FSYNC", "1") != "0"
+# Declarative slotting rules (zones, slot types, levels per item attribute), hot-reloaded on change
+RULES_FILE = os.getenv("OPTISLOT_RULES_FILE", "slotting_rules.json")
+# Zones (shards) this process serves, comma-separated; empty serves every zone
+ZONES = [zone.strip() for zone in os.getenv("OPTISLOT_ZONES", "").split(",") if zone.strip()] or None
+# Per-zone warehouse snapshots to load from (and save to); sample data is used when absent
+SNAPSHOT_DIR = os.getenv("OPTISLOT_SNAPSHOT_DIR", "data/warehouse")
+# Where background export jobs write their downloadable artifacts
+EXPORT_DIR = os.getenv("OPTISLOT_EXPORT_DIR", "data/exports")
 
 from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from contextlib import asynccontextmanager
+import asyncio
 import json
+import time
 
-from agent import agent
+from admission import Overloaded, admission, read_cache
+from agent import agent, get_client
+from export import DATASETS, MEDIA_TYPES, STREAM_FORMATS, export_jobs, iter_encoded, iter_file
+from journal import AssignmentJournal
 from models import warehouse
-from tools import execute_tool
+from query import SlotQuery
+from reservations import reservations, validate_ttl
+from reslotting import reslotting_jobs
+from rules import slotting_rules
+from serialization import ListingCache, negotiate
+from sessions import sessions
+from timeseries import METRICS, RESOLUTIONS, occupancy_history
+from tools import AVAILABLE_TOOLS, execute_tool, execute_tool_async, tool_is_read_only, tool_kind, tool_runner
+from velocity import iter_pick_events
+from whatif import overlays
+startup_profile.mark("imports")
 
-app = FastAPI(title="Warehouse Management Agent", version="1.0.0")
+# Served while the warehouse is still loading; everything else answers 503 until ready
+ALWAYS_AVAILABLE_PATHS = {"/", "/api/live", "/api/ready", "/api/startup", "/docs", "/openapi.json"}
+
+def _load_state() -> None:
+    """Build the warehouse and its indexes, then replay the journal over it"""
+    with startup_profile.phase("rules"):
+        if RULES_FILE:
+            slotting_rules.load_boot_file(RULES_FILE)
+        slotting_rules.add_listener(warehouse.refresh_candidate_indexes)
+    with startup_profile.phase("warehouse"):
+        warehouse.load(zones=ZONES, snapshot_dir=SNAPSHOT_DIR or None)
+    if JOURNAL_DIR:
+        with startup_profile.phase("journal_replay"):
+            journal = AssignmentJournal(JOURNAL_DIR, fsync=JOURNAL_FSYNC)
+            replayed = journal.attach(warehouse)
+        print(f"Assignment journal: replayed {replayed} records from {JOURNAL_DIR}")
+    with startup_profile.phase("occupancy_history"):
+        occupancy_history.attach()
+
+async def _warm_up() -> None:
+    try:
+        # Off the event loop, so liveness and readiness probes answer while state loads
+        await asyncio.to_thread(_load_state)
+    except Exception as e:
+        startup_profile.error = str(e)
+        print(f"❌ Startup failed: {e}")
+        return
+    app.state.reservation_expiry = asyncio.create_task(reservations.run_expiry_loop())
+    app.state.occupancy_sampler = asyncio.create_task(occupancy_history.run_sampler_loop())
+    app.state.rules_reloader = asyncio.create_task(slotting_rules.run_reload_loop())
+    startup_profile.mark_ready()
+    if OPENAI_API_KEY:
+        # Build the LLM client after readiness, so neither startup nor the first chat pays for it
+        app.state.llm_client = asyncio.create_task(asyncio.to_thread(get_client))
+    print(f"✅ Warehouse initialized with {len(warehouse.slots)} slots and {len(warehouse.items)} items")
+    print(startup_profile.summary_line())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start serving immediately and load state in the background; /api/ready reports when done"""
+    app.state.reservation_expiry = None
+    app.state.occupancy_sampler = None
+    app.state.rules_reloader = None
+    app.state.warm_up = asyncio.create_task(_warm_up())
+    yield
+    app.state.warm_up.cancel()
+    if app.state.reservation_expiry is not None:
+        app.state.reservation_expiry.cancel()
+    if app.state.occupancy_sampler is not None:
+        app.state.occupancy_sampler.cancel()
+    if app.state.rules_reloader is not None:
+        app.state.rules_reloader.cancel()
+    reslotting_jobs.shutdown()
+    export_jobs.shutdown()
+    tool_runner.shutdown()
+    if warehouse.journal is not None:
+        warehouse.journal.close()
+
+app = FastAPI(title="Warehouse Management Agent", version="1.0.0", lifespan=lifespan)
+listing_cache = ListingCache(warehouse)
+export_jobs.directory = EXPORT_DIR
+
+@app.middleware("http")
+async def require_ready(request: Request, call_next):
+    """Answer 503 (retry shortly) for anything that needs warehouse state until startup finishes"""
+    if not startup_profile.ready and request.url.path not in ALWAYS_AVAILABLE_PATHS:
+        return JSONResponse(
+            content={"success": False, "message": "Warehouse is starting up", "startup": startup_profile.report()},
+            status_code=503,
+            headers={"Retry-After": "1"}
+        )
+    return await call_next(request)
+
+def _traffic_class(request: Request) -> Optional[str]:
+    """Admission lane for a request; probes and the UI page are never shed"""
+    if request.url.path in ALWAYS_AVAILABLE_PATHS:
+        return None
+    if request.url.path == "/chat":
+        return "chat"
+    return "read" if request.method in ("GET", "HEAD") else "write"
+
+@app.middleware("http")
+async def admit(request: Request, call_next):
+    """Shed load per lane with 429 + Retry-After instead of letting queues grow without bound"""
+    traffic_class = _traffic_class(request)
+    if traffic_class is None:
+        return await call_next(request)
+    try:
+        async with admission.admit(traffic_class):
+            return await call_next(request)
+    except Overloaded as e:
+        return JSONResponse(
+            content={"success": False, "message": str(e)},
+            status_code=429,
+            headers={"Retry-After": str(e.retry_after)}
+        )
 
 # Create templates directory if it doesn't exist
 if not os.path.exists("templates"):
@@ -27,10 +150,13 @@ async def home(request: Request):
     """Main chat interface"""
     return templates.TemplateResponse("index.html", {"request": request})
 
+SESSION_COOKIE = "optislot_session"
+
 @app.post("/chat")
-async def chat(user_message: str = Form(...)):
+async def chat(request: Request, user_message: str = Form(...), session_id: Optional[str] = Form(None)):
     """Process chat message from user"""
     try:
+        session = sessions.get(session_id or request.cookies.get(SESSION_COOKIE))
         if user_message.lower().strip() in ["help", "/help", "?"]:
             response = {
                 "response": agent.get_help(),
@@ -39,9 +165,12 @@ async def chat(user_message: str = Form(...)):
                 "tool_result": None
             }
         else:
-            response = agent.process_message(user_message)
+            response = await agent.process_message_async(user_message, session)
+        response["session_id"] = session.session_id
         
-        return JSONResponse(content=response)
+        json_response = JSONResponse(content=response)
+        json_response.set_cookie(SESSION_COOKIE, session.session_id, httponly=True, samesite="lax")
+        return json_response
     except Exception as e:
         return JSONResponse(
             content={
@@ -53,72 +182,85 @@ async def chat(user_message: str = Form(...)):
             status_code=500
         )
 
+@app.get("/api/sessions")
+async def get_sessions():
+    """Chat session store usage (counts and bytes only; session IDs are bearer tokens)"""
+    return JSONResponse(content={"success": True, "stats": sessions.stats()})
+
+@app.delete("/api/sessions/{session_id}")
+async def end_session(session_id: str):
+    """Forget a chat session"""
+    if not sessions.drop(session_id):
+        return JSONResponse(content={"success": False, "message": f"Session {session_id} not found"}, status_code=404)
+    return JSONResponse(content={"success": True, "message": f"Session {session_id} ended"})
+
 @app.get("/api/warehouse/status")
 async def get_warehouse_status():
-    """Get warehouse status via API"""
-    result = execute_tool("get_warehouse_status")
+    """Get warehouse status via API (one shared computation per warehouse version)"""
+    result = await read_cache.get(("get_warehouse_status",), lambda: execute_tool_async("get_warehouse_status"),
+                                  _succeeded)
     return JSONResponse(content=result)
 
 @app.get("/api/warehouse/slots")
-async def get_slots():
+async def get_slots(request: Request):
     """Get all slots information"""
-    slots_data = []
-    for slot in warehouse.slots.values():
-        slot_info = {
-            "slot_id": slot.slot_id,
-            "zone": slot.zone,
-            "aisle": slot.aisle,
-            "level": slot.level,
-            "position": slot.position,
-            "slot_type": slot.slot_type.value,
-            "status": slot.status.value,
-            "assigned_item_id": slot.assigned_item_id,
-            "max_weight": slot.max_weight,
-            "dimensions": slot.dimensions
-        }
-        
-        # Add item info if assigned
-        if slot.assigned_item_id and slot.assigned_item_id in warehouse.items:
-            item = warehouse.items[slot.assigned_item_id]
-            slot_info["assigned_item"] = {
-                "item_id": item.item_id,
-                "name": item.name,
-                "category": item.category,
-                "weight": item.weight
-            }
-        
-        slots_data.append(slot_info)
-    
-    return JSONResponse(content={"slots": slots_data})
+    return _cached_listing(request, listing_cache.slots)
 
 @app.get("/api/warehouse/items")
-async def get_items():
+async def get_items(request: Request):
     """Get all items information"""
-    items_data = []
-    for item in warehouse.items.values():
-        # Check if item is assigned to a slot
-        assigned_slot = None
-        for slot in warehouse.slots.values():
-            if slot.assigned_item_id == item.item_id:
-                assigned_slot = slot.slot_id
-                break
-        
-        item_info = {
-            "item_id": item.item_id,
-            "name": item.name,
-            "category": item.category,
-            "weight": item.weight,
-            "dimensions": item.dimensions,
-            "temperature_requirement": item.temperature_requirement,
-            "is_hazardous": item.is_hazardous,
-            "assigned_slot": assigned_slot
-        }
-        items_data.append(item_info)
-    
-    return JSONResponse(content={"items": items_data})
+    return _cached_listing(request, listing_cache.items)
+
+@app.patch("/api/warehouse/items/{item_id}")
+async def update_item(item_id: str, item_data: Dict[str, Any]):
+    """Edit an item's attributes (partial dimensions are merged into the current ones)"""
+    changes = {key: value for key, value in item_data.items() if key != "item_id"}
+    try:
+        item = await _run_durable(warehouse.update_item, item_id, **changes)
+    except (ValueError, KeyError) as e:
+        return JSONResponse(content={"success": False, "message": str(e)}, status_code=400)
+    if item is None:
+        return JSONResponse(content={"success": False, "message": f"Item {item_id} not found"}, status_code=404)
+    return JSONResponse(content={"success": True, "item": item.model_dump()})
+
+@app.post("/api/warehouse/snapshot")
+async def save_warehouse_snapshot():
+    """Write items plus one snapshot file per zone shard, for partial loading via OPTISLOT_ZONES"""
+    if not SNAPSHOT_DIR:
+        return JSONResponse(content={"success": False, "message": "OPTISLOT_SNAPSHOT_DIR is not set"}, status_code=400)
+    slots_by_zone = await asyncio.to_thread(warehouse.save_snapshot, SNAPSHOT_DIR)
+    return JSONResponse(content={"success": True, "directory": SNAPSHOT_DIR, "slots_by_zone": slots_by_zone})
+
+def _cached_listing(request: Request, cache) -> Response:
+    """Serve a list endpoint from pre-serialized fragments, negotiating format and compression"""
+    media_type, encoding = negotiate(request.headers.get("accept"), request.headers.get("accept-encoding"))
+    body, encoding = cache.render(media_type, encoding)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+async def _execute_durable(tool_name: str, **kwargs) -> Dict[str, Any]:
+    """Run a mutating tool, then wait for its journal records off the event loop"""
+    return await _run_durable(execute_tool, tool_name, **kwargs)
+
+async def _run_durable(function, *args, **kwargs):
+    """Run a synchronous mutation in a worker thread, then wait for its journal records off the event loop"""
+    def run():
+        # The deferral and the journal's last sequence number are both per thread
+        with warehouse.defer_durability():
+            result = function(*args, **kwargs)
+        journal = warehouse.journal
+        return result, journal.last_seq() if journal is not None else 0
+
+    result, seq = await asyncio.to_thread(run)
+    journal = warehouse.journal
+    if journal is not None and seq:
+        await journal.wait(seq)
+    return result
 
 @app.post("/api/warehouse/assign")
-async def assign_item_to_slot(assignment_data: Dict[str, str]):
+async def assign_item_to_slot(assignment_data: Dict[str, Any]):
     """Assign item to slot via API"""
     slot_id = assignment_data.get("slot_id")
     item_id = assignment_data.get("item_id")
@@ -128,16 +270,459 @@ async def assign_item_to_slot(assignment_data: Dict[str, str]):
             content={"success": False, "message": "Both slot_id and item_id are required"},
             status_code=400
         )
+    try:
+        quantity = int(assignment_data.get("quantity", 1))
+    except (TypeError, ValueError):
+        return JSONResponse(content={"success": False, "message": "quantity must be an integer"}, status_code=400)
+    
+    result = await _execute_durable("change_slot_assignment", slot_id=slot_id, item_id=item_id, quantity=quantity)
+    return JSONResponse(content=result)
+
+@app.post("/api/warehouse/assign/batch")
+async def assign_batch(batch_data: Dict[str, Any]):
+    """Apply an ordered list of item-to-slot moves via API"""
+    moves = batch_data.get("moves")
+    if not isinstance(moves, list) or not moves:
+        return JSONResponse(
+            content={"success": False, "message": "A non-empty moves list is required"},
+            status_code=400
+        )
     
-    result = execute_tool("change_slot_assignment", slot_id=slot_id, item_id=item_id)
+    result = await _execute_durable("batch_change_slot_assignments", moves=moves,
+                                    stop_on_error=batch_data.get("stop_on_error", True))
     return JSONResponse(content=result)
 
 @app.get("/api/warehouse/slots/empty")
-async def get_empty_slots():
-    """Get empty slots via API"""
-    result = execute_tool("find_available_slots")
+async def get_empty_slots(zone: Optional[str] = None, slot_type: Optional[str] = None,
+                          limit: int = 20, offset: int = 0, include_total: bool = False):
+    """Get empty slots via API (one shared computation per query and warehouse version)"""
+    result = await read_cache.get(
+        ("find_available_slots", zone, slot_type, limit, offset, include_total),
+        lambda: execute_tool_async("find_available_slots", zone=zone, slot_type=slot_type, limit=limit, offset=offset,
+                                   include_total=include_total),
+        _succeeded
+    )
     return JSONResponse(content=result)
 
+def _succeeded(result: Dict[str, Any]) -> bool:
+    return result.get("success", False)
+
+@app.get("/api/warehouse/slots/query")
+async def query_slots(zone: Optional[str] = None, aisle_min: Optional[str] = None, aisle_max: Optional[str] = None,
+                      level: Optional[int] = None, slot_type: Optional[str] = None, status: Optional[str] = None,
+                      available: bool = False, item_id: Optional[str] = None, quantity: int = 1,
+                      min_max_weight: Optional[float] = None, max_max_weight: Optional[float] = None,
+                      min_free_weight: Optional[float] = None, min_free_volume: Optional[float] = None,
+                      min_length: Optional[float] = None, min_width: Optional[float] = None,
+                      min_height: Optional[float] = None, sort_by: Optional[str] = None,
+                      limit: int = 50, offset: int = 0, include_total: bool = False,
+                      overlay_id: Optional[str] = None):
+    """Query slots with composable filters, sorting and paging (optionally inside a what-if overlay)"""
+    source = warehouse if overlay_id is None else overlays.get(overlay_id)
+    if source is None:
+        return JSONResponse(content={"success": False, "message": f"What-if overlay {overlay_id} not found or expired"},
+                            status_code=404)
+    try:
+        query = SlotQuery(
+            zone=zone, aisle_min=aisle_min, aisle_max=aisle_max, level=level, slot_type=slot_type,
+            status=status, available=available, item_id=item_id, quantity=quantity,
+            min_max_weight=min_max_weight, max_max_weight=max_max_weight,
+            min_free_weight=min_free_weight, min_free_volume=min_free_volume,
+            min_length=min_length, min_width=min_width, min_height=min_height,
+            sort_by=sort_by.split(",") if sort_by else None, limit=limit, offset=offset
+        )
+        result = query.execute(source, count_total=include_total)
+    except ValueError as e:
+        return JSONResponse(content={"success": False, "message": str(e)}, status_code=400)
+    
+    return JSONResponse(content={
+        "success": True,
+        "slots": [slot.model_dump(mode="json") for slot in result["slots"]],
+        "total": result["total"],
+        "limit": limit,
+        "offset": offset,
+        "query_plan": result["plan"]
+    })
+
+# Longest pick event line accepted; bounds what a feed without newlines can buffer
+MAX_PICK_LINE_BYTES = 64 * 1024
+
+def _ingest_pick_lines(lines) -> int:
+    return warehouse.velocity.ingest(iter_pick_events(line.decode("utf-8", "ignore") for line in lines))
+
+@app.post("/api/picks/ingest")
+async def ingest_picks(request: Request):
+    """Ingest a streamed JSONL/CSV pick-event feed into the velocity counters"""
+    ingested = 0
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        if lines:
+            # Parsing and folding run off the event loop
+            ingested += await asyncio.to_thread(_ingest_pick_lines, lines)
+        if len(pending) > MAX_PICK_LINE_BYTES:
+            return JSONResponse(content={
+                "success": False,
+                "message": f"Pick event line longer than {MAX_PICK_LINE_BYTES} bytes; ingested {ingested} events before it",
+                "ingested": ingested
+            }, status_code=413)
+    if pending:
+        ingested += await asyncio.to_thread(_ingest_pick_lines, [pending])
+
+    return JSONResponse(content={
+        "success": True,
+        "message": f"Ingested {ingested} pick events",
+        "ingested": ingested,
+        "velocity": warehouse.velocity.summary()
+    })
+
+@app.get("/api/velocity")
+async def get_velocity(limit: int = 20):
+    """Get ABC velocity classes and the fastest movers"""
+    return JSONResponse(content={
+        "success": True,
+        "velocity": warehouse.velocity.summary(),
+        "top_items": warehouse.velocity.top_items(limit)
+    })
+
+@app.post("/api/reslotting/jobs")
+async def submit_reslotting_job():
+    """Queue a background re-slotting plan over a snapshot of the warehouse"""
+    job_id = reslotting_jobs.submit(warehouse)
+    return JSONResponse(content={"success": True, "job_id": job_id, "job": reslotting_jobs.get(job_id)}, status_code=202)
+
+@app.get("/api/reslotting/jobs/{job_id}")
+async def get_reslotting_job(job_id: str, include_moves: bool = True):
+    """Poll a re-slotting job for progress and its move list"""
+    job = reslotting_jobs.get(job_id, include_moves=include_moves)
+    if job is None:
+        return JSONResponse(content={"success": False, "message": f"Job {job_id} not found"}, status_code=404)
+    return JSONResponse(content={"success": True, "job": job})
+
+@app.post("/api/reslotting/jobs/{job_id}/apply")
+async def apply_reslotting_job(job_id: str):
+    """Apply a completed re-slotting plan through the batch assignment path (once, while it is current)"""
+    try:
+        result = await _run_durable(reslotting_jobs.apply, job_id, warehouse,
+                                    lambda moves: execute_tool("batch_change_slot_assignments", moves=moves))
+    except ValueError as e:
+        return JSONResponse(content={"success": False, "message": str(e)}, status_code=409)
+    if result is None:
+        return JSONResponse(content={"success": False, "message": f"Job {job_id} not found"}, status_code=404)
+    return JSONResponse(content=result)
+
+@app.post("/api/exports")
+async def submit_export_job(export_data: Dict[str, Any]):
+    """Queue a background export of slots, items, assignments or utilization to a downloadable file"""
+    try:
+        job_id = export_jobs.submit(
+            warehouse,
+            export_data.get("dataset", "slots"),
+            export_data.get("format", "csv"),
+            compress=bool(export_data.get("compress", False))
+        )
+    except ValueError as e:
+        return JSONResponse(content={"success": False, "message": str(e)}, status_code=400)
+    return JSONResponse(content={"success": True, "job_id": job_id, "job": export_jobs.get(job_id)}, status_code=202)
+
+@app.get("/api/exports")
+async def list_export_jobs():
+    return JSONResponse(content={"success": True, "jobs": export_jobs.list()})
+
+@app.get("/api/exports/stream/{dataset}")
+async def stream_export(dataset: str, format: str = "csv"):
+    """Stream a dataset as CSV or JSON Lines without writing a file"""
+    if dataset not in DATASETS or format not in STREAM_FORMATS:
+        message = (f"Unknown dataset '{dataset}'" if dataset not in DATASETS
+                   else f"Format '{format}' cannot be streamed; use one of {', '.join(STREAM_FORMATS)}")
+        return JSONResponse(content={"success": False, "message": message}, status_code=400)
+    # A synchronous iterator: Starlette pulls each chunk in the threadpool, off the event loop
+    return StreamingResponse(
+        iter_encoded(warehouse, dataset, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'}
+    )
+
+@app.get("/api/exports/{job_id}")
+async def get_export_job(job_id: str):
+    """Poll an export job for progress; completed slot exports include the utilization report"""
+    job = export_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(content={"success": False, "message": f"Job {job_id} not found"}, status_code=404)
+    return JSONResponse(content={"success": True, "job": job})
+
+@app.get("/api/exports/{job_id}/download")
+async def download_export(job_id: str):
+    artifact = export_jobs.open_artifact(job_id)
+    if artifact is None:
+        job = export_jobs.get(job_id)
+        status_code = 404 if job is None else 409
+        message = f"Job {job_id} not found" if job is None else f"Job {job_id} is {job['status']}"
+        return JSONResponse(content={"success": False, "message": message}, status_code=status_code)
+    handle, filename, media_type, size = artifact
+    # Streams the handle opened above, so pruning the job meanwhile cannot cut the download short
+    return StreamingResponse(
+        iter_file(handle),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Content-Length": str(size)}
+    )
+
+@app.post("/api/reservations")
+async def create_reservation(reservation_data: Dict[str, Any]):
+    """Reserve a slot for an item or request ID"""
+    holder = reservation_data.get("holder") or reservation_data.get("item_id")
+    if not holder:
+        return JSONResponse(
+            content={"success": False, "message": "holder (or item_id) is required"},
+            status_code=400
+        )
+    
+    params = {key: reservation_data[key] for key in ("slot_id", "item_id") if reservation_data.get(key)}
+    if reservation_data.get("ttl_seconds") is not None:
+        try:
+            params["ttl_seconds"] = validate_ttl(reservation_data["ttl_seconds"])
+        except ValueError as e:
+            return JSONResponse(content={"success": False, "message": str(e)}, status_code=400)
+    result = await asyncio.to_thread(execute_tool, "reserve_slot", holder=holder, **params)
+    return JSONResponse(content=result, status_code=200 if result["success"] else 409)
+
+@app.get("/api/reservations")
+async def list_reservations():
+    """List active reservations"""
+    return JSONResponse(content={
+        "success": True,
+        "reservations": [reservation.to_dict() for reservation in reservations.active()],
+        "stats": reservations.stats()
+    })
+
+@app.post("/api/reservations/{reservation_id}/confirm")
+async def confirm_reservation(reservation_id: str, confirm_data: Dict[str, Any] = None):
+    """Convert a reservation into an assignment"""
+    item_id = (confirm_data or {}).get("item_id")
+    result = await _execute_durable("confirm_reservation", reservation_id=reservation_id, item_id=item_id)
+    return JSONResponse(content=result, status_code=200 if result["success"] else 409)
+
+@app.delete("/api/reservations/{reservation_id}")
+async def release_reservation(reservation_id: str):
+    """Release a reservation"""
+    result = await asyncio.to_thread(execute_tool, "release_reservation", reservation_id=reservation_id)
+    return JSONResponse(content=result, status_code=200 if result["success"] else 404)
+
+@app.post("/api/whatif")
+async def create_overlay(overlay_data: Dict[str, Any] = None):
+    """Open a copy-on-write what-if overlay over the live warehouse"""
+    try:
+        overlay = overlays.create(label=(overlay_data or {}).get("label"))
+    except ValueError as e:
+        return JSONResponse(content={"success": False, "message": str(e)}, status_code=429)
+    return JSONResponse(content={"success": True, "overlay": overlay.to_dict()})
+
+@app.get("/api/whatif")
+async def list_overlays():
+    """List open what-if overlays"""
+    return JSONResponse(content={
+        "success": True,
+        "overlays": [overlay.to_dict() for overlay in overlays.recent()],
+        "stats": overlays.stats()
+    })
+
+@app.get("/api/whatif/{overlay_id}")
+async def get_overlay(overlay_id: str):
+    """An overlay's changes against live state, its status report and any commit conflicts"""
+    overlay = overlays.get(overlay_id)
+    if overlay is None:
+        return JSONResponse(content={"success": False, "message": f"What-if overlay {overlay_id} not found or expired"},
+                            status_code=404)
+    status = execute_tool("get_warehouse_status", overlay_id=overlay_id)
+    live_status = execute_tool("get_warehouse_status")
+    for result in (status, live_status):
+        if not result["success"]:
+            return JSONResponse(content=result, status_code=500)
+    return JSONResponse(content={
+        "success": True,
+        "overlay": overlay.to_dict(),
+        "changes": overlay.changes(),
+        "conflicts": overlay.conflicts(),
+        "status": status,
+        "live_status": live_status["summary"]
+    })
+
+@app.post("/api/whatif/{overlay_id}/assignments")
+async def simulate_assignments(overlay_id: str, batch_data: Dict[str, Any]):
+    """Apply moves inside an overlay; each move's mode is move (default), add or remove"""
+    overlay = overlays.get(overlay_id)
+    if overlay is None:
+        return JSONResponse(content={"success": False, "message": f"What-if overlay {overlay_id} not found or expired"},
+                            status_code=404)
+    moves = batch_data.get("moves")
+    if not isinstance(moves, list):
+        return JSONResponse(content={"success": False, "message": "moves must be a list"}, status_code=400)
+    
+    operations = {"move": overlay.assign_item_to_slot, "add": overlay.add_item_to_slot,
+                  "remove": overlay.remove_item_from_slot}
+    results = []
+    for move in moves:
+        if not isinstance(move, dict):
+            results.append({"move": move, "success": False, "message": "Each move must be an object"})
+            continue
+        mode = move.get("mode", "move")
+        operation = operations.get(mode)
+        if operation is None or not move.get("slot_id") or not move.get("item_id"):
+            results.append({**move, "success": False, "message": "slot_id, item_id and a mode of move/add/remove are required"})
+            continue
+        quantity = move.get("quantity")
+        if quantity is None and mode != "remove":
+            quantity = 1
+        try:
+            quantity = None if quantity is None else int(quantity)
+        except (TypeError, ValueError):
+            results.append({**move, "success": False, "message": "quantity must be an integer"})
+            continue
+        ok = operation(move["slot_id"], move["item_id"], quantity)
+        results.append({**move, "success": ok})
+    applied = sum(1 for result in results if result["success"])
+    return JSONResponse(content={
+        "success": applied == len(results),
+        "message": f"Applied {applied} of {len(results)} moves in {overlay_id}",
+        "results": results,
+        "overlay": overlay.to_dict()
+    })
+
+@app.post("/api/whatif/{overlay_id}/commit")
+async def commit_overlay(overlay_id: str):
+    """Apply an overlay to live state atomically; 409 with the conflicting slots if live state moved on"""
+    try:
+        committed, conflicts, applied = await _run_durable(overlays.commit, overlay_id)
+    except ValueError as e:
+        return JSONResponse(content={"success": False, "message": str(e)}, status_code=404)
+    if not committed:
+        return JSONResponse(content={
+            "success": False,
+            "message": f"{len(conflicts)} slots changed in live state since the overlay read them",
+            "conflicts": conflicts
+        }, status_code=409)
+    return JSONResponse(content={"success": True, "message": f"Committed {overlay_id}", "changes_applied": applied})
+
+@app.delete("/api/whatif/{overlay_id}")
+async def discard_overlay(overlay_id: str):
+    """Throw an overlay away"""
+    try:
+        overlays.discard(overlay_id)
+    except ValueError as e:
+        return JSONResponse(content={"success": False, "message": str(e)}, status_code=404)
+    return JSONResponse(content={"success": True, "message": f"Discarded {overlay_id}"})
+
+@app.get("/api/tools")
+async def list_tools():
+    """Registered tools with their execution kind, limits and call timing"""
+    tools = {
+        name: {
+            "description": spec["description"],
+            "kind": tool_kind(spec),
+            "read_only": tool_is_read_only(spec),
+            "timeout": spec.get("timeout"),
+            "max_concurrency": spec.get("max_concurrency")
+        }
+        for name, spec in AVAILABLE_TOOLS.items()
+    }
+    return JSONResponse(content={"success": True, "tools": tools, "stats": tool_runner.summary()})
+
+@app.post("/api/tools/{tool_name}")
+async def run_tool(tool_name: str, arguments: Dict[str, Any] = None, timeout: Optional[float] = None):
+    """Run a read-only tool by name; heavy tools are offloaded to worker pools"""
+    if tool_name not in AVAILABLE_TOOLS:
+        return JSONResponse(content={"success": False, "message": f"Tool '{tool_name}' not found"}, status_code=404)
+    if not tool_is_read_only(AVAILABLE_TOOLS[tool_name]):
+        return JSONResponse(content={"success": False, "message": f"Tool '{tool_name}' changes warehouse state; "
+                                                                  "use its dedicated endpoint"}, status_code=403)
+    try:
+        result = await execute_tool_async(tool_name, timeout=timeout, **(arguments or {}))
+    except TypeError as e:
+        return JSONResponse(content={"success": False, "message": str(e)}, status_code=400)
+    return JSONResponse(content=result, status_code=504 if result.get("timed_out") else 200)
+
+@app.get("/api/journal")
+async def get_journal_stats():
+    """Assignment journal state: segment size, group commit counters and compactions"""
+    if warehouse.journal is None:
+        return JSONResponse(content={"success": True, "enabled": False})
+    return JSONResponse(content={"success": True, "enabled": True, "journal": warehouse.journal.stats()})
+
+@app.get("/api/rules")
+async def get_rules():
+    """The active slotting rule set and where it was loaded from"""
+    return JSONResponse(content={"success": True, **slotting_rules.describe()})
+
+@app.put("/api/rules")
+async def replace_rules(config: Dict[str, Any]):
+    """Activate a new rule set (not written back to the rules file); 400 keeps the current one"""
+    try:
+        result = await asyncio.to_thread(slotting_rules.replace, config)
+    except ValueError as e:
+        return JSONResponse(content={"success": False, "message": str(e)}, status_code=400)
+    return JSONResponse(content={"success": True, **result})
+
+@app.post("/api/rules/reload")
+async def reload_rules():
+    """Re-read the rules file now instead of waiting for the change watcher"""
+    try:
+        result = await asyncio.to_thread(slotting_rules.load_file, RULES_FILE) if RULES_FILE else None
+    except (ValueError, OSError) as e:
+        return JSONResponse(content={"success": False, "message": str(e)}, status_code=400)
+    if result is None:
+        return JSONResponse(content={"success": False, "message": f"Rules file {RULES_FILE!r} not found"}, status_code=404)
+    return JSONResponse(content={"success": True, **result})
+
+@app.get("/api/occupancy/history")
+async def get_occupancy_history(series: str = "all", metric: str = "occupancy_rate", since: float = 3600,
+                                start: Optional[float] = None, end: Optional[float] = None,
+                                resolution: Optional[str] = None):
+    """Occupancy over time for the warehouse ("all"), a zone ("zone:A") or a slot type ("type:hazmat")"""
+    end = time.time() if end is None else end
+    start = end - since if start is None else start
+    try:
+        result = occupancy_history.query(series, metric, start, end, resolution)
+    except ValueError as e:
+        return JSONResponse(content={"success": False, "message": str(e)}, status_code=400)
+    return JSONResponse(content={"success": True, **result})
+
+@app.get("/api/occupancy/series")
+async def list_occupancy_series():
+    """Series, metrics and resolutions available to /api/occupancy/history"""
+    return JSONResponse(content={
+        "success": True,
+        "series": occupancy_history.series(),
+        "metrics": list(METRICS),
+        "resolutions": {name: {"bucket_seconds": seconds, "buckets": size}
+                        for name, (seconds, size) in RESOLUTIONS.items()}
+    })
+
+@app.get("/api/admission")
+async def get_admission_stats():
+    """Per-lane admission counters and read coalescing hits"""
+    return JSONResponse(content={"success": True, "lanes": admission.stats(), "read_cache": read_cache.stats()})
+
+@app.get("/api/live")
+async def liveness():
+    """Liveness probe: the process is up and serving"""
+    return JSONResponse(content={"success": True, "status": "alive"})
+
+@app.get("/api/ready")
+async def readiness():
+    """Readiness probe: 200 once the warehouse is loaded and the journal replayed, 503 before"""
+    if not startup_profile.ready:
+        status = "failed" if startup_profile.error else "starting"
+        return JSONResponse(content={"success": False, "status": status, "error": startup_profile.error},
+                            status_code=503, headers={"Retry-After": "1"})
+    return JSONResponse(content={"success": True, "status": "ready"})
+
+@app.get("/api/startup")
+async def startup_report():
+    """Cold-start profile: interpreter start, import and loading phases, time to ready"""
+    return JSONResponse(content={"success": True, "startup": startup_profile.report()})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
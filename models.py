@@ -1,7 +1,26 @@
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Any, Callable, Iterable, Optional, List, Dict, Set, Tuple
+from datetime import datetime, timezone
 from enum import Enum
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import functools
 import json
+import os
+import threading
+import time
+
+from capacity import CapacityIndex
+from rules import Profile, slotting_rules
+from velocity import VelocityTracker, slot_travel_cost
+
+# Slack for float drift in cached remaining capacity
+CAPACITY_EPSILON = 1e-6
+
+# Snapshot layout written by WarehouseData.save_snapshot: shared items plus one file per zone
+SNAPSHOT_ITEMS_FILE = "items.json"
+SNAPSHOT_SHARD_FILE = "zone-{zone}.json"
 
 
 class SlotStatus(str, Enum):
@@ -26,6 +45,11 @@ class Item(BaseModel):
     temperature_requirement: Optional[str] = None
     is_hazardous: bool = False
 
+    @property
+    def volume(self) -> float:
+        """Unit volume in cm3"""
+        return self.dimensions["length"] * self.dimensions["width"] * self.dimensions["height"]
+
 
 class Slot(BaseModel):
     slot_id: str
@@ -37,7 +61,21 @@ class Slot(BaseModel):
     max_weight: float  # in kg
     dimensions: Dict[str, float]  # length, width, height in cm
     status: SlotStatus
-    assigned_item_id: Optional[str] = None
+    assigned_item_id: Optional[str] = None  # first SKU stocked in the slot
+    contents: Dict[str, int] = {}  # item_id -> quantity
+    remaining_weight: Optional[float] = None  # cached free capacity in kg
+    remaining_volume: Optional[float] = None  # cached free capacity in cm3
+
+    def model_post_init(self, __context) -> None:
+        if self.remaining_weight is None:
+            self.remaining_weight = self.max_weight
+        if self.remaining_volume is None:
+            self.remaining_volume = self.volume
+
+    @property
+    def volume(self) -> float:
+        """Total volume in cm3"""
+        return self.dimensions["length"] * self.dimensions["width"] * self.dimensions["height"]
 
 
 class Assignment(BaseModel):
@@ -47,15 +85,329 @@ class Assignment(BaseModel):
     quantity: int = 1
 
 
-class WarehouseData:
-    def __init__(self):
+def is_compatible(slot: Slot, item: Item, quantity: int = 1) -> bool:
+    """Check if ``quantity`` units of an item fit in a slot's remaining capacity"""
+    # Weight check
+    if item.weight * quantity > slot.remaining_weight + CAPACITY_EPSILON:
+        return False
+    
+    # Volume check
+    if item.volume * quantity > slot.remaining_volume + CAPACITY_EPSILON:
+        return False
+    
+    return is_type_compatible(slot, item)
+
+
+def is_type_compatible(slot: Slot, item: Item) -> bool:
+    """Check if a single unit of an item may ever be stored in a slot, ignoring current stock"""
+    # Dimension check (every unit must fit the bay)
+    if (item.dimensions["length"] > slot.dimensions["length"] or
+        item.dimensions["width"] > slot.dimensions["width"] or
+        item.dimensions["height"] > slot.dimensions["height"]):
+        return False
+    
+    # Slot type and level rules (hazmat, cold storage, ...) from the active rule set
+    if not slotting_rules.profile_for(item).allows_slot(slot):
+        return False
+    
+    return item.weight <= slot.max_weight
+
+
+def allowed_zones_for_item(item: Item) -> Optional[List[str]]:
+    """Allowed zone(s) from the active rule set; None allows all zones (for general items)"""
+    zones = slotting_rules.profile_for(item).zones
+    return list(zones) if zones else None
+
+
+def zone_of(slot_id: str) -> str:
+    """Zone prefix of a slot ID (A-01-02-03 -> A); slot operations are routed to shards by it"""
+    return slot_id.split("-", 1)[0]
+
+
+# Cross-zone aggregates fan out on a thread pool only when the warehouse is large enough to gain
+PARALLEL_FAN_OUT_MIN_SLOTS = 20_000
+
+
+class WarehouseShard:
+    """
+    One zone's slots, stock records and indexes, guarded by the shard's own lock.
+
+    Writers in different zones take different locks, so they never wait on each other.
+    """
+
+    def __init__(self, zone: str, index: int):
+        self.zone = zone
+        self.index = index  # creation order; shards are iterated (and slots ordered) by it
+        self.lock = threading.RLock()
         self.slots: Dict[str, Slot] = {}
-        self.items: Dict[str, Item] = {}
         self.assignments: Dict[str, Assignment] = {}
-        self._initialize_dummy_data()
+        self.item_slots: Dict[str, Set[str]] = {}  # item_id -> slots in this zone holding it
+        self.capacity_index = CapacityIndex()
+        # Attribute indexes for the query planner; values are slot-ordered dicts used as ordered sets
+        self.slots_by_aisle: Dict[str, Dict[str, None]] = {}
+        self.slots_by_level: Dict[int, Dict[str, None]] = {}
+        self.slots_by_type: Dict[SlotType, Dict[str, None]] = {}
+        self.slots_by_status: Dict[SlotStatus, Set[str]] = {status: set() for status in SlotStatus}
+        # Rule profile key -> slots of the allowed types and levels, in slot order (built on first use).
+        # Replaced, never mutated, under the shard lock, so lock-free readers always see a whole mapping
+        self.eligible: Dict[Tuple, Dict[str, None]] = {}
+        self.version = 0
+
+    def add_slot(self, slot: Slot) -> None:
+        self.slots[slot.slot_id] = slot
+        self.slots_by_aisle.setdefault(slot.aisle, {})[slot.slot_id] = None
+        self.slots_by_level.setdefault(slot.level, {})[slot.slot_id] = None
+        self.slots_by_type.setdefault(slot.slot_type, {})[slot.slot_id] = None
+        self.slots_by_status[slot.status].add(slot.slot_id)
+        self.capacity_index.update(slot.slot_id, slot.remaining_volume, slot.remaining_weight)
+        self.eligible = {}
+
+    def eligible_slots(self, profile: Profile) -> Dict[str, None]:
+        """Slots whose type and level the profile allows, built once per profile"""
+        eligible = self.eligible.get(profile.key)
+        if eligible is None:
+            with self.lock:
+                eligible = self.eligible.get(profile.key)
+                if eligible is None:
+                    eligible = self._build_eligible(profile)
+                    self.eligible = {**self.eligible, profile.key: eligible}
+        return eligible
+
+    def refresh_eligible(self, keys_in_use: Dict[Tuple, Profile]) -> Tuple[int, int, int]:
+        """Drop indexes no profile uses any more and build the new ones; returns (kept, built, dropped)"""
+        with self.lock:
+            current = self.eligible
+            eligible = {key: slot_ids for key, slot_ids in current.items() if key in keys_in_use}
+            kept = len(eligible)
+            built = 0
+            for key, profile in keys_in_use.items():
+                if key not in eligible and profile.restricts_slots and (not profile.zones or self.zone in profile.zones):
+                    eligible[key] = self._build_eligible(profile)
+                    built += 1
+            self.eligible = eligible
+        return kept, built, len(current) - kept
+
+    def _build_eligible(self, profile: Profile) -> Dict[str, None]:
+        return {slot_id: None for slot_id, slot in self.slots.items() if profile.allows_slot(slot)}
+
+    def slots_with_capacity(self, min_volume: float, min_weight: float, order: Callable[[str], int]) -> List[Slot]:
+        with self.lock:
+            slot_ids = sorted(self.capacity_index.query(min_volume, min_weight), key=order)
+            return [self.slots[slot_id] for slot_id in slot_ids]
+
+    def slots_with_status(self, status: SlotStatus, order: Callable[[str], int]) -> List[Slot]:
+        with self.lock:
+            slot_ids = self.slots_by_status[status]
+            if len(slot_ids) * 4 > len(self.slots):
+                # Dense statuses are cheaper to collect in slot order than to sort
+                return [slot for slot in self.slots.values() if slot.status == status]
+            return [self.slots[slot_id] for slot_id in sorted(slot_ids, key=order)]
+
+    def suitable_slots(self, item: Item, quantity: int, order: Callable[[str], int]) -> List[Slot]:
+        """Unreserved slots in this zone with room for ``quantity`` units of an item, in slot order"""
+        profile = slotting_rules.profile_for(item)
+        if profile.restricts_slots:
+            # The rule profile's candidate index is already in slot order and usually far smaller
+            with self.lock:
+                candidates = [self.slots[slot_id] for slot_id in self.eligible_slots(profile)]
+        else:
+            candidates = self.slots_with_capacity(item.volume * quantity, item.weight * quantity, order)
+        suitable = []
+        for slot in candidates:
+            if slot.status != SlotStatus.RESERVED and is_compatible(slot, item, quantity):
+                suitable.append(slot)
+        return suitable
+
+    def status_summary(self) -> Dict[str, Any]:
+        """Counts and capacity usage for this zone, taken under the shard lock"""
+        with self.lock:
+            occupied = self.slots_by_status[SlotStatus.OCCUPIED]
+            summary = {
+                "total": len(self.slots),
+                "occupied": len(occupied),
+                "reserved": len(self.slots_by_status[SlotStatus.RESERVED]),
+                "total_weight": 0.0,
+                "total_volume": 0.0,
+                "used_weight": 0.0,
+                "used_volume": 0.0,
+                "by_type": {},
+                "first_occupied": []
+            }
+            for slot in self.slots.values():
+                summary["total_weight"] += slot.max_weight
+                summary["total_volume"] += slot.volume
+                type_stats = summary["by_type"].setdefault(slot.slot_type.value, {"total": 0, "occupied": 0, "reserved": 0})
+                type_stats["total"] += 1
+                if slot.status == SlotStatus.OCCUPIED:
+                    type_stats["occupied"] += 1
+                    summary["used_weight"] += slot.max_weight - slot.remaining_weight
+                    summary["used_volume"] += slot.volume - slot.remaining_volume
+                    if len(summary["first_occupied"]) < 10:
+                        summary["first_occupied"].append(slot)
+                elif slot.status == SlotStatus.RESERVED:
+                    type_stats["reserved"] += 1
+            return summary
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Self-contained copy of this zone: slots (with contents) and assignment records"""
+        with self.lock:
+            return {
+                "zone": self.zone,
+                "slots": [slot.model_dump(mode="json") for slot in self.slots.values()],
+                "assignments": [assignment.model_dump() for assignment in self.assignments.values()]
+            }
+
+
+class _Union:
+    """Read-only ordered set chained from several shards' index entries"""
+
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: List[Any]):
+        self.parts = parts
+
+    def __len__(self) -> int:
+        return sum(len(part) for part in self.parts)
+
+    def __iter__(self):
+        for part in self.parts:
+            yield from part
+
+    def __contains__(self, key: object) -> bool:
+        return any(key in part for part in self.parts)
+
+
+class _ShardedDict(Mapping):
+    """Read-only mapping over one per-shard dict, routing keys to their shard by zone prefix"""
+
+    def __init__(self, warehouse: "WarehouseData", attribute: str):
+        self._warehouse = warehouse
+        self._attribute = attribute
+
+    def __getitem__(self, key: str):
+        shard = self._warehouse.shards.get(zone_of(key))
+        if shard is None:
+            raise KeyError(key)
+        return getattr(shard, self._attribute)[key]
+
+    def __iter__(self):
+        for shard in self._warehouse.ordered_shards():
+            yield from getattr(shard, self._attribute)
+
+    def __len__(self) -> int:
+        return sum(len(getattr(shard, self._attribute)) for shard in self._warehouse.ordered_shards())
+
+
+class _MergedIndex(Mapping):
+    """Read-only mapping merging one index (by aisle, level, type, status or item) across shards"""
+
+    def __init__(self, warehouse: "WarehouseData", attribute: str):
+        self._warehouse = warehouse
+        self._attribute = attribute
+
+    def __getitem__(self, key):
+        parts = [index[key] for index in self._indexes() if key in index]
+        if not parts:
+            raise KeyError(key)
+        return parts[0] if len(parts) == 1 else _Union(parts)
+
+    def __iter__(self):
+        seen = set()
+        for index in self._indexes():
+            for key in index:
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def _indexes(self):
+        return [getattr(shard, self._attribute) for shard in self._warehouse.ordered_shards()]
+
+
+def _mutation(method):
+    """
+    Run a public mutator, then wait for the journal to make it durable.
+
+    Mutators take the locks of the shards they touch themselves; the wait happens after those
+    are released so concurrent writers share one fsync. Nested mutators (assign -> unassign)
+    only wait once, at the outermost call.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        local.depth = depth + 1
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            local.depth = depth
+        self.wait_durable()
+        return result
+    return wrapper
+
+
+class WarehouseData:
+    """
+    Warehouse state partitioned into per-zone shards.
+
+    Slot operations are routed by the zone prefix of the slot ID and lock only the shards
+    involved. ``slots``, ``assignments``, ``item_slots`` and the ``slots_by_*`` indexes are
+    read-only views merged across shards in slot order; cross-zone aggregates fan out over
+    the shards and merge the partial results.
+    """
+
+    def __init__(self, load_data: bool = True):
+        self.items: Dict[str, Item] = {}
+        self.shards: Dict[str, WarehouseShard] = {}
+        self._shard_list: List[WarehouseShard] = []
+        self._shards_lock = threading.Lock()
+        self._slot_order: Dict[str, int] = {}
+        self.slots = _ShardedDict(self, "slots")
+        self.assignments = _ShardedDict(self, "assignments")
+        self.item_slots = _MergedIndex(self, "item_slots")
+        self.slots_by_zone: Dict[str, Dict[str, Slot]] = {}  # zone -> that shard's slots, in slot order
+        self.slots_by_aisle = _MergedIndex(self, "slots_by_aisle")
+        self.slots_by_level = _MergedIndex(self, "slots_by_level")
+        self.slots_by_type = _MergedIndex(self, "slots_by_type")
+        self.slots_by_status = _MergedIndex(self, "slots_by_status")
+        # Listeners get (event, slot_id, item_id) after every mutation
+        self._item_version = 0
+        self._listeners: List[Callable[[str, Optional[str], Optional[str]], None]] = []
+        self._local = threading.local()
+        self._fan_out_executor: Optional[ThreadPoolExecutor] = None
+        self.journal = None  # set by journal.AssignmentJournal.attach
+        self.velocity = VelocityTracker()
+        self.loaded = False
+        if load_data:
+            self.load()
+    
+    def load(self, zones: Optional[List[str]] = None, snapshot_dir: Optional[str] = None) -> None:
+        """
+        Populate slots, items, assignments and their indexes (once).
+    
+        ``zones`` loads only those shards; ``snapshot_dir`` loads per-shard snapshots written by
+        ``save_snapshot`` instead of the built-in sample data.
+        """
+        if self.loaded:
+            return
+        if snapshot_dir and os.path.exists(os.path.join(snapshot_dir, SNAPSHOT_ITEMS_FILE)):
+            self.load_snapshot(snapshot_dir, zones)
+        else:
+            self._initialize_dummy_data(zones)
+        self.loaded = True
     
-    def _initialize_dummy_data(self):
-        """Initialize warehouse with dummy data"""
+    @property
+    def version(self) -> int:
+        """Changes on every mutation; the sum of per-shard counters so writers never share one"""
+        return self._item_version + sum(shard.version for shard in self._shard_list)
+    
+    def ordered_shards(self) -> List[WarehouseShard]:
+        return self._shard_list
+    
+    def _initialize_dummy_data(self, only_zones: Optional[List[str]] = None):
+        """Initialize warehouse with dummy data (optionally only some zones)"""
         
         # Create dummy items
         dummy_items = [
@@ -113,7 +465,7 @@ class WarehouseData:
             self.items[item.item_id] = item
         
         # Create dummy slots
-        zones = ["A", "B", "C"]
+        zones = [zone for zone in ["A", "B", "C"] if not only_zones or zone in only_zones]
         aisles = ["01", "02", "03", "04"]
         levels = [1, 2, 3]
         positions = [1, 2, 3, 4, 5]
@@ -148,7 +500,7 @@ class WarehouseData:
                             status=SlotStatus.EMPTY
                         )
                         
-                        self.slots[slot_id] = slot
+                        self.add_slot(slot)
                         slot_counter += 1
         
         # Create some initial assignments
@@ -165,114 +517,488 @@ class WarehouseData:
             if slot_id in self.slots and item_id in self.items:
                 self.assign_item_to_slot(slot_id, item_id)
     
-    def assign_item_to_slot(self, slot_id: str, item_id: str) -> bool:
-        """Assign an item to a slot"""
+    def add_slot(self, slot: Slot) -> None:
+        """Register a slot in its zone's shard (created on first use) and index it"""
+        if zone_of(slot.slot_id) != slot.zone:
+            raise ValueError(f"Slot {slot.slot_id} does not start with its zone {slot.zone}")
+        shard = self.shards.get(slot.zone)
+        if shard is None:
+            with self._shards_lock:
+                shard = self.shards.get(slot.zone)
+                if shard is None:
+                    shard = WarehouseShard(slot.zone, len(self._shard_list))
+                    self._shard_list = self._shard_list + [shard]
+                    self.shards[slot.zone] = shard
+                    self.slots_by_zone[slot.zone] = shard.slots
+        with shard.lock:
+            # Shard-major order, so merged views iterate in exactly slot order
+            self._slot_order.setdefault(slot.slot_id, (shard.index << 32) + len(shard.slots))
+            shard.add_slot(slot)
+    
+    def shard_for(self, slot_id: str) -> WarehouseShard:
+        """Shard owning a slot ID; raises KeyError for unknown zones"""
+        return self.shards[zone_of(slot_id)]
+    
+    @contextmanager
+    def locked(self, zones: Optional[Iterable[str]] = None):
+        """Hold the locks of the given zones (all zones by default), always taken in shard order"""
+        if zones is None:
+            shards = list(self._shard_list)
+        else:
+            shards = sorted((self.shards[zone] for zone in set(zones) if zone in self.shards),
+                            key=lambda shard: shard.index)
+        for shard in shards:
+            shard.lock.acquire()
+        try:
+            yield
+        finally:
+            for shard in reversed(shards):
+                shard.lock.release()
+    
+    def _item_zones(self, item_id: str) -> Set[str]:
+        return {shard.zone for shard in self._shard_list if item_id in shard.item_slots}
+    
+    @contextmanager
+    def _locked_for_item(self, item_id: str, *zones: str):
+        """Lock the given zones plus every zone currently holding the item"""
+        while True:
+            wanted = set(zones) | self._item_zones(item_id)
+            with self.locked(wanted):
+                # The item may have moved into another zone before the locks were taken
+                if self._item_zones(item_id) <= wanted:
+                    yield
+                    return
+    
+    def set_slot_status(self, slot: Slot, status: SlotStatus) -> None:
+        """Change a slot's status and keep the status index in step"""
+        if slot.status != status:
+            shard = self.shard_for(slot.slot_id)
+            with shard.lock:
+                shard.slots_by_status[slot.status].discard(slot.slot_id)
+                shard.slots_by_status[status].add(slot.slot_id)
+                slot.status = status
+            self._notify("status", slot.slot_id)
+    
+    def hold_slot(self, slot_id: str, item_id: Optional[str] = None) -> Slot:
+        """Mark an empty slot RESERVED (checking fit for ``item_id``); raises ValueError if it cannot be held"""
+        slot = self.slots.get(slot_id)
+        if slot is None:
+            raise ValueError(f"Slot {slot_id} not found")
+        item = None
+        if item_id is not None:
+            item = self.items.get(item_id)
+            if item is None:
+                raise ValueError(f"Item {item_id} not found")
+        # Checked and flipped under the shard lock, so no writer can stock the slot in between
+        with self.shard_for(slot_id).lock:
+            if slot.status != SlotStatus.EMPTY:
+                raise ValueError(f"Slot {slot_id} is {slot.status.value}")
+            if item is not None and not self._is_compatible(slot, item):
+                raise ValueError(f"Slot {slot_id} is not compatible with {item.name}")
+            self.set_slot_status(slot, SlotStatus.RESERVED)
+        return slot
+    
+    def release_hold(self, slot_id: str) -> None:
+        """Make a RESERVED slot EMPTY again; a slot filled by confirming the hold is left as it is"""
+        slot = self.slots.get(slot_id)
+        if slot is None:
+            return
+        with self.shard_for(slot_id).lock:
+            if slot.status == SlotStatus.RESERVED:
+                self.set_slot_status(slot, SlotStatus.EMPTY)
+    
+    def add_listener(self, callback: Callable[[str, Optional[str], Optional[str]], None]) -> None:
+        """Register a mutation hook called with (event, slot_id, item_id)"""
+        self._listeners.append(callback)
+    
+    def _notify(self, event: str, slot_id: Optional[str] = None, item_id: Optional[str] = None) -> None:
+        if slot_id is not None:
+            self.shard_for(slot_id).version += 1
+        else:
+            self._item_version += 1
+        for callback in self._listeners:
+            callback(event, slot_id, item_id)
+    
+    @contextmanager
+    def defer_durability(self):
+        """
+        Group several mutations under one journal wait.
+
+        Mutators inside the block do not wait for fsync; the caller waits once afterwards
+        with ``journal.sync()`` or ``await journal.wait(seq)``.
+        """
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        local.depth = depth + 1
+        try:
+            yield
+        finally:
+            local.depth = depth
+    
+    def wait_durable(self) -> None:
+        """Wait for this thread's journaled changes, unless inside ``defer_durability``"""
+        if self.journal is not None and not getattr(self._local, "depth", 0):
+            self.journal.sync()
+    
+    def add_item(self, item: Item) -> None:
+        """Register a new item"""
+        self.items[item.item_id] = item
+        self._notify("item", None, item.item_id)
+    
+    @_mutation
+    def update_item(self, item_id: str, /, **changes: Any) -> Optional[Item]:
+        """Edit an item's attributes; cached capacity of slots holding it is recomputed"""
+        item = self.items.get(item_id)
+        if item is None:
+            return None
+        
+        changes.pop("item_id", None)
+        dimensions = changes.get("dimensions")
+        if isinstance(dimensions, dict):
+            # Partial dimensions edit the current ones; every unit needs all three to fit-check
+            changes["dimensions"] = {**item.dimensions, **dimensions}
+        updated = Item.model_validate({**item.model_dump(), **changes})
+        missing = [key for key in ("length", "width", "height") if key not in updated.dimensions]
+        if missing:
+            raise ValueError(f"Item dimensions need {', '.join(missing)}")
+        with self._locked_for_item(item_id):
+            self.items[item_id] = updated
+            for slot_id in self.item_slots.get(item_id, ()):
+                self._recompute_capacity(self.slots[slot_id])
+        self._notify("item", None, item_id)
+        return updated
+    
+    def _recompute_capacity(self, slot: Slot) -> None:
+        """Rebuild a slot's cached remaining capacity from its contents"""
+        slot.remaining_weight = slot.max_weight - sum(
+            self.items[item_id].weight * quantity for item_id, quantity in slot.contents.items())
+        slot.remaining_volume = slot.volume - sum(
+            self.items[item_id].volume * quantity for item_id, quantity in slot.contents.items())
+        self.shard_for(slot.slot_id).capacity_index.update(slot.slot_id, slot.remaining_volume, slot.remaining_weight)
+    
+    def slot_order(self, slot_id: str) -> int:
+        """Position of a slot in warehouse order (zone, then aisle, level, position within the zone)"""
+        return self._slot_order[slot_id]
+    
+    @_mutation
+    def assign_item_to_slot(self, slot_id: str, item_id: str, quantity: int = 1, reserved: bool = False) -> bool:
+        """
+        Move an item to a slot, replacing wherever it was stocked before.
+        
+        Reserved slots are refused unless ``reserved`` is set (confirming the hold).
+        """
         if slot_id not in self.slots:
             return False
         if item_id not in self.items:
             return False
+        if quantity < 1:
+            return False
         
         slot = self.slots[slot_id]
         item = self.items[item_id]
         
-        # Check if slot is compatible with item
-        if not self._is_compatible(slot, item):
+        # A move touches the target zone and every zone the item currently sits in
+        with self._locked_for_item(item_id, zone_of(slot_id)):
+            if slot.status == SlotStatus.RESERVED and not reserved:
+                return False
+            
+            # Capacity already used by this item in the target slot is freed by the move
+            existing = slot.contents.get(item_id, 0)
+            if existing:
+                slot.remaining_weight += item.weight * existing
+                slot.remaining_volume += item.volume * existing
+            compatible = self._is_compatible(slot, item, quantity)
+            if existing:
+                slot.remaining_weight -= item.weight * existing
+                slot.remaining_volume -= item.volume * existing
+            
+            # Check if slot is compatible with item
+            if not compatible:
+                return False
+            
+            # Remove item from current slot(s) if assigned
+            if self.item_slots.get(item_id):
+                self.unassign_item(item_id)
+            
+            self._place(slot, item, quantity)
+        return True
+    
+    @_mutation
+    def add_item_to_slot(self, slot_id: str, item_id: str, quantity: int = 1) -> bool:
+        """Stock more units of an item in a slot, keeping its other locations (never a reserved slot)"""
+        if slot_id not in self.slots or item_id not in self.items or quantity < 1:
             return False
         
-        # Remove item from current slot if assigned
-        current_assignment = self._find_item_assignment(item_id)
-        if current_assignment:
-            self.unassign_item(item_id)
-        
-        # Assign item to new slot
-        slot.status = SlotStatus.OCCUPIED
-        slot.assigned_item_id = item_id
-        
-        assignment = Assignment(
-            slot_id=slot_id,
-            item_id=item_id,
-            assigned_date="2024-01-01"  # Dummy date
-        )
-        self.assignments[f"{slot_id}_{item_id}"] = assignment
-        
+        slot = self.slots[slot_id]
+        item = self.items[item_id]
+        with self.shard_for(slot_id).lock:
+            if slot.status == SlotStatus.RESERVED or not self._is_compatible(slot, item, quantity):
+                return False
+            
+            self._place(slot, item, quantity)
         return True
     
-    def unassign_item(self, item_id: str) -> bool:
-        """Remove item assignment"""
-        assignment = self._find_item_assignment(item_id)
-        if not assignment:
+    @_mutation
+    def remove_item_from_slot(self, slot_id: str, item_id: str, quantity: Optional[int] = None) -> bool:
+        """Take units (all by default) of an item out of one slot"""
+        slot = self.slots.get(slot_id)
+        if slot is None or item_id not in slot.contents:
             return False
         
-        slot = self.slots[assignment.slot_id]
-        slot.status = SlotStatus.EMPTY
-        slot.assigned_item_id = None
-        
-        del self.assignments[f"{assignment.slot_id}_{item_id}"]
+        with self.shard_for(slot_id).lock:
+            stocked = slot.contents.get(item_id)
+            if stocked is None:
+                return False
+            quantity = stocked if quantity is None else min(quantity, stocked)
+            self._take(slot, self.items[item_id], quantity)
         return True
     
-    def _find_item_assignment(self, item_id: str) -> Optional[Assignment]:
-        """Find current assignment for an item"""
-        for assignment in self.assignments.values():
-            if assignment.item_id == item_id:
-                return assignment
-        return None
+    @_mutation
+    def unassign_item(self, item_id: str) -> bool:
+        """Remove item assignment from every slot holding it"""
+        with self._locked_for_item(item_id):
+            slot_ids = self.item_slots.get(item_id)
+            if not slot_ids:
+                return False
+            
+            item = self.items[item_id]
+            for slot_id in list(slot_ids):
+                slot = self.slots[slot_id]
+                self._take(slot, item, slot.contents[item_id])
+        return True
     
-    def _is_compatible(self, slot: Slot, item: Item) -> bool:
-        """Check if an item is compatible with a slot"""
-        # Weight check
-        if item.weight > slot.max_weight:
-            return False
-        
-        # Dimension check
-        if (item.dimensions["length"] > slot.dimensions["length"] or
-            item.dimensions["width"] > slot.dimensions["width"] or
-            item.dimensions["height"] > slot.dimensions["height"]):
-            return False
+    def _place(self, slot: Slot, item: Item, quantity: int, when: Optional[float] = None) -> None:
+        """Add stock to a slot and update cached capacity, indexes and assignment records (shard lock held)"""
+        shard = self.shard_for(slot.slot_id)
+        item_id = item.item_id
+        slot.contents[item_id] = slot.contents.get(item_id, 0) + quantity
+        slot.remaining_weight -= item.weight * quantity
+        slot.remaining_volume -= item.volume * quantity
+        self.set_slot_status(slot, SlotStatus.OCCUPIED)
+        if slot.assigned_item_id is None:
+            slot.assigned_item_id = item_id
         
-        # Hazmat check
-        if item.is_hazardous and slot.slot_type != SlotType.HAZMAT:
-            return False
+        shard.item_slots.setdefault(item_id, set()).add(slot.slot_id)
+        shard.capacity_index.update(slot.slot_id, slot.remaining_volume, slot.remaining_weight)
         
-        # Temperature check
-        if item.temperature_requirement == "frozen" and slot.slot_type != SlotType.COLD_STORAGE:
-            return False
+        key = f"{slot.slot_id}_{item_id}"
+        assignment = shard.assignments.get(key)
+        if assignment:
+            assignment.quantity = slot.contents[item_id]
+        else:
+            shard.assignments[key] = Assignment(
+                slot_id=slot.slot_id,
+                item_id=item_id,
+                assigned_date=datetime.fromtimestamp(when or time.time(), timezone.utc).isoformat(),
+                quantity=quantity
+            )
+        self._journal_stock(slot, item_id, when)
+        self._notify("stock", slot.slot_id, item_id)
+    
+    def _take(self, slot: Slot, item: Item, quantity: int) -> None:
+        """Remove stock from a slot and update cached capacity, indexes and assignment records (shard lock held)"""
+        shard = self.shard_for(slot.slot_id)
+        item_id = item.item_id
+        key = f"{slot.slot_id}_{item_id}"
+        left = slot.contents[item_id] - quantity
+        if left > 0:
+            slot.contents[item_id] = left
+            shard.assignments[key].quantity = left
+        else:
+            del slot.contents[item_id]
+            del shard.assignments[key]
+            slot_ids = shard.item_slots[item_id]
+            slot_ids.discard(slot.slot_id)
+            if not slot_ids:
+                del shard.item_slots[item_id]
+            if slot.assigned_item_id == item_id:
+                slot.assigned_item_id = next(iter(slot.contents), None)
         
-        return True
+        if slot.contents:
+            slot.remaining_weight += item.weight * quantity
+            slot.remaining_volume += item.volume * quantity
+        else:
+            # Reset exactly so float drift never accumulates on empty slots
+            slot.remaining_weight = slot.max_weight
+            slot.remaining_volume = slot.volume
+            self.set_slot_status(slot, SlotStatus.EMPTY)
+        shard.capacity_index.update(slot.slot_id, slot.remaining_volume, slot.remaining_weight)
+        self._journal_stock(slot, item_id)
+        self._notify("stock", slot.slot_id, item_id)
+    
+    def _journal_stock(self, slot: Slot, item_id: str, when: Optional[float] = None) -> None:
+        # Records carry the resulting quantity, not a delta, so replaying one twice is harmless
+        if self.journal is not None:
+            self.journal.append(slot.slot_id, item_id, slot.contents.get(item_id, 0), when or time.time())
+    
+    def set_stock(self, slot_id: str, item_id: str, quantity: int, when: Optional[float] = None) -> None:
+        """Force a slot's quantity of an item, bypassing fit checks (journal replay and snapshot load)"""
+        slot = self.slots[slot_id]
+        item = self.items[item_id]
+        with self.shard_for(slot_id).lock:
+            current = slot.contents.get(item_id, 0)
+            if quantity > current:
+                self._place(slot, item, quantity - current, when)
+            elif quantity < current:
+                self._take(slot, item, current - quantity)
+    
+    def _find_item_assignment(self, item_id: str) -> Optional[Assignment]:
+        """Find current assignment for an item (its first location if stocked in several slots)"""
+        slot_ids = self.item_slots.get(item_id)
+        if not slot_ids:
+            return None
+        slot_id = min(slot_ids, key=self._slot_order.__getitem__)
+        return self.assignments.get(f"{slot_id}_{item_id}")
+    
+    def _is_compatible(self, slot: Slot, item: Item, quantity: int = 1) -> bool:
+        """Check if an item is compatible with a slot"""
+        return is_compatible(slot, item, quantity)
+    
+    def find_slots_with_capacity(self, min_volume: float = 0.0, min_weight: float = 0.0) -> List[Slot]:
+        """Slots with at least ``min_volume`` cm3 and ``min_weight`` kg free, in slot order"""
+        order = self._slot_order.__getitem__
+        return self._merge(self._fan_out(lambda shard: shard.slots_with_capacity(min_volume, min_weight, order)))
+    
+    def estimate_slots_with_capacity(self, min_volume: float = 0.0, min_weight: float = 0.0) -> int:
+        """Upper bound on ``find_slots_with_capacity``'s result size, without visiting any slot"""
+        return sum(shard.capacity_index.estimate(min_volume, min_weight) for shard in self._shard_list)
     
     def get_empty_slots(self) -> List[Slot]:
         """Get all empty slots"""
-        return [slot for slot in self.slots.values() if slot.status == SlotStatus.EMPTY]
+        return self._slots_with_status(SlotStatus.EMPTY)
     
     def get_occupied_slots(self) -> List[Slot]:
         """Get all occupied slots"""
-        return [slot for slot in self.slots.values() if slot.status == SlotStatus.OCCUPIED]
+        return self._slots_with_status(SlotStatus.OCCUPIED)
+    
+    def get_reserved_slots(self) -> List[Slot]:
+        """Get all reserved slots"""
+        return self._slots_with_status(SlotStatus.RESERVED)
+    
+    def _slots_with_status(self, status: SlotStatus) -> List[Slot]:
+        order = self._slot_order.__getitem__
+        return self._merge(self._fan_out(lambda shard: shard.slots_with_status(status, order)))
     
-    def find_suitable_slots_for_item(self, item_id: str) -> List[Slot]:
-        """Find all suitable empty slots for an item, enforcing zone rules"""
+    def find_suitable_slots_for_item(self, item_id: str, quantity: int = 1) -> List[Slot]:
+        """Find all slots with room for an item, enforcing zone rules and ranked by pick velocity"""
         if item_id not in self.items:
             return []
         
         item = self.items[item_id]
-        suitable_slots = []
-
-        # Determine allowed zone(s) based on item type
-        allowed_zones = None
-        if item.category.lower() == "electronics":
-            allowed_zones = ["A"]
-        elif getattr(item, 'temperature_requirement', None) == "frozen":
-            allowed_zones = ["B"]
-        elif item.is_hazardous or item.category.lower() == "chemicals":
-            allowed_zones = ["C"]
-        # else: allow all zones (for general items)
-
-        for slot in self.get_empty_slots():
-            if allowed_zones and slot.zone not in allowed_zones:
-                continue
-            if self._is_compatible(slot, item):
-                suitable_slots.append(slot)
+        order = self._slot_order.__getitem__
+
+        # Zone rules route the search to the allowed shards; otherwise every shard is searched
+        allowed_zones = allowed_zones_for_item(item)
+        shards = None
+        if allowed_zones:
+            shards = [shard for shard in self._shard_list if shard.zone in allowed_zones]
+        suitable_slots = self._merge(self._fan_out(lambda shard: shard.suitable_slots(item, quantity, order), shards))
+        return self.rank_by_velocity(item_id, suitable_slots)
+    
+    def eligible_slot_ids(self, item: Item) -> Optional[_Union]:
+        """Slots of the item's allowed zones, types and levels in slot order; None if its rules allow every slot"""
+        profile = slotting_rules.profile_for(item)
+        if not profile.restricts_slots:
+            return None
+        allowed_zones = allowed_zones_for_item(item)
+        return _Union([shard.eligible_slots(profile) for shard in self._shard_list
+                       if not allowed_zones or shard.zone in allowed_zones])
+    
+    def rank_by_velocity(self, item_id: str, slots: List[Slot]) -> List[Slot]:
+        """Reorder slot-ordered candidates in place for an item's velocity class"""
+        # Fast movers get the cheapest pick locations, slow movers the far ones
+        velocity_class = self.velocity.classify(item_id)
+        if velocity_class == "A":
+            slots.sort(key=slot_travel_cost)
+        elif velocity_class == "C":
+            slots.sort(key=slot_travel_cost, reverse=True)
         
-        return suitable_slots
+        return slots
+    
+    def refresh_candidate_indexes(self) -> Dict[str, int]:
+        """After a rules reload: rebuild only the candidate indexes of profiles that changed"""
+        keys_in_use = {}
+        for item in list(self.items.values()):
+            profile = slotting_rules.profile_for(item)
+            keys_in_use[profile.key] = profile
+        totals = [shard.refresh_eligible(keys_in_use) for shard in self._shard_list]
+        return {
+            "profiles": len(keys_in_use),
+            "indexes_kept": sum(kept for kept, _, _ in totals),
+            "indexes_built": sum(built for _, built, _ in totals),
+            "indexes_dropped": sum(dropped for _, _, dropped in totals)
+        }
+    
+    def status_summary(self) -> Dict[str, Any]:
+        """Occupancy and capacity usage per zone, computed per shard in parallel and merged"""
+        zones = {}
+        for shard, summary in zip(self._shard_list, self._fan_out(WarehouseShard.status_summary)):
+            zones[shard.zone] = summary
+        return zones
+    
+    def _fan_out(self, task: Callable[[WarehouseShard], Any], shards: Optional[List[WarehouseShard]] = None) -> List[Any]:
+        """Run ``task`` on each shard, in parallel once the warehouse is large, results in shard order"""
+        shards = self._shard_list if shards is None else shards
+        if len(shards) > 1 and len(self._slot_order) >= PARALLEL_FAN_OUT_MIN_SLOTS:
+            if self._fan_out_executor is None:
+                self._fan_out_executor = ThreadPoolExecutor(max_workers=min(32, len(shards)),
+                                                            thread_name_prefix="shard")
+            return list(self._fan_out_executor.map(task, shards))
+        return [task(shard) for shard in shards]
+    
+    @staticmethod
+    def _merge(parts: List[List[Slot]]) -> List[Slot]:
+        # Shards are in slot order and so is each part, so concatenating keeps slot order
+        return [slot for part in parts for slot in part]
+    
+    def save_snapshot(self, directory: str) -> Dict[str, int]:
+        """Write items plus one file per shard, so a node can later load only the zones it serves"""
+        os.makedirs(directory, exist_ok=True)
+        _write_json(os.path.join(directory, SNAPSHOT_ITEMS_FILE),
+                    {"items": [item.model_dump() for item in self.items.values()]})
+        
+        def write_shard(shard: WarehouseShard) -> int:
+            snapshot = shard.snapshot()
+            _write_json(os.path.join(directory, SNAPSHOT_SHARD_FILE.format(zone=shard.zone)), snapshot)
+            return len(snapshot["slots"])
+        
+        written = self._fan_out(write_shard)
+        return {shard.zone: count for shard, count in zip(self._shard_list, written)}
+    
+    def load_snapshot(self, directory: str, zones: Optional[List[str]] = None) -> None:
+        """Load items and the shard snapshots for ``zones`` (all snapshot files by default)"""
+        with open(os.path.join(directory, SNAPSHOT_ITEMS_FILE), encoding="utf-8") as f:
+            for item_data in json.load(f)["items"]:
+                item = Item.model_validate(item_data)
+                self.items[item.item_id] = item
+        
+        prefix, suffix = SNAPSHOT_SHARD_FILE.split("{zone}")
+        for name in sorted(os.listdir(directory)):
+            if not (name.startswith(prefix) and name.endswith(suffix)):
+                continue
+            zone = name[len(prefix):-len(suffix)]
+            if zones and zone not in zones:
+                continue
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                snapshot = json.load(f)
+            for slot_data in snapshot["slots"]:
+                slot = Slot.model_validate(slot_data)
+                # Reservations live in memory only, so a reserved slot comes back as plain stock
+                slot.status = SlotStatus.OCCUPIED if slot.contents else SlotStatus.EMPTY
+                self.add_slot(slot)
+            shard = self.shards.get(zone)
+            for assignment_data in snapshot["assignments"]:
+                assignment = Assignment.model_validate(assignment_data)
+                shard.assignments[f"{assignment.slot_id}_{assignment.item_id}"] = assignment
+                shard.item_slots.setdefault(assignment.item_id, set()).add(assignment.slot_id)
+
+
+def _write_json(path: str, data: Any) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
 
 
-# Global warehouse instance
-warehouse = WarehouseData() 
\ No newline at end of file
+# Global warehouse instance; empty until warehouse.load() (main's lifespan hook calls it)
+warehouse = WarehouseData(load_data=False)
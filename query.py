@@ -0,0 +1,262 @@
+import heapq
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from models import Slot, SlotStatus, SlotType, WarehouseData, allowed_zones_for_item
+from velocity import slot_travel_cost
+
+
+# Sort keys understood by SlotQuery; prefix with "-" for descending
+SORT_KEYS: Dict[str, Callable[[Slot], Any]] = {
+    "slot_id": lambda slot: slot.slot_id,
+    "zone": lambda slot: slot.zone,
+    "aisle": lambda slot: slot.aisle,
+    "level": lambda slot: slot.level,
+    "position": lambda slot: slot.position,
+    "max_weight": lambda slot: slot.max_weight,
+    "remaining_weight": lambda slot: slot.remaining_weight,
+    "remaining_volume": lambda slot: slot.remaining_volume,
+    "travel_cost": slot_travel_cost
+}
+
+
+class SlotQuery:
+    """
+    Composable slot query with limit/offset pushdown.
+
+    All predicates are ANDed. ``execute`` picks the most selective index as the candidate
+    source (attribute indexes, the free-capacity buckets for capacity and item filters, or
+    the item's rule-eligible slots), applies the remaining predicates lazily and stops as
+    soon as ``offset + limit`` matches are found (unless a sort or the total count needs the
+    full candidate set).
+    """
+
+    def __init__(self, zone: Optional[str] = None, aisle_min: Optional[str] = None, aisle_max: Optional[str] = None,
+                 level: Optional[int] = None, slot_type: Optional[str] = None, status: Optional[str] = None,
+                 available: bool = False, item_id: Optional[str] = None, quantity: int = 1,
+                 min_max_weight: Optional[float] = None, max_max_weight: Optional[float] = None,
+                 min_free_weight: Optional[float] = None, min_free_volume: Optional[float] = None,
+                 min_length: Optional[float] = None, min_width: Optional[float] = None, min_height: Optional[float] = None,
+                 sort_by: Optional[List[str]] = None, limit: Optional[int] = 20, offset: int = 0):
+        self.zone = zone.upper() if zone else None
+        self.aisle_min = aisle_min.zfill(2) if aisle_min else None
+        self.aisle_max = aisle_max.zfill(2) if aisle_max else None
+        self.level = level
+        self.slot_type = SlotType(slot_type.lower()) if slot_type else None
+        self.status = SlotStatus(status.lower()) if status else None
+        self.available = available
+        self.item_id = item_id
+        self.quantity = quantity
+        self.min_max_weight = min_max_weight
+        self.max_max_weight = max_max_weight
+        self.min_free_weight = min_free_weight
+        self.min_free_volume = min_free_volume
+        self.min_dimensions = {key: value for key, value in
+                               (("length", min_length), ("width", min_width), ("height", min_height))
+                               if value is not None}
+        self.sort_by = sort_by or []
+        for key in self.sort_by:
+            if key.lstrip("-") not in SORT_KEYS and key != "velocity":
+                raise ValueError(f"Unknown sort key '{key}'")
+        self.limit = limit
+        self.offset = max(offset, 0)
+
+    def execute(self, warehouse: WarehouseData, count_total: bool = False) -> Dict[str, Any]:
+        """Run the query; returns matching slots, the plan used and optionally the total match count"""
+        item = None
+        if self.item_id:
+            item = warehouse.items.get(self.item_id)
+            if item is None:
+                raise ValueError(f"Item {self.item_id} not found")
+
+        source_name, candidates, estimate = self._plan(warehouse, item)
+        predicate = self._compile(warehouse, item)
+        sort_key = self._sort_key(warehouse, item)
+        wanted = None if self.limit is None else self.offset + self.limit
+
+        scanned = 0
+        total = 0
+        complete = True
+        matches: List[Slot] = []
+        slots = warehouse.slots
+        if sort_key is None:
+            for slot_id in candidates:
+                scanned += 1
+                slot = slots[slot_id]
+                if not predicate(slot):
+                    continue
+                total += 1
+                if wanted is None or len(matches) < wanted:
+                    matches.append(slot)
+                elif not count_total:
+                    complete = False
+                    break
+        else:
+            def matching() -> Iterable[Slot]:
+                nonlocal scanned, total
+                for slot_id in candidates:
+                    scanned += 1
+                    slot = slots[slot_id]
+                    if predicate(slot):
+                        total += 1
+                        yield slot
+            if wanted is None:
+                matches = sorted(matching(), key=sort_key)
+            else:
+                # Bounded heap instead of sorting everything that matched
+                matches = heapq.nsmallest(wanted, matching(), key=sort_key)
+
+        return {
+            "slots": matches[self.offset:wanted],
+            "total": total if complete else None,
+            "plan": {"index": source_name, "estimated_candidates": estimate, "scanned": scanned}
+        }
+
+    def _plan(self, warehouse: WarehouseData, item) -> Tuple[str, Iterable[str], int]:
+        """Choose the smallest index that can supply candidates in slot order"""
+        # (estimated size, name, candidate source, whether the source has to be sorted first)
+        options: List[Tuple[int, str, Callable[[], Iterable[str]], bool]] = []
+
+        if self.zone is not None:
+            zone_slots = warehouse.slots_by_zone.get(self.zone, {})
+            options.append((len(zone_slots), "zone", lambda: zone_slots, False))
+        if self.level is not None:
+            level_slots = warehouse.slots_by_level.get(self.level, {})
+            options.append((len(level_slots), "level", lambda: level_slots, False))
+        if self.slot_type is not None:
+            type_slots = warehouse.slots_by_type.get(self.slot_type, {})
+            options.append((len(type_slots), "slot_type", lambda: type_slots, False))
+        if self.aisle_min is not None or self.aisle_max is not None:
+            aisles = [aisle for aisle in sorted(warehouse.slots_by_aisle)
+                      if (self.aisle_min is None or aisle >= self.aisle_min)
+                      and (self.aisle_max is None or aisle <= self.aisle_max)]
+            size = sum(len(warehouse.slots_by_aisle[aisle]) for aisle in aisles)
+            options.append((size, "aisle", lambda: self._ordered(warehouse, (
+                slot_id for aisle in aisles for slot_id in warehouse.slots_by_aisle[aisle])), True))
+        status = self.status or (SlotStatus.EMPTY if self.available and item is None else None)
+        if status is not None:
+            status_slots = warehouse.slots_by_status[status]
+            options.append((len(status_slots), "status", lambda: self._ordered(warehouse, status_slots), True))
+        if isinstance(warehouse, WarehouseData):
+            # Live-state indexes only; an overlay's copied slots are not in them
+            min_volume, min_weight = self._min_capacity(item)
+            if min_volume > 0 or min_weight > 0:
+                options.append((warehouse.estimate_slots_with_capacity(min_volume, min_weight), "capacity", lambda: [
+                    slot.slot_id for slot in warehouse.find_slots_with_capacity(min_volume, min_weight)], True))
+            eligible_slots = warehouse.eligible_slot_ids(item) if item is not None else None
+            if eligible_slots is not None:
+                options.append((len(eligible_slots), "eligible", lambda: eligible_slots, False))
+        if item is not None:
+            allowed_zones = allowed_zones_for_item(item)
+            if allowed_zones:
+                item_zone_slots = [warehouse.slots_by_zone.get(zone, {}) for zone in allowed_zones]
+                options.append((sum(len(z) for z in item_zone_slots), "item_zones", lambda: (
+                    item_zone_slots[0] if len(item_zone_slots) == 1
+                    else self._ordered(warehouse, (slot_id for z in item_zone_slots for slot_id in z))
+                ), len(item_zone_slots) > 1))
+
+        if not options:
+            return "full_scan", warehouse.slots.keys(), len(warehouse.slots)
+        size, name, source, needs_sort = min(options, key=lambda option: option[0])
+        if needs_sort and size * 4 > len(warehouse.slots):
+            # Not selective enough to pay for sorting; every index predicate is re-checked anyway
+            return "full_scan", warehouse.slots.keys(), len(warehouse.slots)
+        return name, source(), size
+
+    def _min_capacity(self, item) -> Tuple[float, float]:
+        """Free volume and weight every match needs, from the free-capacity filters and the item"""
+        min_volume = self.min_free_volume or 0.0
+        min_weight = self.min_free_weight or 0.0
+        if item is not None:
+            min_volume = max(min_volume, item.volume * self.quantity)
+            min_weight = max(min_weight, item.weight * self.quantity)
+        return min_volume, min_weight
+
+    @staticmethod
+    def _ordered(warehouse: WarehouseData, slot_ids: Iterable[str]) -> List[str]:
+        return sorted(slot_ids, key=warehouse.slot_order)
+
+    def _compile(self, warehouse: WarehouseData, item) -> Callable[[Slot], bool]:
+        """Build one predicate from every filter that is set"""
+        checks: List[Callable[[Slot], bool]] = []
+
+        if self.zone is not None:
+            checks.append(lambda slot: slot.zone == self.zone)
+        if self.aisle_min is not None:
+            checks.append(lambda slot: slot.aisle >= self.aisle_min)
+        if self.aisle_max is not None:
+            checks.append(lambda slot: slot.aisle <= self.aisle_max)
+        if self.level is not None:
+            checks.append(lambda slot: slot.level == self.level)
+        if self.slot_type is not None:
+            checks.append(lambda slot: slot.slot_type == self.slot_type)
+        if self.status is not None:
+            checks.append(lambda slot: slot.status == self.status)
+        if self.available:
+            if item is None:
+                checks.append(lambda slot: slot.status == SlotStatus.EMPTY)
+            else:
+                checks.append(lambda slot: slot.status != SlotStatus.RESERVED)
+        if self.min_max_weight is not None:
+            checks.append(lambda slot: slot.max_weight >= self.min_max_weight)
+        if self.max_max_weight is not None:
+            checks.append(lambda slot: slot.max_weight <= self.max_max_weight)
+        if self.min_free_weight is not None:
+            checks.append(lambda slot: slot.remaining_weight >= self.min_free_weight)
+        if self.min_free_volume is not None:
+            checks.append(lambda slot: slot.remaining_volume >= self.min_free_volume)
+        for key, value in self.min_dimensions.items():
+            checks.append(lambda slot, key=key, value=value: slot.dimensions[key] >= value)
+        if item is not None:
+            allowed_zones = allowed_zones_for_item(item)
+            if allowed_zones:
+                checks.append(lambda slot: slot.zone in allowed_zones)
+            quantity = self.quantity
+            checks.append(lambda slot: warehouse._is_compatible(slot, item, quantity))
+
+        return lambda slot: all(check(slot) for check in checks)
+
+    def _sort_key(self, warehouse: WarehouseData, item) -> Optional[Callable[[Slot], Any]]:
+        """Combine sort keys; None means slot order, which allows stopping early"""
+        keys = list(self.sort_by)
+        if not keys:
+            return None
+
+        parts = []
+        for key in keys:
+            if key == "velocity":
+                velocity_class = warehouse.velocity.classify(item.item_id) if item is not None else None
+                if velocity_class == "A":
+                    parts.append((slot_travel_cost, False))
+                elif velocity_class == "C":
+                    parts.append((slot_travel_cost, True))
+                continue
+            descending = key.startswith("-")
+            parts.append((SORT_KEYS[key.lstrip("-")], descending))
+        if not parts:
+            return None
+
+        order = warehouse.slot_order
+
+        def sort_key(slot: Slot) -> Tuple:
+            values = []
+            for extract, descending in parts:
+                value = extract(slot)
+                values.append(_Reversed(value) if descending else value)
+            values.append(order(slot.slot_id))
+            return tuple(values)
+        return sort_key
+
+
+class _Reversed:
+    """Wrapper that inverts ordering so mixed ascending/descending keys share one tuple"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other: "_Reversed") -> bool:
+        return other.value < self.value
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Reversed) and other.value == self.value
@@ -0,0 +1,189 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from models import WarehouseData, warehouse
+
+
+DEFAULT_TTL_SECONDS = 300.0
+MAX_TTL_SECONDS = 24 * 3600.0
+
+# Expired holds are released in small batches so a mass expiry never stalls a request
+EXPIRY_BATCH_SIZE = 500
+EXPIRY_INTERVAL_SECONDS = 0.5
+
+
+def validate_ttl(ttl_seconds: Any) -> float:
+    """A hold's TTL as a float; raises ValueError unless it is a finite number of seconds in (0, MAX_TTL_SECONDS]"""
+    if isinstance(ttl_seconds, bool) or not isinstance(ttl_seconds, (int, float)) or not 0 < ttl_seconds <= MAX_TTL_SECONDS:
+        raise ValueError(f"ttl_seconds must be a number of seconds above 0 and at most {MAX_TTL_SECONDS:g}")
+    return float(ttl_seconds)
+
+
+class Reservation:
+    """A time-limited hold on a slot for an item or an external request ID"""
+
+    __slots__ = ("reservation_id", "slot_id", "holder", "item_id", "created_at", "expires_at")
+
+    def __init__(self, reservation_id: str, slot_id: str, holder: str, item_id: Optional[str],
+                 created_at: float, expires_at: float):
+        self.reservation_id = reservation_id
+        self.slot_id = slot_id
+        self.holder = holder
+        self.item_id = item_id
+        self.created_at = created_at
+        self.expires_at = expires_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "reservation_id": self.reservation_id,
+            "slot_id": self.slot_id,
+            "holder": self.holder,
+            "item_id": self.item_id,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at
+        }
+
+
+class ReservationManager:
+    """
+    Slot holds with TTLs, expired through a min-heap of deadlines.
+
+    Released, confirmed or renewed holds leave stale heap entries behind; they are skipped
+    when popped instead of being searched for, so every operation stays O(log n). Tools call
+    in from worker threads while the expiry loop runs on the event loop, so state changes
+    happen under one lock; it is never held while waiting for the journal.
+    """
+
+    def __init__(self, warehouse: WarehouseData):
+        self.warehouse = warehouse
+        self.by_id: Dict[str, Reservation] = {}
+        self.by_slot: Dict[str, str] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._ids = itertools.count(1)
+        self.expired_count = 0
+        self._lock = threading.RLock()
+
+    def reserve(self, slot_id: str, holder: str, item_id: Optional[str] = None,
+                ttl_seconds: float = DEFAULT_TTL_SECONDS) -> Reservation:
+        """Hold an empty slot; raises ValueError if it cannot be reserved"""
+        ttl_seconds = validate_ttl(ttl_seconds)
+        with self._lock:
+            return self._reserve(slot_id, holder, item_id, ttl_seconds)
+
+    def _reserve(self, slot_id: str, holder: str, item_id: Optional[str], ttl_seconds: float) -> Reservation:
+        self.expire_due(max_batch=64)
+        self.warehouse.hold_slot(slot_id, item_id)
+
+        now = time.time()
+        reservation = Reservation(f"RSV_{next(self._ids):06d}", slot_id, holder, item_id, now, now + ttl_seconds)
+        self.by_id[reservation.reservation_id] = reservation
+        self.by_slot[slot_id] = reservation.reservation_id
+        heapq.heappush(self._heap, (reservation.expires_at, reservation.reservation_id))
+        return reservation
+
+    def renew(self, reservation_id: str, ttl_seconds: float = DEFAULT_TTL_SECONDS) -> Reservation:
+        """Extend a live hold; the old heap entry goes stale"""
+        ttl_seconds = validate_ttl(ttl_seconds)
+        with self._lock:
+            reservation = self._live(reservation_id)
+            reservation.expires_at = time.time() + ttl_seconds
+            heapq.heappush(self._heap, (reservation.expires_at, reservation_id))
+            return reservation
+
+    def release(self, reservation_id: str) -> Reservation:
+        """Drop a hold and make the slot available again"""
+        with self._lock:
+            reservation = self._live(reservation_id)
+            self._drop(reservation)
+            return reservation
+
+    def confirm(self, reservation_id: str, item_id: Optional[str] = None) -> Reservation:
+        """Turn a hold into an assignment of the reserved (or given) item"""
+        # The assignment is journaled under the lock, but waited for after releasing it
+        with self._lock, self.warehouse.defer_durability():
+            reservation = self._confirm(reservation_id, item_id)
+        self.warehouse.wait_durable()
+        return reservation
+
+    def _confirm(self, reservation_id: str, item_id: Optional[str]) -> Reservation:
+        reservation = self._live(reservation_id)
+        item_id = item_id or reservation.item_id
+        if not item_id:
+            raise ValueError(f"Reservation {reservation_id} has no item; pass item_id to confirm")
+
+        # The slot goes straight from RESERVED to OCCUPIED; on failure the hold stays in place
+        if not self.warehouse.assign_item_to_slot(reservation.slot_id, item_id, reserved=True):
+            raise ValueError(f"Item {item_id} cannot be assigned to slot {reservation.slot_id}")
+        self._drop(reservation)
+        return reservation
+
+    def active(self) -> List[Reservation]:
+        """Snapshot of the live holds, taken under the lock the expiry thread mutates them with"""
+        with self._lock:
+            return list(self.by_id.values())
+
+    def get(self, reservation_id: str) -> Optional[Reservation]:
+        reservation = self.by_id.get(reservation_id)
+        if reservation is not None and reservation.expires_at <= time.time():
+            return None
+        return reservation
+
+    def for_slot(self, slot_id: str) -> Optional[Reservation]:
+        reservation_id = self.by_slot.get(slot_id)
+        return self.get(reservation_id) if reservation_id else None
+
+    def expire_due(self, now: Optional[float] = None, max_batch: int = EXPIRY_BATCH_SIZE) -> int:
+        """Pop at most ``max_batch`` due timers and release the holds that are still live"""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._expire_due(now, max_batch)
+
+    def _expire_due(self, now: float, max_batch: int) -> int:
+        heap = self._heap
+        expired = 0
+        for _ in range(max_batch):
+            if not heap or heap[0][0] > now:
+                break
+            expires_at, reservation_id = heapq.heappop(heap)
+            reservation = self.by_id.get(reservation_id)
+            if reservation is None or reservation.expires_at != expires_at:
+                continue  # released, confirmed or renewed since this entry was pushed
+            self._drop(reservation)
+            expired += 1
+        self.expired_count += expired
+        return expired
+
+    async def run_expiry_loop(self) -> None:
+        """Background task: drain due holds in batches, in a worker thread so the lock never stalls the loop"""
+        while True:
+            await asyncio.to_thread(self.expire_due)
+            while self._heap and self._heap[0][0] <= time.time():
+                await asyncio.to_thread(self.expire_due)
+            await asyncio.sleep(EXPIRY_INTERVAL_SECONDS)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": len(self.by_id),
+            "expired_total": self.expired_count,
+            "pending_timers": len(self._heap)
+        }
+
+    def _live(self, reservation_id: str) -> Reservation:
+        reservation = self.get(reservation_id)
+        if reservation is None:
+            raise ValueError(f"Reservation {reservation_id} not found or expired")
+        return reservation
+
+    def _drop(self, reservation: Reservation) -> None:
+        del self.by_id[reservation.reservation_id]
+        if self.by_slot.get(reservation.slot_id) == reservation.reservation_id:
+            del self.by_slot[reservation.slot_id]
+            self.warehouse.release_hold(reservation.slot_id)
+
+
+# Global reservation manager instance
+reservations = ReservationManager(warehouse)
@@ -0,0 +1,399 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from models import CAPACITY_EPSILON, Item, Slot, SlotStatus, allowed_zones_for_item, is_type_compatible
+from rules import slotting_rules
+from velocity import slot_travel_cost
+
+
+# Order in which items claim target slots: fast movers first
+CLASS_PRIORITY = {"A": 0, "B": 1, "C": 2, None: 3}
+# Progress goes through a Manager proxy (one IPC round trip per write), so it is published at most this often
+PROGRESS_INTERVAL_SECONDS = 0.1
+MAX_KEPT_JOBS = 50
+
+
+def snapshot_layout(warehouse) -> Dict[str, Any]:
+    """
+    Take a picklable copy of the current layout for the planner worker.
+
+    Every shard lock is held while copying, so the copy is one consistent layout; it walks
+    every slot, so call it off the event loop.
+    """
+    with warehouse.locked():
+        version = warehouse.version
+        slots = {slot_id: slot.model_copy(update={"contents": dict(slot.contents)})
+                 for slot_id, slot in warehouse.slots.items()}
+        items = {item_id: item.model_copy() for item_id, item in warehouse.items.items()}
+    velocity = warehouse.velocity
+    return {
+        "taken_at": time.time(),
+        "version": version,
+        "rules_version": slotting_rules.version,
+        "slots": slots,
+        "items": items,
+        "velocity_classes": {item_id: velocity.classify(item_id) for item_id in items},
+        "velocity_scores": {item_id: velocity.scores.get(item_id, 0.0) for item_id in items},
+        "rules": slotting_rules.config
+    }
+
+
+def movable_layout(slots: Dict[str, Slot]) -> Tuple[Dict[str, str], Set[str]]:
+    """
+    Split the layout into items the planner may relocate and slots it must leave alone.
+
+    Only an item that is the sole SKU of exactly one slot moves as a unit; mixed-SKU slots
+    and items spread over several slots are pinned where they are.
+    """
+    locations: Dict[str, List[str]] = {}
+    for slot_id, slot in slots.items():
+        for item_id in slot.contents:
+            locations.setdefault(item_id, []).append(slot_id)
+
+    current: Dict[str, str] = {}
+    pinned: Set[str] = set()
+    for slot_id, slot in slots.items():
+        if not slot.contents:
+            continue
+        if len(slot.contents) == 1:
+            item_id = next(iter(slot.contents))
+            if len(locations[item_id]) == 1:
+                current[item_id] = slot_id
+                continue
+        pinned.add(slot_id)
+    return current, pinned
+
+
+def fits_empty_slot(slot: Slot, item: Item, quantity: int) -> bool:
+    """Whether ``quantity`` units would fit the slot once it is emptied"""
+    return (is_type_compatible(slot, item)
+            and item.weight * quantity <= slot.max_weight + CAPACITY_EPSILON
+            and item.volume * quantity <= slot.volume + CAPACITY_EPSILON)
+
+
+def compute_target_layout(snapshot: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Compute the target item -> slot layout.
+
+    Items claim slots in velocity order. A movers take the cheapest compatible slot,
+    everyone else keeps their current slot unless a faster mover claimed it first.
+    """
+    slots: Dict[str, Slot] = snapshot["slots"]
+    items: Dict[str, Item] = snapshot["items"]
+    classes = snapshot["velocity_classes"]
+    scores = snapshot["velocity_scores"]
+
+    current, pinned = movable_layout(slots)
+    ordered_slots = sorted(
+        (slot for slot in slots.values() if slot.status != SlotStatus.RESERVED and slot.slot_id not in pinned),
+        key=slot_travel_cost
+    )
+    ordered_items = sorted(
+        (item_id for item_id in current if item_id in items),
+        key=lambda item_id: (CLASS_PRIORITY.get(classes.get(item_id), 3), -scores.get(item_id, 0.0), item_id)
+    )
+
+    claimed_by: Dict[str, str] = {}
+    target: Dict[str, str] = {}
+    homeless: List[str] = []
+    for item_id in ordered_items:
+        item = items[item_id]
+        allowed_zones = allowed_zones_for_item(item)
+        velocity_class = classes.get(item_id)
+        current_slot = current[item_id]
+        quantity = slots[current_slot].contents[item_id]
+
+        if velocity_class != "A" and current_slot not in claimed_by:
+            target[item_id] = current_slot
+            claimed_by[current_slot] = item_id
+            continue
+
+        candidates = ordered_slots if velocity_class != "C" else reversed(ordered_slots)
+        for slot in candidates:
+            if slot.slot_id in claimed_by:
+                continue
+            if allowed_zones and slot.zone not in allowed_zones:
+                continue
+            if fits_empty_slot(slot, item, quantity):
+                target[item_id] = slot.slot_id
+                claimed_by[slot.slot_id] = item_id
+                break
+        else:
+            homeless.append(item_id)
+
+    # A displaced item with nowhere to go reclaims its own slot; the claimer returns home,
+    # which may in turn evict whoever claimed that slot. Each item reverts at most once.
+    while homeless:
+        item_id = homeless.pop()
+        home = current[item_id]
+        evicted = claimed_by.get(home)
+        target[item_id] = home
+        claimed_by[home] = item_id
+        if evicted is not None and evicted != item_id:
+            homeless.append(evicted)
+
+    return target
+
+
+def plan_moves(snapshot: Dict[str, Any], target: Dict[str, str], progress: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Turn a target layout into a minimal ordered move sequence.
+
+    Chains are emitted as soon as their destination is free. Cycles (including swaps) are
+    broken by parking one item in a free buffer slot, costing exactly one extra move per cycle.
+    """
+    slots: Dict[str, Slot] = snapshot["slots"]
+    items: Dict[str, Item] = snapshot["items"]
+
+    location, pinned = movable_layout(slots)
+    quantities = {item_id: slots[slot_id].contents[item_id] for item_id, slot_id in location.items()}
+    occupant = {slot_id: item_id for item_id, slot_id in location.items()}
+    pending = {item_id for item_id, slot_id in target.items() if location.get(item_id) != slot_id}
+    total = len(pending) or 1
+    targeted = set(target.values())
+
+    moves: List[Dict[str, Any]] = []
+    unresolved: List[str] = []
+    published = time.monotonic()
+
+    def move(item_id: str, to_slot: str, buffer: bool = False) -> None:
+        from_slot = location[item_id]
+        moves.append({"item_id": item_id, "from_slot": from_slot, "to_slot": to_slot,
+                      "quantity": quantities[item_id], "buffer": buffer})
+        del occupant[from_slot]
+        occupant[to_slot] = item_id
+        location[item_id] = to_slot
+
+    # Items that can move right now: their destination is free
+    ready = [item_id for item_id in pending if target[item_id] not in occupant]
+    waiting_on: Dict[str, str] = {target[item_id]: item_id for item_id in pending}
+
+    while pending:
+        while ready:
+            item_id = ready.pop()
+            vacated = location[item_id]
+            move(item_id, target[item_id])
+            pending.discard(item_id)
+            follower = waiting_on.get(vacated)
+            if follower in pending:
+                ready.append(follower)
+            if progress is not None and time.monotonic() - published >= PROGRESS_INTERVAL_SECONDS:
+                progress["progress"] = round(0.5 + 0.5 * (1 - len(pending) / total), 3)
+                published = time.monotonic()
+
+        if not pending:
+            break
+
+        # Everything left sits on a cycle: park one item in a free buffer slot
+        item_id = min(pending)
+        item = items[item_id]
+        buffer_slot = next(
+            (slot_id for slot_id, slot in slots.items()
+             if slot_id not in occupant and slot_id not in targeted and slot_id not in pinned
+             and slot.status != SlotStatus.RESERVED and fits_empty_slot(slot, item, quantities[item_id])),
+            None
+        )
+        if buffer_slot is None:
+            # The whole cycle stays where it is
+            while item_id in pending:
+                pending.discard(item_id)
+                unresolved.append(item_id)
+                item_id = waiting_on.get(location[item_id])
+            continue
+        vacated = location[item_id]
+        move(item_id, buffer_slot, buffer=True)
+        follower = waiting_on.get(vacated)
+        if follower in pending:
+            ready.append(follower)
+
+    return {"moves": moves, "unresolved": unresolved}
+
+
+def run_reslotting_plan(snapshot: Dict[str, Any], progress: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Planner entry point executed inside the process pool"""
+    started = time.time()
+    if "rules" in snapshot and snapshot["rules"] != slotting_rules.config:
+        # Worker processes start with the default rules; plan with the ones the snapshot was taken under
+        slotting_rules.replace(snapshot["rules"])
+    if progress is not None:
+        progress["stage"] = "target_layout"
+        progress["progress"] = 0.0
+    target = compute_target_layout(snapshot)
+
+    if progress is not None:
+        progress["stage"] = "move_sequence"
+        progress["progress"] = 0.5
+    plan = plan_moves(snapshot, target, progress)
+
+    if progress is not None:
+        progress["stage"] = "done"
+        progress["progress"] = 1.0
+
+    relocated = sum(1 for move in plan["moves"] if not move["buffer"])
+    return {
+        "target_layout": target,
+        "moves": plan["moves"],
+        "unresolved": plan["unresolved"],
+        "summary": {
+            "items_considered": len(target),
+            "items_relocated": relocated,
+            "total_moves": len(plan["moves"]),
+            "buffer_moves": len(plan["moves"]) - relocated,
+            "snapshot_taken_at": snapshot["taken_at"],
+            "snapshot_version": snapshot.get("version"),
+            "snapshot_rules_version": snapshot.get("rules_version"),
+            "planning_seconds": round(time.time() - started, 4)
+        }
+    }
+
+
+class ReslottingJobManager:
+    """Runs re-slotting plans in a process pool so the API event loop is never blocked"""
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._snapshots: Optional[ThreadPoolExecutor] = None
+        self._manager = None
+        self._lock = threading.Lock()
+
+    def _ensure_pool(self) -> None:
+        if self._executor is None:
+            self._manager = multiprocessing.Manager()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            self._snapshots = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reslotting-snapshot")
+
+    def process_pool(self) -> ProcessPoolExecutor:
+        """The planner process pool, shared with CPU-bound tools"""
+        with self._lock:
+            self._ensure_pool()
+            return self._executor
+
+    def submit(self, warehouse) -> str:
+        """Queue a planning job; the warehouse is snapshotted in a worker thread; returns the job ID"""
+        with self._lock:
+            self._ensure_pool()
+            job_id = uuid.uuid4().hex[:12]
+            progress = self._manager.dict({"stage": "snapshot", "progress": 0.0})
+            job = {
+                "job_id": job_id,
+                "status": "queued",
+                "submitted_at": time.time(),
+                "finished_at": None,
+                "progress": progress,
+                "result": None,
+                "error": None,
+                "applied": False,
+                "applying": False
+            }
+            self.jobs[job_id] = job
+            self._prune()
+            self._snapshots.submit(self._start, job, warehouse)
+        return job_id
+
+    def _start(self, job: Dict[str, Any], warehouse) -> None:
+        """Snapshot thread: copy the layout under the shard locks, then hand it to the process pool"""
+        try:
+            snapshot = snapshot_layout(warehouse)
+            job["progress"]["stage"] = "queued"
+            future = self._executor.submit(run_reslotting_plan, snapshot, job["progress"])
+        except Exception as e:
+            job["finished_at"] = time.time()
+            job["error"] = str(e)
+            job["status"] = "failed"
+            return
+        job["status"] = "running"
+        future.add_done_callback(lambda f, job=job: self._finish(job, f))
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond MAX_KEPT_JOBS (lock held)"""
+        finished = [job for job in self.jobs.values() if job["finished_at"] is not None]
+        for job in sorted(finished, key=lambda job: job["finished_at"])[:max(0, len(self.jobs) - MAX_KEPT_JOBS)]:
+            del self.jobs[job["job_id"]]
+
+    def _finish(self, job: Dict[str, Any], future: Future) -> None:
+        job["finished_at"] = time.time()
+        try:
+            job["result"] = future.result()
+            job["status"] = "completed"
+        except Exception as e:
+            job["error"] = str(e)
+            job["status"] = "failed"
+
+    def get(self, job_id: str, include_moves: bool = True) -> Optional[Dict[str, Any]]:
+        """Return a JSON-friendly view of a job"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        try:
+            progress = dict(job["progress"])
+        except Exception:
+            progress = {"stage": job["status"], "progress": 1.0 if job["status"] == "completed" else 0.0}
+        view = {
+            "job_id": job_id,
+            "status": job["status"],
+            "stage": progress.get("stage"),
+            "progress": progress.get("progress"),
+            "submitted_at": job["submitted_at"],
+            "finished_at": job["finished_at"],
+            "error": job["error"],
+            "applied": job["applied"]
+        }
+        if job["result"] is not None:
+            view["summary"] = job["result"]["summary"]
+            view["unresolved"] = job["result"]["unresolved"]
+            if include_moves:
+                view["moves"] = job["result"]["moves"]
+        return view
+
+    def apply(self, job_id: str, warehouse, apply_moves: Callable[[List[Dict[str, Any]]], Dict[str, Any]]
+              ) -> Optional[Dict[str, Any]]:
+        """
+        Apply a completed plan once, against exactly the layout it was planned on.
+
+        Returns None for unknown jobs and raises ValueError if the job has no plan yet, was
+        already applied, or the warehouse or its rules changed since the snapshot (submit a
+        new job to re-plan). Every shard lock is held while the moves run, so nothing can drift in
+        between and strand an item in a buffer slot; call it off the event loop.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job["result"] is None:
+                raise ValueError(f"Job {job_id} is {job['status']}")
+            if job["applied"] or job["applying"]:
+                raise ValueError(f"Job {job_id} was already applied")
+            job["applying"] = True
+        try:
+            with warehouse.locked():
+                summary = job["result"]["summary"]
+                if (warehouse.version, slotting_rules.version) != (summary["snapshot_version"],
+                                                                   summary["snapshot_rules_version"]):
+                    raise ValueError(f"The warehouse or its rules changed since job {job_id} took its snapshot; "
+                                     f"submit a new job to re-plan")
+                result = apply_moves(job["result"]["moves"])
+            job["applied"] = result["success"]
+            return result
+        finally:
+            job["applying"] = False
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            # Workers already running still hold progress proxies, so let them finish
+            # before the manager that serves those proxies goes away.
+            self._snapshots.shutdown(wait=True, cancel_futures=True)
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._manager.shutdown()
+            self._executor = None
+            self._snapshots = None
+            self._manager = None
+
+
+# Global job manager instance
+reslotting_jobs = ReslottingJobManager()
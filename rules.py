@@ -0,0 +1,289 @@
+import asyncio
+import json
+import math
+import os
+import threading
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+
+# The historical hard-coded rules; used when no rules file is configured
+DEFAULT_RULES: Dict[str, Any] = {
+    "rules": [
+        {"name": "electronics-zone-a", "when": {"category": ["electronics"]}, "zones": ["A"]},
+        {"name": "frozen-cold-storage", "when": {"temperature_requirement": ["frozen"]},
+         "zones": ["B"], "slot_types": ["cold_storage"]},
+        {"name": "hazardous-hazmat", "when": {"is_hazardous": True}, "zones": ["C"], "slot_types": ["hazmat"]},
+        {"name": "chemicals-zone-c", "when": {"category": ["chemicals"]}, "zones": ["C"]}
+    ]
+}
+
+# Conditions on discrete attributes, compiled into one bitmask per attribute value
+CATEGORICAL_CONDITIONS = ("category", "temperature_requirement", "is_hazardous")
+# Conditions on unit weight (kg) and volume (cm3), checked only for rules that use them
+NUMERIC_CONDITIONS: Dict[str, Callable[[Any, float], bool]] = {
+    "min_weight": lambda item, bound: item.weight >= bound,
+    "max_weight": lambda item, bound: item.weight <= bound,
+    "min_volume": lambda item, bound: item.volume >= bound,
+    "max_volume": lambda item, bound: item.volume <= bound
+}
+RULE_KEYS = {"name", "when", "zones", "slot_types", "levels"}
+RELOAD_POLL_SECONDS = 2.0
+
+
+class Profile(NamedTuple):
+    """What the matching rules allow an item: None means unrestricted"""
+    zones: Optional[Tuple[str, ...]]
+    slot_types: Optional[FrozenSet[str]]
+    levels: Optional[FrozenSet[int]]
+    rules: Tuple[str, ...]
+
+    @property
+    def key(self) -> Tuple:
+        """Items with equal keys share candidate indexes"""
+        return self.zones, self.slot_types, self.levels
+
+    @property
+    def restricts_slots(self) -> bool:
+        return self.slot_types is not None or self.levels is not None
+
+    def allows_slot(self, slot) -> bool:
+        """Slot type and level checks (zones are a search-routing rule, as before)"""
+        if self.slot_types is not None and slot.slot_type.value not in self.slot_types:
+            return False
+        return self.levels is None or slot.level in self.levels
+
+
+UNRESTRICTED = Profile(None, None, None, ())
+
+
+def _categorical_value(item, attribute: str):
+    value = getattr(item, attribute, None)
+    return value.lower() if isinstance(value, str) else value
+
+
+class CompiledRules:
+    """
+    A rule set compiled into a decision table.
+
+    For every categorical attribute, each value maps to the bitmask of rules it satisfies
+    (rules without a condition on that attribute are always set), so an item's matching
+    rules are a few dict lookups and ANDs however many rules there are. Each distinct
+    match mask is then turned into a Profile once:
+
+    - zones: the first matching rule (in file order) that names zones decides
+    - slot types and levels: every matching rule that names them must be satisfied
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        rules = config.get("rules")
+        if not isinstance(rules, list):
+            raise ValueError("Rule config needs a 'rules' list")
+        self.rules = [_validate(rule, index) for index, rule in enumerate(rules)]
+        everything = (1 << len(self.rules)) - 1
+
+        self.value_masks: Dict[str, Dict[Any, int]] = {}
+        self.unconditioned: Dict[str, int] = {}
+        for attribute in CATEGORICAL_CONDITIONS:
+            masks: Dict[Any, int] = {}
+            unconditioned = everything
+            for bit, rule in enumerate(self.rules):
+                if attribute not in rule["when"]:
+                    continue
+                unconditioned &= ~(1 << bit)
+                values = rule["when"][attribute]
+                for value in values if isinstance(values, list) else [values]:
+                    value = value.lower() if isinstance(value, str) else value
+                    masks[value] = masks.get(value, 0) | (1 << bit)
+            self.value_masks[attribute] = masks
+            self.unconditioned[attribute] = unconditioned
+
+        self.numeric = [(bit, [(NUMERIC_CONDITIONS[name], bound) for name, bound in rule["when"].items()
+                               if name in NUMERIC_CONDITIONS])
+                        for bit, rule in enumerate(self.rules)
+                        if any(name in NUMERIC_CONDITIONS for name in rule["when"])]
+        self._profiles: Dict[int, Profile] = {}
+
+    def match_mask(self, item) -> int:
+        mask = (1 << len(self.rules)) - 1
+        for attribute in CATEGORICAL_CONDITIONS:
+            value = _categorical_value(item, attribute)
+            mask &= self.value_masks[attribute].get(value, 0) | self.unconditioned[attribute]
+            if not mask:
+                return 0
+        for bit, checks in self.numeric:
+            if mask >> bit & 1 and not all(check(item, bound) for check, bound in checks):
+                mask &= ~(1 << bit)
+        return mask
+
+    def profile(self, item) -> Profile:
+        mask = self.match_mask(item)
+        profile = self._profiles.get(mask)
+        if profile is None:
+            profile = self._profiles[mask] = self._build_profile(mask)
+        return profile
+
+    def _build_profile(self, mask: int) -> Profile:
+        if not mask:
+            return UNRESTRICTED
+        zones = slot_types = levels = None
+        names = []
+        for bit, rule in enumerate(self.rules):
+            if not mask >> bit & 1:
+                continue
+            names.append(rule["name"])
+            if zones is None and rule.get("zones"):
+                zones = tuple(rule["zones"])
+            if rule.get("slot_types") is not None:
+                allowed = frozenset(rule["slot_types"])
+                slot_types = allowed if slot_types is None else slot_types & allowed
+            if rule.get("levels") is not None:
+                allowed = frozenset(rule["levels"])
+                levels = allowed if levels is None else levels & allowed
+        return Profile(zones, slot_types, levels, tuple(names))
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _is_list_of(value: Any, check: Callable[[Any], bool]) -> bool:
+    return isinstance(value, list) and all(check(entry) for entry in value)
+
+
+def _validate(rule: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """Check a rule's keys and value types so a bad rule set is rejected before it is activated"""
+    from models import SlotType  # models imports this module
+
+    if not isinstance(rule, dict):
+        raise ValueError(f"Rule {index + 1} must be an object")
+    name = rule.get("name") or f"rule-{index + 1}"
+    if not isinstance(name, str):
+        raise ValueError(f"Rule {index + 1}: name must be a string")
+    unknown = set(rule) - RULE_KEYS
+    if unknown:
+        raise ValueError(f"Rule '{name}': unknown keys {sorted(unknown)}")
+    when = rule.get("when") or {}
+    if not isinstance(when, dict):
+        raise ValueError(f"Rule '{name}': when must be an object")
+    unknown = set(when) - set(CATEGORICAL_CONDITIONS) - set(NUMERIC_CONDITIONS)
+    if unknown:
+        raise ValueError(f"Rule '{name}': unknown conditions {sorted(unknown)}")
+    for condition, value in when.items():
+        if condition in NUMERIC_CONDITIONS:
+            if not _is_number(value):
+                raise ValueError(f"Rule '{name}': {condition} must be a number")
+        elif not (isinstance(value, (str, bool)) or _is_list_of(value, lambda entry: isinstance(entry, (str, bool)))):
+            raise ValueError(f"Rule '{name}': {condition} must be a string, a boolean or a list of them")
+    zones = rule.get("zones")
+    if zones is not None and not _is_list_of(zones, lambda zone: isinstance(zone, str)):
+        raise ValueError(f"Rule '{name}': zones must be a list of strings")
+    levels = rule.get("levels")
+    if levels is not None and not _is_list_of(levels, lambda level: isinstance(level, int) and not isinstance(level, bool)):
+        raise ValueError(f"Rule '{name}': levels must be a list of integers")
+    slot_types = rule.get("slot_types")
+    if slot_types is not None:
+        known = {slot_type.value for slot_type in SlotType}
+        if not _is_list_of(slot_types, lambda slot_type: slot_type in known):
+            raise ValueError(f"Rule '{name}': slot_types must be a list among {sorted(known)}")
+    return {**rule, "name": name, "when": when}
+
+
+class SlottingRules:
+    """
+    The active rule set, its per-item profile cache and hot reload.
+
+    Profiles are cached per item object, so a rule check on the hot path is one dict lookup;
+    ``update_item`` replaces the item object, which invalidates its entry.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self._compiled: Optional[CompiledRules] = None  # compiled on first use, after models has loaded
+        self.version = 1
+        self.source: Optional[str] = None
+        self.load_error: Optional[str] = None  # why the rules file was last rejected, until it loads
+        self._mtime: Optional[float] = None
+        self._items: Dict[str, Tuple[Any, Profile]] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[], Dict[str, int]]] = []
+
+    @property
+    def compiled(self) -> CompiledRules:
+        if self._compiled is None:
+            self._compiled = CompiledRules(self.config)
+        return self._compiled
+
+    def profile_for(self, item) -> Profile:
+        cached = self._items.get(item.item_id)
+        if cached is not None and cached[0] is item:
+            return cached[1]
+        profile = self.compiled.profile(item)
+        self._items[item.item_id] = (item, profile)
+        return profile
+
+    def add_listener(self, callback: Callable[[], Dict[str, int]]) -> None:
+        """Register a callback run after every reload (e.g. to refresh candidate indexes)"""
+        self._listeners.append(callback)
+
+    def replace(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Compile and activate a new rule set; raises ValueError and keeps the old one if invalid"""
+        compiled = CompiledRules(config)
+        with self._lock:
+            self.config = config
+            self._compiled = compiled
+            self._items = {}
+            self.version += 1
+        result: Dict[str, Any] = {"version": self.version, "rules": len(compiled.rules)}
+        for callback in self._listeners:
+            result.update(callback())
+        return result
+
+    def load_file(self, path: str) -> Optional[Dict[str, Any]]:
+        """Load rules from a JSON file if it exists; returns the reload summary"""
+        if not os.path.exists(path):
+            return None
+        mtime = os.stat(path).st_mtime
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        result = self.replace(config)
+        self.source = path
+        self._mtime = mtime
+        self.load_error = None
+        return result
+
+    def load_boot_file(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the rules file at startup. A broken file is logged and leaves the current (default)
+        rules active instead of failing startup; it is still watched, so fixing it takes effect.
+        """
+        try:
+            return self.load_file(path)
+        except (ValueError, OSError) as e:
+            self.source = path
+            self._mtime = os.stat(path).st_mtime if os.path.exists(path) else None
+            self.load_error = str(e)
+            print(f"❌ Slotting rules file {path!r} rejected, using rules version {self.version}: {e}")
+            return None
+
+    async def run_reload_loop(self) -> None:
+        """Background task: reload the rules file whenever it changes on disk"""
+        while True:
+            await asyncio.sleep(RELOAD_POLL_SECONDS)
+            if self.source is None or not os.path.exists(self.source):
+                continue
+            if os.stat(self.source).st_mtime != self._mtime:
+                try:
+                    # Compiling and refreshing candidate indexes walks the slots: keep it off the loop
+                    result = await asyncio.to_thread(self.load_file, self.source)
+                    print(f"Slotting rules reloaded: {result}")
+                except (ValueError, OSError) as e:
+                    self._mtime = os.stat(self.source).st_mtime  # report a broken edit once
+                    self.load_error = str(e)
+                    print(f"Slotting rules reload failed, keeping version {self.version}: {e}")
+
+    def describe(self) -> Dict[str, Any]:
+        return {"version": self.version, "source": self.source, "load_error": self.load_error, "config": self.config}
+
+
+# Global rule set; main loads the configured rules file at startup
+slotting_rules = SlottingRules(DEFAULT_RULES)
@@ -5,21 +5,48 @@ Simple runner script for the application
 """
 
 import uvicorn
+import subprocess
 import sys
 import os
 
+def profile_imports(top: int = 15):
+    """Print the slowest modules when importing the app in a fresh interpreter (-X importtime)"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "").split("|")]
+        except ValueError:
+            continue
+        if self_us.isdigit():
+            rows.append((int(cumulative_us), int(self_us), name))
+    if not rows:
+        print(f"❌ Could not profile imports: {completed.stderr.strip()[-500:]}")
+        return
+    total = max(rows)[0]
+    print(f"⏱️  Importing main took {total / 1000:.0f}ms")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for cumulative, self_time, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>10.1f}ms {self_time / 1000:>8.1f}ms  {name}")
+
 def main():
     """Run the FastAPI application"""
-    print("🏭 Starting OptSlot Agent - Warehouse Management System...")
-    print("📦 Initializing warehouse data...")
+    if "--profile-imports" in sys.argv:
+        profile_imports()
+        return
     
-    # Import to initialize warehouse data
-    from models import warehouse
-    print(f"✅ Warehouse initialized with {len(warehouse.slots)} slots and {len(warehouse.items)} items")
+    print("🏭 Starting OptSlot Agent - Warehouse Management System...")
+    print("📦 Warehouse data loads in the background; GET /api/ready reports when it is done")
     
     print("🚀 Starting web server...")
     print("🌐 Access the application at: http://localhost:8000")
     print("📊 API documentation at: http://localhost:8000/docs")
+    print("⏱️  Startup profile at: http://localhost:8000/api/startup")
     print("\nPress Ctrl+C to stop the server")
     print("-" * 50)
     
@@ -40,4 +67,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main() 
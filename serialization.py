@@ -0,0 +1,268 @@
+import gzip
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models import Item, Slot, WarehouseData
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON encoding
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: application/msgpack responses
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # optional: br content encoding
+    brotli = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+
+def dumps_json(value: Any) -> bytes:
+    """Encode to compact JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def msgpack_array_header(length: int) -> bytes:
+    """MessagePack array header, so cached element fragments can be concatenated"""
+    if length < 16:
+        return bytes([0x90 | length])
+    if length < 2 ** 16:
+        return b"\xdc" + length.to_bytes(2, "big")
+    return b"\xdd" + length.to_bytes(4, "big")
+
+
+def msgpack_map_header(length: int) -> bytes:
+    if length < 16:
+        return bytes([0x80 | length])
+    if length < 2 ** 16:
+        return b"\xde" + length.to_bytes(2, "big")
+    return b"\xdf" + length.to_bytes(4, "big")
+
+
+def slot_to_dict(warehouse: WarehouseData, slot: Slot) -> Dict[str, Any]:
+    """Public representation of a slot, with its primary item embedded"""
+    slot_info = {
+        "slot_id": slot.slot_id,
+        "zone": slot.zone,
+        "aisle": slot.aisle,
+        "level": slot.level,
+        "position": slot.position,
+        "slot_type": slot.slot_type.value,
+        "status": slot.status.value,
+        "assigned_item_id": slot.assigned_item_id,
+        "max_weight": slot.max_weight,
+        "dimensions": slot.dimensions,
+        "contents": slot.contents,
+        "remaining_weight": slot.remaining_weight,
+        "remaining_volume": slot.remaining_volume
+    }
+
+    # Add item info if assigned
+    if slot.assigned_item_id and slot.assigned_item_id in warehouse.items:
+        item = warehouse.items[slot.assigned_item_id]
+        slot_info["assigned_item"] = {
+            "item_id": item.item_id,
+            "name": item.name,
+            "category": item.category,
+            "weight": item.weight
+        }
+    return slot_info
+
+
+def item_to_dict(warehouse: WarehouseData, item: Item) -> Dict[str, Any]:
+    """Public representation of an item, with where it is stocked"""
+    # Check if item is assigned to a slot
+    assignment = warehouse._find_item_assignment(item.item_id)
+    assigned_slot = assignment.slot_id if assignment else None
+    locations = {
+        slot_id: warehouse.slots[slot_id].contents[item.item_id]
+        for slot_id in sorted(warehouse.item_slots.get(item.item_id, ()))
+    }
+    return {
+        "item_id": item.item_id,
+        "name": item.name,
+        "category": item.category,
+        "weight": item.weight,
+        "dimensions": item.dimensions,
+        "temperature_requirement": item.temperature_requirement,
+        "is_hazardous": item.is_hazardous,
+        "assigned_slot": assigned_slot,
+        "locations": locations
+    }
+
+
+class FragmentCache:
+    """
+    Pre-serialized per-record fragments for a list endpoint.
+
+    Each record is encoded once and reused until a warehouse mutation hook invalidates it.
+    A response body is the concatenation of cached fragments, and the assembled (and
+    compressed) bodies themselves are kept until anything in the list changes. Mutation
+    hooks run on writer threads while bodies are built, so fragments and bodies are only
+    stored if ``version`` has not moved since the build read it.
+    """
+
+    def __init__(self, key: str, records: Callable[[], Dict[str, Any]], to_dict: Callable[[Any], Dict[str, Any]],
+                 version: Callable[[], int]):
+        self.key = key
+        self._records = records
+        self._to_dict = to_dict
+        self._version = version
+        self._lock = threading.Lock()
+        self._json: Dict[str, bytes] = {}
+        self._msgpack: Dict[str, bytes] = {}
+        self._bodies: Dict[Tuple[str, str], bytes] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, record_id: Optional[str] = None) -> None:
+        """Drop one record's fragments (or all of them) and every assembled body"""
+        with self._lock:
+            if record_id is None:
+                self._json.clear()
+                self._msgpack.clear()
+            else:
+                self._json.pop(record_id, None)
+                self._msgpack.pop(record_id, None)
+            self._bodies.clear()
+
+    def _fragments(self, cache: Dict[str, bytes], encode: Callable[[Any], bytes], version: int) -> List[bytes]:
+        fragments = []
+        encoded = {}
+        for record_id, record in self._records().items():
+            fragment = cache.get(record_id)
+            if fragment is None:
+                self.misses += 1
+                fragment = encoded[record_id] = encode(self._to_dict(record))
+            else:
+                self.hits += 1
+            fragments.append(fragment)
+        self._store(cache, encoded, version)
+        return fragments
+
+    def _store(self, cache: Dict[Any, bytes], entries: Dict[Any, bytes], version: int) -> None:
+        # A write since ``version`` may already have invalidated what these were encoded from
+        with self._lock:
+            if entries and self._version() == version:
+                cache.update(entries)
+
+    def render(self, media_type: str, encoding: str) -> Tuple[bytes, str]:
+        """Response body and the content encoding actually applied"""
+        if encoding == "identity":
+            return self.body(media_type, encoding), encoding
+        raw = self.body(media_type, "identity")
+        if len(raw) < MIN_COMPRESS_BYTES:
+            return raw, "identity"
+        return self.body(media_type, encoding), encoding
+
+    def body(self, media_type: str, encoding: str) -> bytes:
+        """Full response body for a media type and content encoding"""
+        cache_key = (media_type, encoding)
+        cached = self._bodies.get(cache_key)
+        if cached is not None:
+            return cached
+
+        version = self._version()
+        if encoding != "identity":
+            body = compress(self.body(media_type, "identity"), encoding)
+        elif media_type == JSON_MEDIA_TYPE:
+            fragments = self._fragments(self._json, dumps_json, version)
+            body = b'{"' + self.key.encode() + b'":[' + b",".join(fragments) + b"]}"
+        else:
+            fragments = self._fragments(self._msgpack, msgpack.packb, version)
+            body = (msgpack_map_header(1) + msgpack.packb(self.key)
+                    + msgpack_array_header(len(fragments)) + b"".join(fragments))
+
+        self._store(self._bodies, {cache_key: body}, version)
+        return body
+
+    def stats(self) -> Dict[str, int]:
+        return {"fragments": len(self._json) + len(self._msgpack), "hits": self.hits, "misses": self.misses}
+
+
+class ListingCache:
+    """Slot and item list caches wired to the warehouse mutation hooks"""
+
+    def __init__(self, warehouse: WarehouseData):
+        self.warehouse = warehouse
+        self.slots = FragmentCache("slots", lambda: warehouse.slots,
+                                   lambda slot: slot_to_dict(warehouse, slot), lambda: warehouse.version)
+        self.items = FragmentCache("items", lambda: warehouse.items,
+                                   lambda item: item_to_dict(warehouse, item), lambda: warehouse.version)
+        warehouse.add_listener(self._on_change)
+
+    def _on_change(self, event: str, slot_id: Optional[str], item_id: Optional[str]) -> None:
+        if slot_id is not None:
+            self.slots.invalidate(slot_id)
+        if item_id is not None:
+            # Item fragments embed locations; slot fragments embed the primary item
+            self.items.invalidate(item_id)
+            if event == "item":
+                for holding_slot in self.warehouse.item_slots.get(item_id, ()):
+                    self.slots.invalidate(holding_slot)
+
+
+def _qvalues(header: str) -> Dict[str, float]:
+    """Token -> q-value from an Accept-style header; q=0 (or an invalid q) marks a refused token"""
+    weights: Dict[str, float] = {}
+    for part in header.split(","):
+        token, *params = (piece.strip() for piece in part.split(";"))
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if not 0.0 <= q <= 1.0:
+            q = 0.0
+        weights[token.lower()] = max(q, weights.get(token.lower(), 0.0))
+    return weights
+
+
+def negotiate(accept: Optional[str], accept_encoding: Optional[str]) -> Tuple[str, str]:
+    """Pick (media type, content encoding) from request headers, honouring q-values"""
+    media_type = JSON_MEDIA_TYPE
+    if accept and msgpack is not None:
+        accepted = _qvalues(accept)
+        msgpack_q = max(accepted.get(candidate, 0.0) for candidate in MSGPACK_MEDIA_TYPES)
+        json_q = max(accepted.get(JSON_MEDIA_TYPE, 0.0), accepted.get("application/*", 0.0), accepted.get("*/*", 0.0))
+        # An explicitly listed MessagePack type wins ties with JSON
+        if msgpack_q and msgpack_q >= json_q:
+            media_type = MSGPACK_MEDIA_TYPES[0]
+
+    encoding = "identity"
+    if accept_encoding:
+        offered = _qvalues(accept_encoding)
+        wildcard = offered.get("*", 0.0)
+        br_q = offered.get("br", wildcard) if brotli is not None else 0.0
+        gzip_q = offered.get("gzip", wildcard)
+        if br_q and br_q >= gzip_q:
+            encoding = "br"
+        elif gzip_q:
+            encoding = "gzip"
+    return media_type, encoding
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "identity":
+        return body
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=5)
@@ -0,0 +1,153 @@
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from models import warehouse
+
+
+MAX_TURNS = 20                      # turns kept per session
+MAX_TURN_CHARS = 2000               # longer messages are truncated before storing
+IDLE_TTL_SECONDS = 30 * 60
+MAX_SESSIONS = 10_000
+MAX_TOTAL_BYTES = 32 * 1024 * 1024  # approximate cap across all sessions
+SESSION_OVERHEAD_BYTES = 512        # rough fixed cost of a session object and its bookkeeping
+SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{1,64}")  # client-supplied IDs outside this get a fresh one
+
+# What the LLM sees: the resolved references plus the tail of the conversation, clipped
+SUMMARY_TURNS = 3
+SUMMARY_TURN_CHARS = 160
+
+
+class Session:
+    """One client's conversation: a bounded window of turns and the last item/slot it referred to"""
+
+    __slots__ = ("session_id", "turns", "last_item_id", "last_slot_id", "created_at", "last_seen", "size_bytes")
+
+    def __init__(self, session_id: str, now: float):
+        self.session_id = session_id
+        self.turns: Deque[Tuple[str, str]] = deque(maxlen=MAX_TURNS)
+        self.last_item_id: Optional[str] = None
+        self.last_slot_id: Optional[str] = None
+        self.created_at = now
+        self.last_seen = now
+        self.size_bytes = SESSION_OVERHEAD_BYTES + len(session_id)
+
+    def context_summary(self) -> str:
+        """Compact context for the LLM; its size does not grow with the conversation"""
+        lines = []
+        if self.last_item_id:
+            item = warehouse.items.get(self.last_item_id)
+            name = f" ({item.name})" if item else ""
+            lines.append(f"Last item discussed: {self.last_item_id}{name}")
+        if self.last_slot_id:
+            lines.append(f"Last slot discussed: {self.last_slot_id}")
+        for role, text in list(self.turns)[-SUMMARY_TURNS * 2:]:
+            text = " ".join(text.split())
+            if len(text) > SUMMARY_TURN_CHARS:
+                text = text[:SUMMARY_TURN_CHARS] + "..."
+            lines.append(f"{role}: {text}")
+        return "\n".join(lines)
+
+
+class SessionStore:
+    """
+    Conversation sessions with LRU, idle-TTL and memory-cap eviction.
+
+    Sessions live in an OrderedDict in access order, so the least recently used session
+    is always at the front. That same order is idle order, so expiring idle sessions and
+    enforcing the caps only ever pops from the front.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_ttl_seconds: float = IDLE_TTL_SECONDS,
+                 max_total_bytes: int = MAX_TOTAL_BYTES):
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_total_bytes = max_total_bytes
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.evicted = {"idle": 0, "lru": 0, "memory": 0}
+
+    def get(self, session_id: Optional[str] = None) -> Session:
+        """
+        Return the session for ``session_id``, creating it when missing.
+
+        A missing or malformed ID (anything but up to 64 lowercase hex characters) gets a new one.
+        """
+        if session_id and not SESSION_ID_PATTERN.fullmatch(session_id):
+            session_id = None
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = Session(session_id or uuid.uuid4().hex, now)
+                self._sessions[session.session_id] = session
+                self.total_bytes += session.size_bytes
+                self._evict(now, keep=session.session_id)
+            else:
+                self._sessions.move_to_end(session.session_id)
+            session.last_seen = now
+            return session
+
+    def record_turn(self, session: Session, user_message: str, response: str,
+                    item_id: Optional[str] = None, slot_id: Optional[str] = None) -> None:
+        """Append a user/assistant exchange and remember what it resolved to"""
+        with self._lock:
+            for role, text in (("user", user_message), ("assistant", response)):
+                text = text[:MAX_TURN_CHARS]
+                if len(session.turns) == session.turns.maxlen:
+                    dropped = session.turns[0][1]
+                    session.size_bytes -= len(dropped)
+                    if session.session_id in self._sessions:
+                        self.total_bytes -= len(dropped)
+                session.turns.append((role, text))
+                session.size_bytes += len(text)
+                if session.session_id in self._sessions:
+                    self.total_bytes += len(text)
+            if item_id:
+                session.last_item_id = item_id
+            if slot_id:
+                session.last_slot_id = slot_id
+            self._evict(time.time(), keep=session.session_id)
+
+    def drop(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            self.total_bytes -= session.size_bytes
+            return True
+
+    def _evict(self, now: float, keep: Optional[str] = None) -> None:
+        sessions = self._sessions
+        while sessions:
+            session_id, oldest = next(iter(sessions.items()))
+            if session_id == keep:
+                break
+            if now - oldest.last_seen > self.idle_ttl_seconds:
+                reason = "idle"
+            elif len(sessions) > self.max_sessions:
+                reason = "lru"
+            elif self.total_bytes > self.max_total_bytes:
+                reason = "memory"
+            else:
+                break
+            sessions.popitem(last=False)
+            self.total_bytes -= oldest.size_bytes
+            self.evicted[reason] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "total_bytes": self.total_bytes,
+            "max_total_bytes": self.max_total_bytes,
+            "evicted": dict(self.evicted)
+        }
+
+
+# Global session store instance
+sessions = SessionStore()
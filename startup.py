@@ -0,0 +1,74 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+
+def _process_age_seconds() -> Optional[float]:
+    """Seconds since this process started (Linux only), to include interpreter start-up"""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfile:
+    """
+    Cold-start timeline for the web app.
+
+    Import this module first: the clock starts at its import. ``mark`` closes a phase that
+    ran since the previous mark (e.g. the app's imports), ``phase`` times a block, and
+    ``mark_ready`` stamps the moment the app can serve traffic.
+    """
+
+    def __init__(self):
+        self.process_age_at_import = _process_age_seconds()
+        self.started = time.perf_counter()
+        self._last_mark = self.started
+        self.phases: List[Dict[str, Any]] = []
+        self.ready_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def mark(self, name: str) -> None:
+        now = time.perf_counter()
+        self.phases.append({"phase": name, "seconds": round(now - self._last_mark, 4)})
+        self._last_mark = now
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.phases.append({"phase": name, "seconds": round(now - started, 4)})
+            self._last_mark = now
+
+    def mark_ready(self) -> None:
+        self.ready_at = time.perf_counter()
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "interpreter_seconds": round(self.process_age_at_import, 4) if self.process_age_at_import is not None else None,
+            "time_to_ready_seconds": round(self.ready_at - self.started, 4) if self.ready else None,
+            "phases": list(self.phases)
+        }
+
+    def summary_line(self) -> str:
+        phases = ", ".join(f"{phase['phase']} {phase['seconds'] * 1000:.0f}ms" for phase in self.phases)
+        total = f"{(self.ready_at - self.started) * 1000:.0f}ms" if self.ready else "not ready"
+        return f"Startup: {total} to ready ({phases})"
+
+
+# Global startup profile, started when this module is first imported
+startup_profile = StartupProfile()
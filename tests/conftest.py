@@ -0,0 +1,30 @@
+import os
+import time
+
+import pytest
+
+from models import warehouse
+
+
+@pytest.fixture(scope="session")
+def loaded_warehouse():
+    """The global warehouse with the built-in sample data, as the tools see it"""
+    warehouse.load()
+    return warehouse
+
+
+@pytest.fixture(scope="session")
+def client(loaded_warehouse, tmp_path_factory):
+    """The API over the global warehouse, without a journal, snapshots or a rules file"""
+    os.environ.update(OPTISLOT_JOURNAL_DIR="", OPTISLOT_SNAPSHOT_DIR="", OPTISLOT_RULES_FILE="",
+                      OPTISLOT_EXPORT_DIR=str(tmp_path_factory.mktemp("exports")))
+    os.environ.pop("OPENAI_API_KEY", None)
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        for _ in range(200):
+            if client.get("/api/ready").status_code == 200:
+                break
+            time.sleep(0.01)
+        yield client
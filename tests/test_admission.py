@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, Overloaded, ReadCoalescer
+from models import Item, SlotStatus, WarehouseData
+
+LIMITS = {"read": (1, 1), "chat": (1, 1), "write": (1, 1)}
+
+
+def test_overflowing_a_lane_sheds_with_retry_after_and_spares_other_lanes():
+    controller = AdmissionController(LIMITS, max_wait=1.0)
+    release = asyncio.Event()
+    outcomes = []
+
+    async def request(traffic_class):
+        try:
+            async with controller.admit(traffic_class):
+                await release.wait()
+            outcomes.append((traffic_class, "served"))
+        except Overloaded as e:
+            outcomes.append((traffic_class, e.retry_after))
+
+    async def scenario():
+        running = asyncio.ensure_future(request("read"))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(request("read"))
+        await asyncio.sleep(0)
+        await request("read")  # the lane is full and so is its queue
+        writer = asyncio.ensure_future(request("write"))
+        await asyncio.sleep(0)
+        assert controller.stats()["write"]["running"] == 1
+        release.set()
+        await asyncio.gather(running, queued, writer)
+
+    asyncio.run(scenario())
+
+    assert outcomes[0] == ("read", 1)
+    assert sorted(outcomes[1:]) == [("read", "served"), ("read", "served"), ("write", "served")]
+    assert controller.stats()["read"]["rejected"] == 1
+    assert controller.stats()["read"]["admitted"] == 2
+
+
+def test_a_request_that_waits_too_long_in_the_queue_is_shed():
+    controller = AdmissionController(LIMITS, max_wait=0.05)
+
+    async def scenario():
+        async with controller.admit("chat"):
+            with pytest.raises(Overloaded) as shed:
+                async with controller.admit("chat"):
+                    pass
+        return shed.value
+
+    shed = asyncio.run(scenario())
+    assert shed.traffic_class == "chat" and shed.retry_after >= 1
+    assert controller.stats()["chat"]["waiting"] == 0
+
+
+def test_shed_requests_get_429_with_a_retry_after_header(client, monkeypatch):
+    import main
+
+    controller = AdmissionController({"read": (1, 0), "chat": (1, 0), "write": (1, 0)})
+    asyncio.run(controller._lane("read").semaphore.acquire())  # one read already in flight
+    monkeypatch.setattr(main, "admission", controller)
+
+    response = client.get("/api/warehouse/status")
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert client.get("/api/ready").status_code == 200  # probes bypass admission
+    assert client.post("/api/tools/get_warehouse_status", json={}).status_code == 200
+
+
+@pytest.fixture
+def coalescer():
+    warehouse = WarehouseData()
+    warehouse.add_item(Item(item_id="RC_ITEM", name="Probe", category="Test", weight=1.0,
+                            dimensions={"length": 10, "width": 10, "height": 10}))
+    return warehouse, ReadCoalescer(warehouse)
+
+
+def test_concurrent_identical_reads_share_one_computation(coalescer):
+    warehouse, cache = coalescer
+    calls = []
+
+    async def compute():
+        calls.append(warehouse.version)
+        await asyncio.sleep(0.01)
+        return {"success": True, "calls": len(calls)}
+
+    async def scenario():
+        first = await asyncio.gather(*(cache.get(("status",), compute) for _ in range(5)))
+        again = await cache.get(("status",), compute)
+        other = await cache.get(("status", "zone B"), compute)
+        return first, again, other
+
+    first, again, other = asyncio.run(scenario())
+
+    assert len(calls) == 2
+    assert all(result is first[0] for result in first + [again])
+    assert other["calls"] == 2
+    assert cache.stats() == {"entries": 2, "inflight": 0, "hits": 1, "coalesced": 4, "computed": 2}
+
+
+def test_a_write_invalidates_cached_and_in_flight_reads(coalescer):
+    warehouse, cache = coalescer
+    slot_id = next(slot.slot_id for slot in warehouse.slots.values() if slot.status == SlotStatus.EMPTY)
+    calls = []
+
+    async def compute():
+        calls.append(warehouse.version)
+        if len(calls) == 1:
+            await asyncio.sleep(0)
+            warehouse.assign_item_to_slot(slot_id, "RC_ITEM")  # lands mid-computation
+        return {"success": True, "calls": len(calls)}
+
+    async def scenario():
+        during = await cache.get("status", compute)
+        after = await cache.get("status", compute)
+        cached = await cache.get("status", compute)
+        warehouse.remove_item_from_slot(slot_id, "RC_ITEM")
+        return during, after, cached, await cache.get("status", compute)
+
+    during, after, cached, removed = asyncio.run(scenario())
+
+    assert [result["calls"] for result in (during, after, cached, removed)] == [1, 2, 2, 3]
+
+
+def test_uncacheable_results_and_cancelled_waiters(coalescer):
+    _, cache = coalescer
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"success": len(calls) > 1}
+
+    async def scenario():
+        leaving = asyncio.ensure_future(cache.get("k", compute, lambda result: result["success"]))
+        staying = asyncio.ensure_future(cache.get("k", compute, lambda result: result["success"]))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        failed = await staying
+        return failed, await cache.get("k", compute, lambda result: result["success"])
+
+    failed, retried = asyncio.run(scenario())
+
+    assert failed == {"success": False}  # the shared computation survived the cancelled caller
+    assert retried == {"success": True}  # and its failure was not cached
+    assert len(calls) == 2
@@ -0,0 +1,100 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import agent as agent_module
+from agent import WarehouseAgent
+from models import SlotStatus
+from tools import AVAILABLE_TOOLS, tool_is_read_only
+
+
+class StubCompletions:
+    """Stands in for the OpenAI client: records each request and answers with canned tool calls"""
+
+    def __init__(self, tool_calls=(), content=None, error=None):
+        self.tool_calls = [SimpleNamespace(function=SimpleNamespace(name=name, arguments=arguments))
+                           for name, arguments in tool_calls]
+        self.content = content
+        self.error = error
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        if self.error is not None:
+            raise self.error
+        message = SimpleNamespace(content=self.content, tool_calls=self.tool_calls or None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def stub_llm(monkeypatch, loaded_warehouse):
+    def install(**answer):
+        completions = StubCompletions(**answer)
+        monkeypatch.setattr(agent_module, "_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+        return completions
+    return install
+
+
+def _plan(message):
+    return asyncio.run(WarehouseAgent()._plan_with_tools(message, None))
+
+
+def test_confidence_needs_an_action_and_every_resolved_parameter():
+    confident = WarehouseAgent()._is_confident
+
+    assert not confident({"action": None, "parameters": {}})
+    assert not confident({"action": "change_slot_assignment",
+                          "parameters": {"slot_id": "A-01-01-02", "item_id": None, "item_description": "widget"}})
+    assert confident({"action": "change_slot_assignment",
+                      "parameters": {"slot_id": "A-01-01-02", "item_id": "ITEM_001", "item_description": "laptop"}})
+    assert confident({"action": "get_warehouse_status", "parameters": {}})
+
+
+def test_one_llm_call_offers_only_read_tools_and_runs_their_calls(stub_llm):
+    completions = stub_llm(tool_calls=[("find_available_slots", json.dumps({"zone": "B", "limit": 2})),
+                                       ("get_warehouse_status", "{}")])
+
+    result, parameters = _plan("what is free in zone B and how full are we?")
+
+    [request] = completions.requests
+    offered = {tool["function"]["name"] for tool in request["tools"]}
+    assert offered == {name for name, spec in AVAILABLE_TOOLS.items() if tool_is_read_only(spec)}
+    assert result["success"] and result["llm_calls"] == 1
+    assert [call["tool"] for call in result["tool_calls"]] == ["find_available_slots", "get_warehouse_status"]
+    assert parameters == {}
+
+
+def test_mutating_tool_calls_from_the_model_are_refused(stub_llm, loaded_warehouse):
+    slot_id = next(slot.slot_id for slot in loaded_warehouse.slots.values() if slot.status == SlotStatus.EMPTY)
+    version = loaded_warehouse.version
+    stub_llm(tool_calls=[("change_slot_assignment", json.dumps({"slot_id": slot_id, "item_id": "ITEM_001"}))])
+
+    result, _ = _plan(f"put the laptop somewhere sensible like {slot_id}")
+
+    assert not result["success"]
+    assert "explicit command" in result["response"]
+    assert loaded_warehouse.slots[slot_id].status == SlotStatus.EMPTY
+    assert loaded_warehouse.version == version
+
+
+def test_malformed_arguments_and_api_errors_fail_the_turn(stub_llm):
+    stub_llm(tool_calls=[("find_available_slots", "{not json")])
+    result, _ = _plan("find me something")
+    assert not result["success"]
+    assert "Invalid arguments" in result["response"]
+
+    stub_llm(error=RuntimeError("rate limited"))
+    result, _ = _plan("find me something")
+    assert result["response"] == "[OpenAI API error: rate limited]"
+
+
+def test_confident_router_match_skips_the_llm(stub_llm, monkeypatch):
+    completions = stub_llm(error=AssertionError("the LLM should not be called"))
+    monkeypatch.setattr(agent_module, "AGENT_MODE", "function_calling")
+
+    result = asyncio.run(WarehouseAgent().process_message_async("show warehouse status"))
+
+    assert result["success"] and result["llm_calls"] == 0
+    assert completions.requests == []
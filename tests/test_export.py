@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+import time
+
+import export
+from export import DATASETS, ExportJobManager, UtilizationAccumulator, iter_file, iter_rows
+from models import SlotStatus, WarehouseData
+
+
+def _wait(manager, job_id):
+    for _ in range(500):
+        job = manager.get(job_id)
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"export job {job_id} did not finish")
+
+
+def test_csv_stream_has_a_header_and_one_row_per_slot(client, loaded_warehouse):
+    response = client.get("/api/exports/stream/slots?format=csv")
+
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == [name for name, _ in DATASETS["slots"]]
+    assert len(rows) - 1 == len(loaded_warehouse.slots)
+    assert client.get("/api/exports/stream/slots?format=parquet").status_code == 400
+
+
+def test_jsonl_item_rows_count_locations_across_zones(client, loaded_warehouse):
+    response = client.get("/api/exports/stream/items?format=jsonl")
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["item_id"] for record in records] == list(loaded_warehouse.items)
+    for record in records:
+        held_in = list(loaded_warehouse.item_slots.get(record["item_id"], ()))
+        assert record["slots"] == len(held_in)
+        assert record["units"] == sum(loaded_warehouse.slots[slot_id].contents[record["item_id"]]
+                                      for slot_id in held_in)
+
+
+def test_utilization_groups_add_up_with_and_without_numpy(monkeypatch):
+    warehouse = WarehouseData()
+    report = UtilizationAccumulator()
+    for _ in iter_rows(warehouse, "slots", report):
+        pass
+    monkeypatch.setattr(export, "numpy", None)
+    fallback = UtilizationAccumulator()
+    for _ in iter_rows(warehouse, "slots", fallback):
+        pass
+
+    totals = report.report()
+    assert totals == fallback.report()
+    [everything] = totals["all"]
+    assert everything["slots"] == len(warehouse.slots)
+    assert everything["occupied"] == len(warehouse.slots_by_status[SlotStatus.OCCUPIED])
+    assert sum(row["slots"] for row in totals["zone"]) == len(warehouse.slots)
+    assert sum(row["used_volume"] for row in totals["slot_type"]) == everything["used_volume"]
+    assert {row["key"] for row in totals["aisle"]} >= {"A-01", "C-01"}
+
+
+def test_pruning_a_job_does_not_cut_an_open_download_short(tmp_path, monkeypatch):
+    warehouse = WarehouseData()
+    manager = ExportJobManager(str(tmp_path), max_workers=1)
+    try:
+        first = manager.submit(warehouse, "slots", "csv")
+        assert _wait(manager, first)["status"] == "completed"
+        handle, filename, media_type, size = manager.open_artifact(first)
+        assert (filename, media_type) == (f"slots-{first}.csv", "text/csv")
+
+        monkeypatch.setattr(export, "MAX_KEPT_JOBS", 1)
+        _wait(manager, manager.submit(warehouse, "items", "jsonl"))
+        with manager._lock:
+            manager._prune()
+        assert manager.get(first) is None
+        assert manager.open_artifact(first) is None
+
+        body = b"".join(iter_file(handle))
+        assert handle.closed
+        assert len(body) == size
+        assert body.count(b"\n") == len(warehouse.slots) + 1
+    finally:
+        manager.shutdown()
+
+
+def test_download_serves_the_completed_artifact(client):
+    job_id = client.post("/api/exports", json={"dataset": "assignments", "format": "csv", "compress": True}).json()["job_id"]
+    for _ in range(500):
+        response = client.get(f"/api/exports/{job_id}/download")
+        if response.status_code != 409:
+            break
+        time.sleep(0.01)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert f"assignments-{job_id}.csv.gz" in response.headers["content-disposition"]
+    assert int(response.headers["content-length"]) == len(response.content)
+    assert client.get("/api/exports/missing/download").status_code == 404
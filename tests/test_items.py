@@ -0,0 +1,30 @@
+def test_patch_ignores_item_id_in_body(client, loaded_warehouse):
+    weight = loaded_warehouse.items["ITEM_006"].weight
+
+    response = client.patch("/api/warehouse/items/ITEM_006", json={"item_id": "ITEM_999", "weight": weight + 1})
+
+    assert response.status_code == 200, response.text
+    assert response.json()["item"]["item_id"] == "ITEM_006"
+    assert loaded_warehouse.items["ITEM_006"].weight == weight + 1
+    assert "ITEM_999" not in loaded_warehouse.items
+    client.patch("/api/warehouse/items/ITEM_006", json={"weight": weight})
+
+
+def test_patch_merges_partial_dimensions(client, loaded_warehouse):
+    before = dict(loaded_warehouse.items["ITEM_006"].dimensions)
+    slot = loaded_warehouse.slots["A-01-02-01"]  # holds ITEM_006 in the sample data
+    free_volume = slot.remaining_volume
+
+    response = client.patch("/api/warehouse/items/ITEM_006", json={"dimensions": {"length": 1}})
+
+    assert response.status_code == 200, response.text
+    assert response.json()["item"]["dimensions"] == {**before, "length": 1}
+    assert slot.remaining_volume > free_volume
+    client.patch("/api/warehouse/items/ITEM_006", json={"dimensions": before})
+    assert slot.remaining_volume == free_volume
+
+
+def test_patch_rejects_invalid_values(client):
+    response = client.patch("/api/warehouse/items/ITEM_006", json={"dimensions": {"length": "long"}})
+    assert response.status_code == 400
+    assert client.patch("/api/warehouse/items/ITEM_404", json={"weight": 1}).status_code == 404
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+
+from journal import SNAPSHOT_NAME, AssignmentJournal, encode_record
+from models import SlotStatus, WarehouseData
+
+
+def _open(directory, **kwargs):
+    warehouse = WarehouseData()
+    journal = AssignmentJournal(str(directory), fsync=False, **kwargs)
+    journal.attach(warehouse)
+    return warehouse, journal
+
+
+def _empty_slot_for(warehouse, item_id):
+    return next(slot.slot_id for slot in warehouse.find_suitable_slots_for_item(item_id)
+                if slot.status == SlotStatus.EMPTY)
+
+
+def _segment(journal):
+    return journal._segment_path(journal.generation)
+
+
+def test_replay_restores_moves_and_removals(tmp_path):
+    warehouse, journal = _open(tmp_path)
+    target = _empty_slot_for(warehouse, "ITEM_005")
+    assert warehouse.assign_item_to_slot(target, "ITEM_005", 2)
+    assert warehouse.unassign_item("ITEM_001")
+    journal.close()
+
+    restored, journal = _open(tmp_path)
+    assert journal.replayed > 0
+    assert restored.slots[target].contents == {"ITEM_005": 2}
+    assert not restored.item_slots.get("ITEM_001")
+    assert restored.slots["A-01-01-01"].status == SlotStatus.EMPTY
+    journal.close()
+
+
+def test_torn_and_corrupt_tail_is_truncated(tmp_path):
+    warehouse, journal = _open(tmp_path)
+    target = _empty_slot_for(warehouse, "ITEM_005")
+    assert warehouse.assign_item_to_slot(target, "ITEM_005")
+    journal.close()
+    path = _segment(journal)
+    good_size = os.path.getsize(path)
+
+    # A record with a bad checksum followed by a torn one, as a crash mid-write leaves behind
+    corrupt = bytearray(encode_record(target, "ITEM_005", 7, 0.0))
+    corrupt[-1] ^= 0xFF
+    with open(path, "ab") as f:
+        f.write(bytes(corrupt) + encode_record(target, "ITEM_005", 9, 0.0)[:10])
+
+    restored = WarehouseData()
+    AssignmentJournal(str(tmp_path), fsync=False).recover(restored)
+    assert os.path.getsize(path) == good_size
+    assert restored.slots[target].contents == {"ITEM_005": 1}
+
+    restored, journal = _open(tmp_path)
+
+    # New records follow the last good one and replay after the next restart
+    assert restored.add_item_to_slot(target, "ITEM_005")
+    journal.close()
+    restored, journal = _open(tmp_path)
+    assert restored.slots[target].contents == {"ITEM_005": 2}
+    journal.close()
+
+
+def test_compaction_snapshots_state_and_drops_old_segments(tmp_path):
+    warehouse, journal = _open(tmp_path)
+    first_generation = journal.generation
+    target = _empty_slot_for(warehouse, "ITEM_005")
+    assert warehouse.assign_item_to_slot(target, "ITEM_005", 2)
+
+    result = journal.compact()
+
+    assert result["generation"] == first_generation + 1
+    assert result["segments_removed"] >= 1
+    assert [generation for generation, _ in journal._segments()] == [result["generation"]]
+    assert os.path.exists(tmp_path / SNAPSHOT_NAME)
+    assert journal.stats()["compactions"] >= 2  # attach pins the recovered state with one
+    journal.close()
+
+    restored, journal = _open(tmp_path)
+    assert journal.replayed == 0  # everything came from the snapshot
+    assert restored.slots[target].contents == {"ITEM_005": 2}
+    journal.close()
+
+
+def test_failed_background_compaction_is_reported_in_stats(tmp_path, monkeypatch):
+    warehouse, journal = _open(tmp_path)
+
+    def fail():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(journal, "compact", fail)
+    journal._compact_wanted.set()
+    for _ in range(100):
+        if journal.stats()["compaction_failures"]:
+            break
+        time.sleep(0.01)
+
+    stats = journal.stats()
+    assert stats["compaction_failures"] == 1
+    assert stats["last_error"] == "Compaction failed: disk full"
+    journal.close()
+
+
+def test_compaction_rotates_segments_outside_the_shard_locks(tmp_path, monkeypatch):
+    warehouse, journal = _open(tmp_path)
+    target = _empty_slot_for(warehouse, "ITEM_005")
+    open_segment = journal._open_segment
+    writes = []
+
+    def write_while_rotating():
+        with warehouse.defer_durability():
+            writes.append(warehouse.assign_item_to_slot(target, "ITEM_005", 2))
+
+    def open_segment_with_concurrent_write(generation):
+        # A writer must get its shard lock while the old segment is closed and the new one opened
+        writer = threading.Thread(target=write_while_rotating)
+        writer.start()
+        writer.join(timeout=5)
+        assert writes == [True]
+        open_segment(generation)
+
+    monkeypatch.setattr(journal, "_open_segment", open_segment_with_concurrent_write)
+    journal.compact()
+    journal.close()
+
+    restored, journal = _open(tmp_path)
+    assert journal.replayed >= 1  # the concurrent write follows the snapshot in the new segment
+    assert restored.slots[target].contents == {"ITEM_005": 2}
+    journal.close()
@@ -0,0 +1,57 @@
+import pytest
+
+from query import SlotQuery
+from tools import find_available_slots
+
+
+def _brute_force(warehouse, query):
+    item = warehouse.items.get(query.item_id) if query.item_id else None
+    predicate = query._compile(warehouse, item)
+    return [slot.slot_id for slot in warehouse.slots.values() if predicate(slot)]
+
+
+@pytest.mark.parametrize("filters, index", [
+    ({"available": True, "item_id": "ITEM_003"}, "eligible"),  # hazmat slots in zone C only
+    ({"min_free_weight": 40.0}, "capacity"),  # only oversized slots take 50 kg
+    ({"zone": "B", "aisle_min": "02", "aisle_max": "02"}, "aisle"),
+    ({"zone": "C", "slot_type": "hazmat", "level": 3}, "slot_type"),
+    ({"status": "occupied"}, "status"),
+])
+def test_planner_picks_the_selective_index_and_matches_a_full_scan(loaded_warehouse, filters, index):
+    query = SlotQuery(**filters, limit=None)
+
+    result = query.execute(loaded_warehouse, count_total=True)
+
+    assert result["plan"]["index"] == index
+    assert [slot.slot_id for slot in result["slots"]] == _brute_force(loaded_warehouse, query)
+    assert result["total"] == len(result["slots"])
+
+
+def test_capacity_estimate_bounds_the_matches(loaded_warehouse):
+    # 26 kg falls in the same log2 bucket as the 20-25 kg zone A and B slots, which can never match
+    matches = loaded_warehouse.find_slots_with_capacity(min_volume=1000.0, min_weight=26.0)
+
+    assert matches
+    assert all(slot.remaining_weight >= 26.0 for slot in matches)
+    assert len(matches) <= loaded_warehouse.estimate_slots_with_capacity(1000.0, 26.0) < len(loaded_warehouse.slots) // 2
+
+
+def test_limit_stops_the_scan_without_a_total(loaded_warehouse):
+    result = SlotQuery(available=True, item_id="ITEM_005", limit=2).execute(loaded_warehouse)
+
+    assert len(result["slots"]) == 2
+    assert result["total"] is None
+    assert result["plan"]["scanned"] < len(loaded_warehouse.slots) // 2
+
+
+def test_find_available_slots_pages_in_slot_order_by_default(loaded_warehouse):
+    result = find_available_slots(item_id="ITEM_005", limit=3)
+
+    assert result["success"]
+    assert result["total_slots"] is None
+    assert result["message"].startswith("Found at least 3 available slots")
+    slot_ids = [slot["slot_id"] for slot in result["slots"]]
+    assert slot_ids == sorted(slot_ids, key=loaded_warehouse.slot_order)
+
+    counted = find_available_slots(item_id="ITEM_005", limit=3, include_total=True)
+    assert counted["total_slots"] > 3
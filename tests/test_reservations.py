@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from models import SlotStatus
+from reservations import reservations
+from tools import reserve_slot
+
+
+def test_reserve_by_item_picks_an_empty_slot(loaded_warehouse):
+    # ITEM_001 already sits in A-01-01-01, which is still a suitable (partly filled) slot for it
+    assert loaded_warehouse.slots["A-01-01-01"].status == SlotStatus.OCCUPIED
+
+    result = reserve_slot(holder="x", item_id="ITEM_001")
+
+    assert result["success"], result["message"]
+    slot_id = result["reservation"]["slot_id"]
+    assert slot_id != "A-01-01-01"
+    assert loaded_warehouse.slots[slot_id].status == SlotStatus.RESERVED
+    reservations.release(result["reservation"]["reservation_id"])
+    assert loaded_warehouse.slots[slot_id].status == SlotStatus.EMPTY
+
+
+def test_model_refuses_reserved_slots_until_confirmed(loaded_warehouse):
+    reservation = reservations.reserve("A-03-02-01", "x")
+    try:
+        assert not loaded_warehouse.assign_item_to_slot("A-03-02-01", "ITEM_005")
+        assert not loaded_warehouse.add_item_to_slot("A-03-02-01", "ITEM_005")
+        assert loaded_warehouse.slots["A-03-02-01"].status == SlotStatus.RESERVED
+
+        with pytest.raises(ValueError):
+            reservations.confirm(reservation.reservation_id, "ITEM_002")  # furniture does not fit a bay of it
+        assert loaded_warehouse.slots["A-03-02-01"].status == SlotStatus.RESERVED
+
+        reservations.confirm(reservation.reservation_id, "ITEM_005")
+        assert loaded_warehouse.slots["A-03-02-01"].contents == {"ITEM_005": 1}
+        assert reservations.get(reservation.reservation_id) is None
+    finally:
+        if reservations.get(reservation.reservation_id):
+            reservations.release(reservation.reservation_id)
+        loaded_warehouse.assign_item_to_slot("A-02-01-01", "ITEM_005")
+
+
+def test_concurrent_reserve_and_assign_never_both_win(loaded_warehouse):
+    slot = loaded_warehouse.slots["A-03-02-02"]
+    for _ in range(50):
+        start = threading.Barrier(2)
+        outcome = {}
+
+        def reserve():
+            start.wait()
+            try:
+                outcome["reservation"] = reservations.reserve(slot.slot_id, "x")
+            except ValueError:
+                outcome["reservation"] = None
+
+        def assign():
+            start.wait()
+            outcome["assigned"] = loaded_warehouse.assign_item_to_slot(slot.slot_id, "ITEM_006")
+
+        threads = [threading.Thread(target=reserve), threading.Thread(target=assign)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert (outcome["reservation"] is None) == outcome["assigned"]
+        if outcome["assigned"]:
+            assert slot.status == SlotStatus.OCCUPIED
+            loaded_warehouse.assign_item_to_slot("A-01-02-01", "ITEM_006")
+        else:
+            assert slot.status == SlotStatus.RESERVED and not slot.contents
+            reservations.release(outcome["reservation"].reservation_id)
+        assert slot.status == SlotStatus.EMPTY
+
+
+@pytest.mark.parametrize("ttl", ["60", "", 0, -5, 1e9, True, [60]])
+def test_invalid_ttls_are_rejected(client, ttl):
+    response = client.post("/api/reservations", json={"holder": "x", "slot_id": "A-03-02-03", "ttl_seconds": ttl})
+
+    assert response.status_code == 400, response.text
+    assert client.get("/api/reservations").json()["reservations"] == []
+
+
+def test_non_finite_ttls_are_rejected():
+    for ttl in (float("inf"), float("nan")):
+        with pytest.raises(ValueError):
+            reservations.reserve("A-03-02-03", "x", ttl_seconds=ttl)
+
+
+def test_listed_reservations_carry_the_requested_ttl(client):
+    response = client.post("/api/reservations", json={"holder": "x", "slot_id": "A-03-02-03", "ttl_seconds": 30})
+    reservation = response.json()["reservation"]
+    try:
+        assert reservation["expires_at"] - reservation["created_at"] == pytest.approx(30)
+        listed = client.get("/api/reservations").json()["reservations"]
+        assert [entry["reservation_id"] for entry in listed] == [reservation["reservation_id"]]
+    finally:
+        reservations.release(reservation["reservation_id"])
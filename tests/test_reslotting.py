@@ -0,0 +1,111 @@
+import pytest
+
+from models import Item, Slot, SlotStatus, SlotType
+from reslotting import ReslottingJobManager, compute_target_layout, plan_moves
+
+
+def _slot(slot_id, contents=None, status=None):
+    zone, aisle, level, position = slot_id.split("-")
+    return Slot(slot_id=slot_id, zone=zone, aisle=aisle, level=int(level), position=int(position),
+                slot_type=SlotType.STANDARD, max_weight=25.0, dimensions={"length": 80, "width": 60, "height": 100},
+                status=status or (SlotStatus.OCCUPIED if contents else SlotStatus.EMPTY), contents=contents or {})
+
+
+def _item(item_id):
+    return Item(item_id=item_id, name=item_id, category="General", weight=1.0,
+                dimensions={"length": 10, "width": 10, "height": 10})
+
+
+def _snapshot(slots, classes=None, scores=None):
+    slots = {slot.slot_id: slot for slot in slots}
+    items = {item_id: _item(item_id) for slot in slots.values() for item_id in slot.contents}
+    return {"taken_at": 0.0, "slots": slots, "items": items,
+            "velocity_classes": classes or {}, "velocity_scores": scores or {}}
+
+
+def _replay(snapshot, moves):
+    """Where every item ends up after the moves, checking each lands in a free slot"""
+    occupant = {slot_id: next(iter(slot.contents)) for slot_id, slot in snapshot["slots"].items() if slot.contents}
+    for move in moves:
+        assert occupant.get(move["from_slot"]) == move["item_id"]
+        assert move["to_slot"] not in occupant
+        occupant[move["to_slot"]] = occupant.pop(move["from_slot"])
+    return {item_id: slot_id for slot_id, item_id in occupant.items()}
+
+
+def test_fast_movers_claim_the_cheapest_slot_and_displace_slow_ones():
+    snapshot = _snapshot([_slot("A-01-01-01", {"SLOW": 1}), _slot("A-02-01-01"), _slot("A-04-03-05", {"FAST": 1})],
+                         classes={"FAST": "A", "SLOW": "C"}, scores={"FAST": 10.0})
+
+    target = compute_target_layout(snapshot)
+
+    assert target["FAST"] == "A-01-01-01"
+    assert target["SLOW"] != "A-01-01-01"
+
+
+def test_chain_moves_vacate_each_destination_first():
+    snapshot = _snapshot([_slot("A-01-01-01", {"X": 1}), _slot("A-01-01-02", {"Y": 1}), _slot("A-01-01-03")])
+    target = {"X": "A-01-01-02", "Y": "A-01-01-03"}
+
+    plan = plan_moves(snapshot, target)
+
+    assert [move["item_id"] for move in plan["moves"]] == ["Y", "X"]
+    assert not any(move["buffer"] for move in plan["moves"])
+    assert _replay(snapshot, plan["moves"]) == target
+
+
+def test_swap_is_broken_with_one_buffer_move():
+    snapshot = _snapshot([_slot("A-01-01-01", {"X": 1}), _slot("A-01-01-02", {"Y": 1}), _slot("A-01-01-03")])
+    target = {"X": "A-01-01-02", "Y": "A-01-01-01"}
+
+    plan = plan_moves(snapshot, target)
+
+    assert len(plan["moves"]) == 3
+    assert [move["to_slot"] for move in plan["moves"] if move["buffer"]] == ["A-01-01-03"]
+    assert _replay(snapshot, plan["moves"]) == target
+    assert plan["unresolved"] == []
+
+
+def test_cycle_without_a_free_buffer_stays_put():
+    # The only free slot is reserved, so there is nowhere to park an item
+    snapshot = _snapshot([_slot("A-01-01-01", {"X": 1}), _slot("A-01-01-02", {"Y": 1}), _slot("A-01-01-03", {"Z": 1}),
+                          _slot("A-01-01-04", status=SlotStatus.RESERVED)])
+    target = {"X": "A-01-01-02", "Y": "A-01-01-03", "Z": "A-01-01-01"}
+
+    plan = plan_moves(snapshot, target)
+
+    assert plan["moves"] == []
+    assert sorted(plan["unresolved"]) == ["X", "Y", "Z"]
+
+
+def _completed_job(manager, snapshot_version, rules_version):
+    manager.jobs["job"] = {
+        "job_id": "job", "status": "completed", "submitted_at": 0.0, "finished_at": 0.0, "progress": {},
+        "error": None, "applied": False, "applying": False,
+        "result": {"moves": [], "unresolved": [], "summary": {"snapshot_version": snapshot_version,
+                                                              "snapshot_rules_version": rules_version}}
+    }
+
+
+def test_plan_is_applied_once_and_only_while_current(loaded_warehouse):
+    from rules import slotting_rules
+
+    manager = ReslottingJobManager()
+    applied = []
+
+    def apply_moves(moves):
+        applied.append(moves)
+        return {"success": True}
+
+    assert manager.apply("missing", loaded_warehouse, apply_moves) is None
+
+    _completed_job(manager, loaded_warehouse.version - 1, slotting_rules.version)
+    with pytest.raises(ValueError, match="changed since"):
+        manager.apply("job", loaded_warehouse, apply_moves)
+    assert applied == [] and not manager.jobs["job"]["applied"]
+
+    _completed_job(manager, loaded_warehouse.version, slotting_rules.version)
+    assert manager.apply("job", loaded_warehouse, apply_moves) == {"success": True}
+    with pytest.raises(ValueError, match="already applied"):
+        manager.apply("job", loaded_warehouse, apply_moves)
+    assert len(applied) == 1
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import rules as rules_module
+from rules import DEFAULT_RULES, CompiledRules, SlottingRules
+
+
+@pytest.mark.parametrize("rule", [
+    {"when": {"min_weight": "5"}, "levels": [1]},
+    {"when": {"max_volume": float("nan")}, "levels": [1]},
+    {"when": {"min_weight": True}, "levels": [1]},
+    {"when": {"category": 5}, "zones": ["A"]},
+    {"when": {"category": ["tools", None]}, "zones": ["A"]},
+    {"when": ["category"], "zones": ["A"]},
+    {"when": {"category": ["tools"]}, "zones": "A"},
+    {"when": {"category": ["tools"]}, "zones": [1]},
+    {"when": {"category": ["tools"]}, "levels": ["1"]},
+    {"when": {"category": ["tools"]}, "slot_types": "hazmat"},
+    "not a rule"
+])
+def test_badly_typed_rules_are_rejected_and_the_active_set_kept(rule):
+    rules = SlottingRules(DEFAULT_RULES)
+    with pytest.raises(ValueError):
+        rules.replace({"rules": [rule]})
+    assert rules.version == 1
+    assert rules.config is DEFAULT_RULES
+
+
+def test_well_typed_rules_compile():
+    compiled = CompiledRules({"rules": [
+        {"name": "heavy-low", "when": {"min_weight": 20, "is_hazardous": False}, "levels": [1]},
+        {"when": {"category": "tools", "max_volume": 1.5e4}, "zones": ["A", "B"], "slot_types": ["standard"]}
+    ]})
+    assert [rule["name"] for rule in compiled.rules] == ["heavy-low", "rule-2"]
+
+
+def test_malformed_rules_file_at_boot_falls_back_to_defaults_until_fixed(tmp_path, monkeypatch):
+    path = tmp_path / "rules.json"
+    path.write_text('{"rules": [')
+    rules = SlottingRules(DEFAULT_RULES)
+
+    assert rules.load_boot_file(str(path)) is None
+    assert rules.config is DEFAULT_RULES
+    assert rules.describe()["load_error"]
+
+    path.write_text(json.dumps({"rules": [{"when": {"category": "tools"}, "levels": [1]}]}))
+    os.utime(path, (1, 1))  # a different mtime, however coarse the filesystem clock
+    monkeypatch.setattr(rules_module, "RELOAD_POLL_SECONDS", 0.01)
+
+    async def reload_once():
+        watcher = asyncio.ensure_future(rules.run_reload_loop())
+        for _ in range(200):
+            if rules.version > 1:
+                break
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+
+    asyncio.run(reload_once())
+    assert rules.version == 2
+    assert rules.describe()["load_error"] is None
+    assert rules.source == str(path)
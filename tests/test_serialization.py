@@ -0,0 +1,46 @@
+import json
+
+import serialization
+from serialization import JSON_MEDIA_TYPE, FragmentCache, negotiate
+
+
+def test_zero_q_encodings_are_refused():
+    assert negotiate(None, "gzip;q=0") == ("application/json", "identity")
+    assert negotiate(None, "gzip, *;q=0") == ("application/json", "gzip")
+    assert negotiate(None, "deflate, gzip;q=0.5") == ("application/json", "gzip")
+
+
+def test_encoding_preference_follows_q(monkeypatch):
+    monkeypatch.setattr(serialization, "brotli", object())
+    assert negotiate(None, "gzip, br") == ("application/json", "br")
+    assert negotiate(None, "gzip;q=1.0, br;q=0.5") == ("application/json", "gzip")
+    assert negotiate(None, "br;q=0, *") == ("application/json", "gzip")
+
+
+def test_media_type_preference_follows_q(monkeypatch):
+    monkeypatch.setattr(serialization, "msgpack", object())
+    assert negotiate("application/msgpack", None)[0] == "application/msgpack"
+    assert negotiate("application/json, application/msgpack;q=0.1", None)[0] == "application/json"
+    assert negotiate("application/msgpack;q=0", None)[0] == "application/json"
+    assert negotiate("application/x-msgpack, */*;q=0.8", None)[0] == "application/msgpack"
+
+
+def test_write_during_build_is_not_cached():
+    records = {"a": {"n": 1}, "b": {"n": 1}}
+    version = [0]
+
+    def to_dict(record):
+        encoded = dict(record)
+        if version[0] == 0:
+            # A writer thread lands after this record was read, before the build stores anything
+            records["a"]["n"] = 2
+            version[0] += 1
+            cache.invalidate("a")
+        return encoded
+
+    cache = FragmentCache("things", lambda: records, to_dict, lambda: version[0])
+
+    assert json.loads(cache.body(JSON_MEDIA_TYPE, "identity")) == {"things": [{"n": 1}, {"n": 1}]}
+    assert json.loads(cache.body(JSON_MEDIA_TYPE, "identity")) == {"things": [{"n": 2}, {"n": 1}]}
+    assert cache.stats() == {"fragments": 2, "hits": 0, "misses": 4}
+    assert json.loads(cache.body(JSON_MEDIA_TYPE, "identity")) == {"things": [{"n": 2}, {"n": 1}]}
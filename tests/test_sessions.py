@@ -0,0 +1,71 @@
+import sessions as sessions_module
+from sessions import SESSION_OVERHEAD_BYTES, SessionStore
+
+
+def test_least_recently_used_session_is_evicted_first():
+    store = SessionStore(max_sessions=2)
+    first = store.get("aa")
+    store.get("bb")
+    store.get(first.session_id)  # touch, so "bb" is now the oldest
+    store.get("cc")
+
+    assert set(store._sessions) == {"aa", "cc"}
+    assert store.stats()["evicted"]["lru"] == 1
+
+
+def test_idle_sessions_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sessions_module.time, "time", lambda: now[0])
+    store = SessionStore(idle_ttl_seconds=60)
+    store.get("aa")
+    now[0] += 30
+    store.get("bb")
+    now[0] += 45  # "aa" idle for 75s, "bb" for 45s
+
+    store.get("cc")
+
+    assert set(store._sessions) == {"bb", "cc"}
+    assert store.stats()["evicted"]["idle"] == 1
+
+
+def test_memory_cap_evicts_oldest_and_keeps_the_active_session():
+    store = SessionStore(max_total_bytes=3 * SESSION_OVERHEAD_BYTES)
+    old = store.get("aa")
+    active = store.get("bb")
+    store.record_turn(old, "x" * 300, "y" * 300)
+
+    store.record_turn(active, "x" * 400, "y" * 400)
+
+    assert list(store._sessions) == ["bb"]
+    assert store.stats()["evicted"]["memory"] == 1
+    assert store.total_bytes == active.size_bytes
+
+
+def test_size_accounting_counts_the_session_id_and_drops_back_to_zero():
+    store = SessionStore()
+    session = store.get("ab" * 32)
+    assert session.size_bytes == SESSION_OVERHEAD_BYTES + 64
+    store.record_turn(session, "hello", "hi")
+    assert store.total_bytes == SESSION_OVERHEAD_BYTES + 64 + len("hello") + len("hi")
+
+    assert store.drop(session.session_id)
+    assert store.total_bytes == 0
+
+
+def test_malformed_session_ids_get_a_fresh_id():
+    store = SessionStore()
+    for bad in ("x" * 10_000, "../etc", "ABCDEF", "a" * 65):
+        session = store.get(bad)
+        assert session.session_id != bad
+        assert len(session.session_id) == 32
+    assert store.get("0123abcd").session_id == "0123abcd"
+
+
+def test_sessions_endpoint_does_not_list_session_ids(client):
+    response = client.post("/chat", data={"user_message": "help"})
+    session_id = response.json()["session_id"]
+
+    body = client.get("/api/sessions").json()
+
+    assert body["stats"]["sessions"] >= 1
+    assert session_id not in str(body)
@@ -0,0 +1,146 @@
+import sys
+import threading
+
+import pytest
+
+from models import Item, SlotStatus, WarehouseData
+from rules import Profile
+
+
+def _item(item_id):
+    return Item(item_id=item_id, name=item_id, category="Test", weight=1.0,
+                dimensions={"length": 10, "width": 10, "height": 10})
+
+
+def _empty(warehouse, zone, count):
+    return [slot.slot_id for slot in warehouse.slots_by_zone[zone].values() if slot.status == SlotStatus.EMPTY][:count]
+
+
+def _check_indexes(warehouse):
+    for shard in warehouse.ordered_shards():
+        for status, slot_ids in shard.slots_by_status.items():
+            assert all(shard.slots[slot_id].status == status for slot_id in slot_ids)
+        assert sum(len(slot_ids) for slot_ids in shard.slots_by_status.values()) == len(shard.slots)
+        for item_id, slot_ids in shard.item_slots.items():
+            assert all(item_id in shard.slots[slot_id].contents for slot_id in slot_ids)
+
+
+def test_slots_are_routed_to_their_zone_shard_and_merged_in_slot_order():
+    warehouse = WarehouseData()
+
+    assert [shard.zone for shard in warehouse.ordered_shards()] == ["A", "B", "C"]
+    assert warehouse.shard_for("B-01-01-01").zone == "B"
+    with pytest.raises(KeyError):
+        warehouse.shard_for("Z-01-01-01")
+    assert "Z-01-01-01" not in warehouse.slots
+    assert len(warehouse.slots) == sum(len(shard.slots) for shard in warehouse.ordered_shards())
+    assert list(warehouse.slots) == sorted(warehouse.slots, key=warehouse._slot_order.__getitem__)
+
+    level_one = warehouse.slots_by_level[1]
+    assert len(level_one) == sum(len(shard.slots_by_level[1]) for shard in warehouse.ordered_shards())
+    assert all(warehouse.slots[slot_id].level == 1 for slot_id in level_one)
+
+
+def test_locked_takes_shard_locks_in_shard_order():
+    warehouse = WarehouseData()
+    acquired = []
+
+    class RecordingLock:
+        def __init__(self, zone, lock):
+            self.zone, self.lock = zone, lock
+
+        def acquire(self):
+            acquired.append(self.zone)
+            return self.lock.acquire()
+
+        def release(self):
+            self.lock.release()
+
+    for shard in warehouse.ordered_shards():
+        shard.lock = RecordingLock(shard.zone, shard.lock)
+
+    with warehouse.locked(["C", "A", "Z"]):
+        pass
+    assert acquired == ["A", "C"]
+    acquired.clear()
+    with warehouse.locked():
+        pass
+    assert acquired == ["A", "B", "C"]
+
+
+def test_concurrent_writes_within_and_across_zones_keep_indexes_consistent():
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    warehouse = WarehouseData()
+    for item_id in ("T_A", "T_C", "T_AC"):
+        warehouse.add_item(_item(item_id))
+    a_slots, c_slots = _empty(warehouse, "A", 3), _empty(warehouse, "C", 3)
+    routes = {"T_A": a_slots[:2], "T_C": c_slots[:2], "T_AC": [a_slots[2], c_slots[2]]}
+    errors = []
+
+    def move(item_id, slot_ids):
+        try:
+            for index in range(300):
+                warehouse.assign_item_to_slot(slot_ids[index % 2], item_id)
+        except Exception as exc:  # surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=move, args=route) for route in routes.items()]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert errors == []
+    for item_id, slot_ids in routes.items():
+        assert set(warehouse.item_slots[item_id]) == {slot_ids[1]}
+        assert warehouse.slots[slot_ids[0]].status == SlotStatus.EMPTY
+    _check_indexes(warehouse)
+
+
+def test_refresh_eligible_swaps_indexes_while_readers_build_them():
+    warehouse = WarehouseData()
+    shard = warehouse.shards["A"]
+    profiles = [Profile(None, frozenset({"standard"}), frozenset({level}), ()) for level in (1, 2, 3)]
+    errors = []
+    stop = threading.Event()
+
+    def read():
+        try:
+            while not stop.is_set():
+                for profile in profiles:
+                    assert all(shard.slots[slot_id].level in profile.levels
+                               for slot_id in shard.eligible_slots(profile))
+        except Exception as exc:
+            errors.append(exc)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for index in range(500):
+            keep = profiles[index % 3]
+            kept, built, dropped = shard.refresh_eligible({keep.key: keep})
+            assert keep.key in shard.eligible and shard.eligible[keep.key]
+    finally:
+        stop.set()
+        reader.join()
+
+    assert errors == []
+    assert kept + built == 1
+
+
+def test_refresh_eligible_never_mutates_a_mapping_readers_may_hold():
+    warehouse = WarehouseData()
+    shard = warehouse.shards["A"]
+    old, new = (Profile(None, None, frozenset({level}), ()) for level in (1, 2))
+    shard.eligible_slots(old)
+    held = shard.eligible
+    snapshot = dict(held)
+
+    assert shard.refresh_eligible({new.key: new}) == (0, 1, 1)
+
+    assert held == snapshot
+    assert list(shard.eligible) == [new.key]
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from models import Item, SlotStatus, WarehouseData
+from timeseries import OccupancyTimeSeries
+
+BASE = 3600.0 * 500_000  # hour-aligned, so second/minute/hour buckets line up
+
+
+def test_closed_buckets_downsample_into_coarser_rings():
+    seconds = OccupancyTimeSeries._new_rings()
+    minutes = seconds.coarser
+    for offset in range(180):
+        seconds.observe(BASE + offset, float(offset))
+
+    points = minutes.points(BASE, BASE + 180)
+
+    assert points[:2] == [(BASE, 0.0, 59.0, 29.5), (BASE + 60, 60.0, 119.0, 89.5)]
+    assert points[2][:2] == (BASE + 120, 120.0)  # open bucket: closed seconds so far
+    assert minutes.coarser.points(BASE, BASE + 180) == [(BASE, 0.0, 119.0, 59.5)]
+
+
+def test_gauge_holds_its_value_through_unsampled_buckets():
+    ring = OccupancyTimeSeries._new_rings()
+    ring.observe(BASE, 5.0)
+    ring.observe(BASE + 4, 7.0)
+
+    assert [point[3] for point in ring.points(BASE, BASE + 4)] == [5.0, 5.0, 5.0, 5.0, 7.0]
+    assert ring.points(BASE + 2, BASE + 3) == [(BASE + 2, 5.0, 5.0, 5.0), (BASE + 3, 5.0, 5.0, 5.0)]
+
+
+@pytest.fixture
+def recorded():
+    warehouse = WarehouseData()
+    warehouse.add_item(Item(item_id="TS_ITEM", name="Probe", category="Test", weight=1.0,
+                            dimensions={"length": 10, "width": 10, "height": 10}))
+    history = OccupancyTimeSeries(warehouse)
+    history.attach()
+    empty = next(slot.slot_id for slot in warehouse.slots_by_zone["A"].values() if slot.status == SlotStatus.EMPTY)
+    return warehouse, history, empty
+
+
+def test_range_query_aggregates_the_recorded_change(recorded):
+    warehouse, history, slot_id = recorded
+    now = time.time()
+    before = history.query("zone:A", "occupied", now - 5, now + 5)["aggregate"]["max"]
+    other = history.query("zone:B", "occupied", now - 5, now + 5)["aggregate"]
+
+    warehouse.assign_item_to_slot(slot_id, "TS_ITEM")
+    result = history.query("zone:A", "occupied", now - 5, time.time() + 5)
+
+    assert result["resolution"] == "second"
+    assert result["aggregate"]["max"] == before + 1
+    assert history.query("zone:B", "occupied", now - 5, time.time() + 5)["aggregate"] == other
+    assert history.query("zone:A", "occupied", now + 60, now + 120)["aggregate"] is None
+    assert history.query("all", "occupied", now - 7200, now)["resolution"] == "minute"
+
+
+def test_unknown_series_metric_or_resolution_is_rejected(recorded):
+    _, history, _ = recorded
+    for args in (("zone:Z", "occupied"), ("all", "weight"), ("all", "occupied", "day")):
+        with pytest.raises(ValueError):
+            history.query(args[0], args[1], 0, time.time(), *args[2:])
+
+
+def test_writers_do_not_wait_for_the_recorder(recorded):
+    warehouse, history, slot_id = recorded
+    before = history.counters["zone:A"]["occupied"]
+    history._lock.acquire()
+    try:
+        writer = threading.Thread(target=warehouse.assign_item_to_slot, args=(slot_id, "TS_ITEM"))
+        writer.start()
+        writer.join(timeout=2)
+        assert not writer.is_alive()
+    finally:
+        history._lock.release()
+
+    assert history.counters["zone:A"]["occupied"] == before  # queued until the next tick or query
+    history.sample()
+    assert history.counters["zone:A"]["occupied"] == len(warehouse.shards["A"].slots_by_status[SlotStatus.OCCUPIED])
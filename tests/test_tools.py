@@ -0,0 +1,111 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import tools
+from tools import ToolRunner
+
+
+def _pid_and_square(value):
+    return {"success": True, "pid": os.getpid(), "square": value * value}
+
+
+def _register(monkeypatch, name, function, **spec):
+    monkeypatch.setitem(tools.AVAILABLE_TOOLS, name, {"function": function, "description": name,
+                                                      "parameters": {}, **spec})
+
+
+def _sleeper(seconds):
+    def sleep():
+        time.sleep(seconds)
+        return {"success": True}
+    return sleep
+
+
+def test_running_call_past_its_timeout_is_reported_and_counted(monkeypatch):
+    _register(monkeypatch, "slow_tool", _sleeper(0.3), kind="io", timeout=0.05)
+    runner = ToolRunner(process_pool=None)
+    try:
+        result = asyncio.run(runner.run("slow_tool"))
+    finally:
+        runner.shutdown()
+
+    assert result["timed_out"] and not result["success"]
+    assert result["message"].endswith("while running")
+    assert runner.summary()["slow_tool"]["timeouts"] == 1
+
+
+def test_per_tool_semaphores_bound_concurrency_and_queue_timeouts(monkeypatch):
+    lock = threading.Lock()
+    running = {"now": 0, "peak": 0}
+
+    def tracked():
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        time.sleep(0.05)
+        with lock:
+            running["now"] -= 1
+        return {"success": True}
+
+    _register(monkeypatch, "bounded_tool", tracked, kind="io", max_concurrency=2)
+    _register(monkeypatch, "exclusive_tool", _sleeper(0.2), kind="io", max_concurrency=1)
+    runner = ToolRunner(process_pool=None)
+
+    async def scenario():
+        bounded = [runner.run("bounded_tool") for _ in range(6)]
+        exclusive = [runner.run("exclusive_tool"), runner.run("exclusive_tool", timeout=0.05)]
+        return await asyncio.gather(*bounded, *exclusive)
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        runner.shutdown()
+
+    assert all(result["success"] for result in results[:6])
+    assert running["peak"] == 2
+    first, second = results[6:]
+    assert first["success"] and first["timing"]["kind"] == "io"
+    assert second["timed_out"] and second["message"].endswith("while queued")
+
+
+def test_cpu_tools_run_in_the_process_pool_with_prepared_arguments(monkeypatch):
+    prepared_in = []
+
+    def prepare(kwargs):
+        prepared_in.append(threading.current_thread() is threading.main_thread())
+        return {"value": kwargs["value"] + 1}
+
+    _register(monkeypatch, "cpu_tool", _pid_and_square, kind="cpu", prepare=prepare)
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        runner = ToolRunner(process_pool=lambda: pool)
+        result = asyncio.run(runner.run("cpu_tool", value=3))
+
+    assert result["square"] == 16
+    assert result["pid"] != os.getpid()
+    assert prepared_in == [False]  # prepared in a worker thread, off the event loop
+    assert result["timing"]["kind"] == "cpu" and result["timing"]["exec_ms"] is not None
+
+
+@pytest.mark.parametrize("tool_name", ["change_slot_assignment", "batch_change_slot_assignments", "reserve_slot",
+                                       "confirm_reservation", "release_reservation"])
+def test_tool_endpoint_refuses_mutating_tools(client, tool_name):
+    response = client.post(f"/api/tools/{tool_name}", json={"slot_id": "A-01-01-05", "item_id": "ITEM_001"})
+
+    assert response.status_code == 403
+    assert not response.json()["success"]
+
+
+def test_tool_endpoint_runs_read_only_tools(client):
+    listed = client.get("/api/tools").json()["tools"]
+    assert {name for name, tool in listed.items() if tool["read_only"]} == {
+        "find_available_slots", "get_warehouse_status", "plan_reslotting"}
+
+    response = client.post("/api/tools/find_available_slots", json={"zone": "B", "limit": 3})
+
+    assert response.status_code == 200
+    assert len(response.json()["slots"]) == 3
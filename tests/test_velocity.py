@@ -0,0 +1,62 @@
+import math
+import time
+
+from velocity import VelocityTracker, parse_pick_line
+
+
+def test_parse_rejects_invalid_quantities_and_timestamps():
+    now = time.time()
+    for line in ("ITEM_001,nan", ",inf", "ITEM_001,-5", "ITEM_001,inf", f"ITEM_001,1,{now * 1000}",
+                 '{"item_id": "ITEM_001", "quantity": NaN}'):
+        assert parse_pick_line(line) is None, line
+    assert parse_pick_line(f"ITEM_001,2,{now}") == ("ITEM_001", 2.0, now)
+
+
+def test_ingest_skips_invalid_events_without_touching_scores():
+    tracker = VelocityTracker()
+    now = time.time()
+    tracker.ingest([("ITEM_001", 150.0, now)])
+    ingested = tracker.ingest([("ITEM_002", float("nan"), now), ("ITEM_003", 1.0, now * 1000),
+                               ("ITEM_004", -5.0, now)])
+
+    assert ingested == 0
+    assert tracker.summary()["events_rejected"] == 3
+    assert math.isclose(tracker.velocity("ITEM_001", now), 150.0, rel_tol=1e-6)
+    assert [row["item_id"] for row in tracker.top_items()] == ["ITEM_001"]
+
+
+def test_reads_reuse_thresholds_until_the_interval_or_event_budget_runs_out(monkeypatch):
+    tracker = VelocityTracker(reclassify_every=100, reclassify_interval_seconds=60)
+    now = time.time()
+    tracker.ingest([("ITEM_001", 10.0, now)])
+    assert tracker.summary()["class_counts"]["A"] == 1
+
+    sorts = []
+    real = tracker._reclassify
+    monkeypatch.setattr(tracker, "_reclassify", lambda: (sorts.append(1), real()))
+    for index in range(20):
+        tracker.record_pick(f"ITEM_{index + 2:03d}", ts=now)
+        tracker.summary()
+        tracker.classify("ITEM_001")
+    assert sorts == []
+
+    tracker.ingest([("ITEM_999", 1.0, now)] * 80)
+    assert len(sorts) == 1
+
+    tracker.record_pick("ITEM_001", ts=now)
+    monkeypatch.setattr(tracker, "_classified_at", tracker._classified_at - 61)
+    tracker.summary()
+    assert len(sorts) == 2
+
+
+def test_travel_cost_handles_non_numeric_aisles():
+    from types import SimpleNamespace
+    from velocity import slot_travel_cost
+
+    def cost(aisle):
+        return slot_travel_cost(SimpleNamespace(aisle=aisle, level=1, position=1))
+
+    assert cost("02") < cost("10")
+    assert cost("A") < cost("B") < cost("AA")
+    assert cost("A-1") == cost("A1")
+    assert cost("") == (0, 1, 1)
@@ -0,0 +1,47 @@
+import time
+
+import whatif
+from reservations import reservations
+from whatif import OverlayStore
+
+
+def test_overlay_refuses_reserved_slots(loaded_warehouse):
+    store = OverlayStore(loaded_warehouse)
+    overlay = store.create()
+    reservation = reservations.reserve("A-01-02-02", "x")
+    try:
+        assert not overlay.assign_item_to_slot("A-01-02-02", "ITEM_005")
+        assert not overlay.add_item_to_slot("A-01-02-02", "ITEM_005")
+        assert overlay.changes() == []
+    finally:
+        reservations.release(reservation.reservation_id)
+    assert overlay.assign_item_to_slot("A-01-02-02", "ITEM_005")
+
+
+def test_idle_overlays_are_swept_on_access(loaded_warehouse, monkeypatch):
+    store = OverlayStore(loaded_warehouse)
+    overlay = store.create()
+    later = time.time() + whatif.IDLE_TTL_SECONDS + whatif.SWEEP_INTERVAL_SECONDS
+    monkeypatch.setattr(whatif.time, "time", lambda: later)
+
+    assert store.recent() == []
+    assert store.stats()["open"] == 0
+    assert store.stats()["expired"] == 1
+    assert store.get(overlay.overlay_id) is None
+
+
+def test_commit_refuses_slots_an_item_edit_overfilled(loaded_warehouse):
+    store = OverlayStore(loaded_warehouse)
+    overlay = store.create()
+    assert overlay.add_item_to_slot("A-03-03-01", "ITEM_005", 2)  # 2 x 12 kg in a 25 kg slot
+    weight = loaded_warehouse.items["ITEM_005"].weight
+    loaded_warehouse.update_item("ITEM_005", weight=13.0)
+    try:
+        assert overlay.conflicts() == ["A-03-03-01"]
+        assert store.commit(overlay.overlay_id) == (False, ["A-03-03-01"], 0)
+        assert loaded_warehouse.slots["A-03-03-01"].contents == {}
+    finally:
+        loaded_warehouse.update_item("ITEM_005", weight=weight)
+    assert store.commit(overlay.overlay_id) == (True, [], 1)
+    assert loaded_warehouse.slots["A-03-03-01"].contents == {"ITEM_005": 2}
+    assert loaded_warehouse.remove_item_from_slot("A-03-03-01", "ITEM_005")
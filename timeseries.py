@@ -0,0 +1,274 @@
+import asyncio
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from models import SlotStatus, WarehouseData, warehouse
+
+
+# Resolution name -> (bucket seconds, buckets kept): 30 minutes of seconds, a day of minutes, a month of hours
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    "second": (1, 1800),
+    "minute": (60, 1440),
+    "hour": (3600, 744)
+}
+METRICS = ("occupied", "reserved", "occupancy_rate", "volume_used_pct")
+SAMPLE_INTERVAL_SECONDS = 1.0
+# Queued slot changes a writer folds in itself (if nobody else is) before the next tick would
+MAX_PENDING_CHANGES = 10_000
+
+
+class Ring:
+    """
+    Fixed-size ring of min/max/sum/count buckets at one resolution.
+
+    Buckets are addressed by ``int(t // seconds) % size``; each slot also stores its bucket
+    number, so overwritten (expired) buckets are told apart from live ones without clearing.
+    Closing a bucket hands its aggregate to the next coarser ring: that is the downsampling.
+    """
+
+    __slots__ = ("seconds", "size", "bucket", "mins", "maxs", "sums", "counts",
+                 "current", "cur_min", "cur_max", "cur_sum", "cur_count", "last", "coarser")
+
+    def __init__(self, seconds: int, size: int, coarser: Optional["Ring"] = None):
+        self.seconds = seconds
+        self.size = size
+        self.bucket = array("q", [-1]) * size
+        self.mins = array("d", [0.0]) * size
+        self.maxs = array("d", [0.0]) * size
+        self.sums = array("d", [0.0]) * size
+        self.counts = array("q", [0]) * size
+        self.current = -1
+        self.cur_min = self.cur_max = self.cur_sum = 0.0
+        self.cur_count = 0
+        self.last = 0.0
+        self.coarser = coarser
+
+    def observe(self, t: float, value: float) -> None:
+        self.merge(t, value, value, value, 1)
+
+    def merge(self, t: float, low: float, high: float, total: float, count: int) -> None:
+        bucket = int(t // self.seconds)
+        if bucket != self.current:
+            if bucket < self.current:
+                bucket = self.current  # clock stepped back: fold into the open bucket
+            else:
+                self._advance(bucket)
+        if self.cur_count:
+            self.cur_min = min(self.cur_min, low)
+            self.cur_max = max(self.cur_max, high)
+        else:
+            self.cur_min, self.cur_max = low, high
+        self.cur_sum += total
+        self.cur_count += count
+        self.last = total / count
+
+    def _advance(self, bucket: int) -> None:
+        if self.current >= 0 and self.cur_count:
+            self._store(self.current, self.cur_min, self.cur_max, self.cur_sum, self.cur_count)
+            if self.coarser is not None:
+                self.coarser.merge(self.current * self.seconds, self.cur_min, self.cur_max, self.cur_sum, self.cur_count)
+            # Gauges hold their value through buckets nobody sampled (process paused, loop busy)
+            for missed in range(max(self.current + 1, bucket - self.size + 1), bucket):
+                self._store(missed, self.last, self.last, self.last, 1)
+        self.current = bucket
+        self.cur_min = self.cur_max = self.cur_sum = 0.0
+        self.cur_count = 0
+
+    def _store(self, bucket: int, low: float, high: float, total: float, count: int) -> None:
+        index = bucket % self.size
+        self.bucket[index] = bucket
+        self.mins[index] = low
+        self.maxs[index] = high
+        self.sums[index] = total
+        self.counts[index] = count
+
+    def points(self, start: float, end: float) -> List[Tuple[float, float, float, float]]:
+        """(bucket start, min, max, avg) for every retained bucket overlapping [start, end]"""
+        first = max(int(start // self.seconds), self.current - self.size + 1)
+        last = int(end // self.seconds)
+        points = []
+        for bucket in range(first, min(last, self.current - 1) + 1):
+            index = bucket % self.size
+            if self.bucket[index] == bucket and self.counts[index]:
+                points.append((bucket * self.seconds, self.mins[index], self.maxs[index],
+                               self.sums[index] / self.counts[index]))
+        if first <= self.current <= last and self.cur_count:
+            points.append((self.current * self.seconds, self.cur_min, self.cur_max, self.cur_sum / self.cur_count))
+        return points
+
+
+class OccupancyTimeSeries:
+    """
+    Occupancy per warehouse, zone and slot type, kept as in-process time series.
+
+    The warehouse listener runs inside writers' shard locks, so it takes no lock: it appends
+    the slot's new status and used volume, stamped, to a queue. The sampler tick (once a
+    second) and queries fold queued changes into O(1) counters and the per-second rings,
+    then the tick records every series so quiet periods still have data. Memory is fixed:
+    series x metrics x the ring sizes in ``RESOLUTIONS``.
+    """
+
+    def __init__(self, warehouse: WarehouseData):
+        self.warehouse = warehouse
+        self._lock = threading.Lock()
+        self._slot_state: Dict[str, Tuple[SlotStatus, float]] = {}
+        self._series_of_slot: Dict[str, Tuple[str, str, str]] = {}
+        self.totals: Dict[str, Dict[str, float]] = {}   # series -> slots, volume
+        self.counters: Dict[str, Dict[str, float]] = {}  # series -> occupied, reserved, used_volume
+        self.rings: Dict[Tuple[str, str], Ring] = {}
+        self._pending: Deque[Tuple[str, SlotStatus, float, float]] = deque()
+        self.attached = False
+
+    def attach(self) -> None:
+        """Index the loaded warehouse and start recording its mutations"""
+        with self._lock:
+            for slot in self.warehouse.slots.values():
+                series = ("all", f"zone:{slot.zone}", f"type:{slot.slot_type.value}")
+                self._series_of_slot[slot.slot_id] = series
+                for name in series:
+                    if name not in self.totals:
+                        self.totals[name] = {"slots": 0, "volume": 0.0}
+                        self.counters[name] = {"occupied": 0, "reserved": 0, "used_volume": 0.0}
+                        for metric in METRICS:
+                            self.rings[name, metric] = self._new_rings()
+                    self.totals[name]["slots"] += 1
+                    self.totals[name]["volume"] += slot.volume
+                    self._count(name, slot.status, 1)
+                used = slot.volume - slot.remaining_volume if slot.contents else 0.0
+                self._slot_state[slot.slot_id] = (slot.status, used)
+                for name in series:
+                    self.counters[name]["used_volume"] += used
+            self.attached = True
+        self.warehouse.add_listener(self._on_change)
+        self.sample()
+
+    @staticmethod
+    def _new_rings() -> Ring:
+        coarser = None
+        for name in reversed(list(RESOLUTIONS)):
+            seconds, size = RESOLUTIONS[name]
+            coarser = Ring(seconds, size, coarser)
+        return coarser  # the finest ring; coarser ones hang off it
+
+    def _on_change(self, event: str, slot_id: Optional[str], item_id: Optional[str]) -> None:
+        if slot_id is None:
+            if item_id is None:
+                return
+            # Item dimensions changed: the slots holding it have a new used volume
+            with self.warehouse._locked_for_item(item_id):
+                held_in = list(self.warehouse.item_slots.get(item_id, ()))
+            for slot_id in held_in:
+                self._on_change("stock", slot_id, None)
+            return
+        if slot_id not in self._series_of_slot:
+            return
+        slot = self.warehouse.slots[slot_id]
+        # deque.append is atomic, so writers in different zones never wait on each other here
+        self._pending.append((slot_id, slot.status, slot.volume - slot.remaining_volume if slot.contents else 0.0,
+                              time.time()))
+        if len(self._pending) > MAX_PENDING_CHANGES and self._lock.acquire(blocking=False):
+            try:
+                self._drain()
+            finally:
+                self._lock.release()
+
+    def _drain(self) -> None:
+        """Fold queued slot changes into the counters and rings, in arrival order (lock held)"""
+        pending = self._pending
+        for _ in range(len(pending)):
+            slot_id, status, used, now = pending.popleft()
+            old_status, old_used = self._slot_state[slot_id]
+            if (old_status, old_used) == (status, used):
+                continue
+            self._slot_state[slot_id] = (status, used)
+            for name in self._series_of_slot[slot_id]:
+                if old_status != status:
+                    self._count(name, old_status, -1)
+                    self._count(name, status, 1)
+                self.counters[name]["used_volume"] += used - old_used
+                self._record(name, now)
+
+    def _count(self, name: str, status: SlotStatus, sign: int) -> None:
+        if status != SlotStatus.EMPTY:
+            self.counters[name][status.value] += sign
+
+    def _record(self, name: str, now: float) -> None:
+        counters = self.counters[name]
+        totals = self.totals[name]
+        values = (
+            float(counters["occupied"]),
+            float(counters["reserved"]),
+            counters["occupied"] * 100.0 / totals["slots"] if totals["slots"] else 0.0,
+            counters["used_volume"] * 100.0 / totals["volume"] if totals["volume"] else 0.0
+        )
+        for metric, value in zip(METRICS, values):
+            self.rings[name, metric].observe(now, value)
+
+    def sample(self, now: Optional[float] = None) -> None:
+        """Record every series' current values (the once-a-second tick)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._drain()
+            for name in self.counters:
+                self._record(name, now)
+
+    async def run_sampler_loop(self) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(SAMPLE_INTERVAL_SECONDS)
+
+    def series(self) -> List[str]:
+        return list(self.counters)
+
+    def query(self, series: str, metric: str, start: float, end: float,
+              resolution: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Points and min/max/avg for one series and metric over [start, end].
+
+        Without ``resolution`` the finest one still retaining ``start`` is used.
+        Raises ValueError for unknown series, metrics or resolutions.
+        """
+        if (series, metric) not in self.rings:
+            if series not in self.counters:
+                raise ValueError(f"Unknown series '{series}'; known: {', '.join(self.series())}")
+            raise ValueError(f"Unknown metric '{metric}'; known: {', '.join(METRICS)}")
+        if resolution is not None and resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}'; known: {', '.join(RESOLUTIONS)}")
+
+        with self._lock:
+            self._drain()
+            ring = self.rings[series, metric]
+            chosen = None
+            now = time.time()
+            for name, (seconds, size) in RESOLUTIONS.items():
+                if resolution == name or (resolution is None and (start >= now - seconds * size
+                                                                  or ring.coarser is None)):
+                    chosen = name
+                    break
+                ring = ring.coarser
+            points = ring.points(start, end)
+
+        aggregate = None
+        if points:
+            aggregate = {
+                "min": min(point[1] for point in points),
+                "max": max(point[2] for point in points),
+                "avg": sum(point[3] for point in points) / len(points)
+            }
+        return {
+            "series": series,
+            "metric": metric,
+            "resolution": chosen,
+            "bucket_seconds": RESOLUTIONS[chosen][0],
+            "start": start,
+            "end": end,
+            "points": [{"t": t, "min": low, "max": high, "avg": avg} for t, low, high, avg in points],
+            "aggregate": aggregate
+        }
+
+
+# Global occupancy time series, attached once the warehouse has loaded
+occupancy_history = OccupancyTimeSeries(warehouse)
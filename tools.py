@@ -1,15 +1,24 @@
-from typing import List, Dict, Any, Optional
-from models import warehouse, Slot, Item
+from typing import List, Dict, Any, Callable, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from models import warehouse, Slot, Item, SlotStatus, is_type_compatible
+from query import SlotQuery
+from reservations import reservations, DEFAULT_TTL_SECONDS
+from reslotting import reslotting_jobs, run_reslotting_plan, snapshot_layout
+from whatif import overlays
+import asyncio
+import inspect
 import json
+import time
 
 
-def change_slot_assignment(slot_id: str, item_id: str) -> Dict[str, Any]:
+def change_slot_assignment(slot_id: str, item_id: str, quantity: int = 1) -> Dict[str, Any]:
     """
     Tool to change the assignment of an item to a specific slot.
     
     Args:
         slot_id: The ID of the slot to assign the item to
         item_id: The ID of the item to assign to the slot
+        quantity: Number of units to stock in the slot
     
     Returns:
         Dict with success status and message
@@ -34,30 +43,24 @@ def change_slot_assignment(slot_id: str, item_id: str) -> Dict[str, Any]:
         slot = warehouse.slots[slot_id]
         item = warehouse.items[item_id]
         
-        # Check if slot is already occupied
-        if slot.status.value == "occupied" and slot.assigned_item_id != item_id:
-            current_item = warehouse.items.get(slot.assigned_item_id)
-            current_item_name = current_item.name if current_item else "Unknown Item"
-            return {
-                "success": False,
-                "message": f"Slot {slot_id} is already occupied by {current_item_name} ({slot.assigned_item_id})",
-                "action": "change_assignment"
-            }
-        
-        # Try to assign item to slot
-        success = warehouse.assign_item_to_slot(slot_id, item_id)
+        # Try to assign item to slot (reserved slots are only handed out by confirming the reservation)
+        success = warehouse.assign_item_to_slot(slot_id, item_id, quantity)
         
         if success:
+            units = f"{quantity} x " if quantity != 1 else ""
             return {
                 "success": True,
-                "message": f"Successfully assigned {item.name} ({item_id}) to slot {slot_id}",
+                "message": f"Successfully assigned {units}{item.name} ({item_id}) to slot {slot_id}",
                 "action": "change_assignment",
                 "slot_info": {
                     "slot_id": slot_id,
                     "zone": slot.zone,
                     "aisle": slot.aisle,
                     "level": slot.level,
-                    "position": slot.position
+                    "position": slot.position,
+                    "contents": dict(slot.contents),
+                    "remaining_weight": slot.remaining_weight,
+                    "remaining_volume": slot.remaining_volume
                 },
                 "item_info": {
                     "item_id": item_id,
@@ -65,12 +68,31 @@ def change_slot_assignment(slot_id: str, item_id: str) -> Dict[str, Any]:
                     "category": item.category
                 }
             }
-        else:
+        if slot.status == SlotStatus.RESERVED:
+            holder = reservations.for_slot(slot_id)
             return {
                 "success": False,
-                "message": f"Cannot assign {item.name} to slot {slot_id}. Item may not be compatible with slot requirements.",
+                "message": f"Slot {slot_id} is reserved" + (f" by {holder.holder}" if holder else ""),
                 "action": "change_assignment"
             }
+        
+        # Slot is shared with other SKUs and has no room left
+        other_items = [other_id for other_id in slot.contents if other_id != item_id]
+        if other_items and is_type_compatible(slot, item):
+            current_item = warehouse.items.get(other_items[0])
+            current_item_name = current_item.name if current_item else "Unknown Item"
+            return {
+                "success": False,
+                "message": f"Slot {slot_id} is already occupied by {current_item_name} ({other_items[0]}) "
+                           f"and has no room for {quantity} x {item.name}",
+                "action": "change_assignment"
+            }
+        
+        return {
+            "success": False,
+            "message": f"Cannot assign {item.name} to slot {slot_id}. Item may not be compatible with slot requirements.",
+            "action": "change_assignment"
+        }
     
     except Exception as e:
         return {
@@ -80,42 +102,245 @@ def change_slot_assignment(slot_id: str, item_id: str) -> Dict[str, Any]:
         }
 
 
-def find_available_slots(item_id: Optional[str] = None, zone: Optional[str] = None, slot_type: Optional[str] = None) -> Dict[str, Any]:
+def batch_change_slot_assignments(moves: List[Dict[str, Any]], stop_on_error: bool = True) -> Dict[str, Any]:
+    """
+    Tool to apply an ordered list of slot assignments.
+    
+    Args:
+        moves: Ordered list of {"item_id", "slot_id" or "to_slot", optional "from_slot" and "quantity"} moves.
+               When "from_slot" is given the move is skipped as stale unless the item is still there.
+        stop_on_error: Stop at the first failed move (later moves usually depend on earlier ones)
+    
+    Returns:
+        Dict with per-move results and counts
+    """
+    try:
+        results = []
+        applied = 0
+        failed = 0
+        # One journal fsync for the whole batch instead of one per move
+        with warehouse.defer_durability():
+            for index, move in enumerate(moves):
+                item_id = move.get("item_id")
+                slot_id = move.get("slot_id") or move.get("to_slot")
+                from_slot = move.get("from_slot")
+                
+                if from_slot:
+                    current = warehouse._find_item_assignment(item_id)
+                    if not current or current.slot_id != from_slot:
+                        result = {
+                            "success": False,
+                            "message": f"Item {item_id} is no longer in slot {from_slot}",
+                            "action": "change_assignment"
+                        }
+                    else:
+                        result = change_slot_assignment(slot_id, item_id, move.get("quantity", 1))
+                else:
+                    result = change_slot_assignment(slot_id, item_id, move.get("quantity", 1))
+                
+                results.append({"index": index, "item_id": item_id, "slot_id": slot_id,
+                                "success": result["success"], "message": result["message"]})
+                if result["success"]:
+                    applied += 1
+                else:
+                    failed += 1
+                    if stop_on_error:
+                        break
+        warehouse.wait_durable()
+        
+        return {
+            "success": failed == 0,
+            "message": f"Applied {applied} of {len(moves)} moves" + (f", {failed} failed" if failed else ""),
+            "action": "batch_change_assignment",
+            "applied": applied,
+            "failed": failed,
+            "results": results
+        }
+    
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error applying batch assignment: {str(e)}",
+            "action": "batch_change_assignment"
+        }
+
+
+def reserve_slot(holder: str, slot_id: Optional[str] = None, item_id: Optional[str] = None,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS) -> Dict[str, Any]:
+    """
+    Tool to hold a slot for an item or request ID until it is confirmed or expires.
+    
+    Args:
+        holder: Item ID, operator or request ID that owns the hold
+        slot_id: Slot to reserve; if omitted, the best suitable slot for item_id is reserved
+        item_id: Optional item the slot is being held for
+        ttl_seconds: How long the hold lasts before it expires automatically
+    
+    Returns:
+        Dict with the reservation details
+    """
+    try:
+        if not slot_id:
+            if not item_id:
+                return {
+                    "success": False,
+                    "message": "Either slot_id or item_id is required",
+                    "action": "reserve_slot"
+                }
+            # Only empty slots can be held; suitable slots also include partly filled ones
+            candidate = next((slot for slot in warehouse.find_suitable_slots_for_item(item_id)
+                              if slot.status == SlotStatus.EMPTY), None)
+            if candidate is None:
+                return {
+                    "success": False,
+                    "message": f"No empty slots for item {item_id}",
+                    "action": "reserve_slot"
+                }
+            slot_id = candidate.slot_id
+        
+        reservation = reservations.reserve(slot_id, holder, item_id=item_id, ttl_seconds=ttl_seconds)
+        return {
+            "success": True,
+            "message": f"Reserved slot {slot_id} for {holder} for {ttl_seconds:g} seconds",
+            "action": "reserve_slot",
+            "reservation": reservation.to_dict()
+        }
+    
+    except ValueError as e:
+        return {
+            "success": False,
+            "message": str(e),
+            "action": "reserve_slot"
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error reserving slot: {str(e)}",
+            "action": "reserve_slot"
+        }
+
+
+def confirm_reservation(reservation_id: str, item_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Tool to convert a reservation into an assignment.
+    
+    Args:
+        reservation_id: The reservation to confirm
+        item_id: Item to assign; defaults to the item the slot was reserved for
+    
+    Returns:
+        Dict with success status and message
+    """
+    try:
+        reservation = reservations.confirm(reservation_id, item_id=item_id)
+        assigned_item_id = item_id or reservation.item_id
+        return {
+            "success": True,
+            "message": f"Confirmed reservation {reservation_id}: assigned {assigned_item_id} to slot {reservation.slot_id}",
+            "action": "confirm_reservation",
+            "reservation": reservation.to_dict()
+        }
+    
+    except ValueError as e:
+        return {
+            "success": False,
+            "message": str(e),
+            "action": "confirm_reservation"
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error confirming reservation: {str(e)}",
+            "action": "confirm_reservation"
+        }
+
+
+def release_reservation(reservation_id: str) -> Dict[str, Any]:
+    """
+    Tool to cancel a reservation and free its slot.
+    
+    Args:
+        reservation_id: The reservation to release
+    
+    Returns:
+        Dict with success status and message
+    """
+    try:
+        reservation = reservations.release(reservation_id)
+        return {
+            "success": True,
+            "message": f"Released reservation {reservation_id} on slot {reservation.slot_id}",
+            "action": "release_reservation",
+            "reservation": reservation.to_dict()
+        }
+    
+    except ValueError as e:
+        return {
+            "success": False,
+            "message": str(e),
+            "action": "release_reservation"
+        }
+
+
+def _query_source(overlay_id: Optional[str]):
+    """Live warehouse, or the what-if overlay to read through (None if it does not exist)"""
+    return warehouse if overlay_id is None else overlays.get(overlay_id)
+
+
+def find_available_slots(item_id: Optional[str] = None, zone: Optional[str] = None, slot_type: Optional[str] = None,
+                         quantity: int = 1, level: Optional[int] = None, aisle_min: Optional[str] = None,
+                         aisle_max: Optional[str] = None, sort_by: Optional[List[str]] = None,
+                         limit: int = 20, offset: int = 0, include_total: bool = False,
+                         overlay_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Tool to find available slots, optionally filtered by item compatibility, zone, or slot type.
     
     Args:
-        item_id: Optional item ID to find compatible slots for
+        item_id: Optional item ID to find compatible slots for (including partly filled slots with room)
         zone: Optional zone filter (A, B, C)
         slot_type: Optional slot type filter (standard, cold_storage, hazmat, oversized)
+        quantity: Number of units of item_id that must fit
+        level: Optional level filter
+        aisle_min: Optional lowest aisle (inclusive)
+        aisle_max: Optional highest aisle (inclusive)
+        sort_by: Optional sort keys (see query.SORT_KEYS, "-" prefix for descending, "velocity"
+                 for the item's velocity ranking); slot order by default, which stops at the page
+        limit: Page size
+        offset: Number of matches to skip
+        include_total: Count every match (scans every candidate instead of stopping at the page)
+        overlay_id: Optional what-if overlay to search instead of live state
     
     Returns:
         Dict with available slots information
     """
     try:
-        empty_slots = warehouse.get_empty_slots()
+        source = _query_source(overlay_id)
+        if source is None:
+            return {
+                "success": False,
+                "message": f"What-if overlay {overlay_id} not found or expired",
+                "action": "find_slots"
+            }
         
         # Filter by item compatibility if item_id provided
-        if item_id:
-            if item_id not in warehouse.items:
-                return {
-                    "success": False,
-                    "message": f"Item {item_id} not found",
-                    "action": "find_slots"
-                }
-            empty_slots = warehouse.find_suitable_slots_for_item(item_id)
-        
-        # Filter by zone if provided
-        if zone:
-            empty_slots = [slot for slot in empty_slots if slot.zone.upper() == zone.upper()]
+        if item_id and item_id not in warehouse.items:
+            return {
+                "success": False,
+                "message": f"Item {item_id} not found",
+                "action": "find_slots"
+            }
         
-        # Filter by slot type if provided
-        if slot_type:
-            empty_slots = [slot for slot in empty_slots if slot.slot_type.value == slot_type.lower()]
+        query = SlotQuery(
+            available=True, item_id=item_id, quantity=quantity, zone=zone, slot_type=slot_type,
+            level=level, aisle_min=aisle_min, aisle_max=aisle_max,
+            sort_by=sort_by, limit=limit, offset=offset
+        )
+        result = query.execute(source, count_total=include_total)
+        total = result["total"]
         
         # Format slot information
         slot_info = []
-        for slot in empty_slots[:20]:  # Limit to first 20 slots
+        for slot in result["slots"]:
             slot_info.append({
                 "slot_id": slot.slot_id,
                 "zone": slot.zone,
@@ -124,26 +349,45 @@ def find_available_slots(item_id: Optional[str] = None, zone: Optional[str] = No
                 "position": slot.position,
                 "slot_type": slot.slot_type.value,
                 "max_weight": slot.max_weight,
-                "dimensions": slot.dimensions
+                "dimensions": slot.dimensions,
+                "remaining_weight": slot.remaining_weight,
+                "remaining_volume": slot.remaining_volume,
+                "contents": dict(slot.contents)
             })
         
         item_name = ""
         if item_id and item_id in warehouse.items:
             item_name = f" for {warehouse.items[item_id].name}"
         
+        found = f"{total}" if total is not None else f"at least {offset + len(slot_info)}"
         return {
             "success": True,
-            "message": f"Found {len(empty_slots)} available slots{item_name}",
+            "message": f"Found {found} available slots{item_name}",
             "action": "find_slots",
-            "total_slots": len(empty_slots),
+            "total_slots": total,
             "slots": slot_info,
+            "limit": limit,
+            "offset": offset,
+            "query_plan": result["plan"],
+            "velocity_class": warehouse.velocity.classify(item_id) if item_id else None,
             "filters_applied": {
                 "item_id": item_id,
                 "zone": zone,
-                "slot_type": slot_type
+                "slot_type": slot_type,
+                "quantity": quantity,
+                "level": level,
+                "aisle_min": aisle_min,
+                "aisle_max": aisle_max,
+                "sort_by": sort_by
             }
         }
     
+    except ValueError as e:
+        return {
+            "success": False,
+            "message": str(e),
+            "action": "find_slots"
+        }
     except Exception as e:
         return {
             "success": False,
@@ -152,52 +396,74 @@ def find_available_slots(item_id: Optional[str] = None, zone: Optional[str] = No
         }
 
 
-def get_warehouse_status() -> Dict[str, Any]:
+def get_warehouse_status(overlay_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Tool to get overall warehouse status and occupancy information.
     
+    Args:
+        overlay_id: Optional what-if overlay to report on instead of live state
+    
     Returns:
         Dict with warehouse status information
     """
     try:
-        total_slots = len(warehouse.slots)
-        occupied_slots = warehouse.get_occupied_slots()
-        empty_slots = warehouse.get_empty_slots()
+        source = _query_source(overlay_id)
+        if source is None:
+            return {
+                "success": False,
+                "message": f"What-if overlay {overlay_id} not found or expired",
+                "action": "warehouse_status"
+            }
+        
+        # One pass per zone shard (in parallel on large warehouses), merged here
+        zone_summaries = source.status_summary()
+        total_slots = sum(summary["total"] for summary in zone_summaries.values())
+        occupied_count = sum(summary["occupied"] for summary in zone_summaries.values())
+        reserved_count = sum(summary["reserved"] for summary in zone_summaries.values())
+        total_weight = sum(summary["total_weight"] for summary in zone_summaries.values())
+        total_volume = sum(summary["total_volume"] for summary in zone_summaries.values())
+        used_weight = sum(summary["used_weight"] for summary in zone_summaries.values())
+        used_volume = sum(summary["used_volume"] for summary in zone_summaries.values())
         
         # Count by zone
         zone_stats = {}
-        for zone in ["A", "B", "C"]:
-            zone_slots = [slot for slot in warehouse.slots.values() if slot.zone == zone]
-            zone_occupied = [slot for slot in zone_slots if slot.status.value == "occupied"]
+        for zone, summary in zone_summaries.items():
             zone_stats[zone] = {
-                "total": len(zone_slots),
-                "occupied": len(zone_occupied),
-                "empty": len(zone_slots) - len(zone_occupied),
-                "occupancy_rate": (len(zone_occupied) / len(zone_slots)) * 100 if zone_slots else 0
+                "total": summary["total"],
+                "occupied": summary["occupied"],
+                "reserved": summary["reserved"],
+                "empty": summary["total"] - summary["occupied"] - summary["reserved"],
+                "occupancy_rate": (summary["occupied"] / summary["total"]) * 100 if summary["total"] else 0
             }
         
         # Count by slot type
         type_stats = {}
         for slot_type in ["standard", "cold_storage", "hazmat", "oversized"]:
-            type_slots = [slot for slot in warehouse.slots.values() if slot.slot_type.value == slot_type]
-            type_occupied = [slot for slot in type_slots if slot.status.value == "occupied"]
+            counts = [summary["by_type"][slot_type] for summary in zone_summaries.values()
+                      if slot_type in summary["by_type"]]
+            type_total = sum(count["total"] for count in counts)
+            type_occupied = sum(count["occupied"] for count in counts)
+            type_reserved = sum(count["reserved"] for count in counts)
             type_stats[slot_type] = {
-                "total": len(type_slots),
-                "occupied": len(type_occupied),
-                "empty": len(type_slots) - len(type_occupied),
-                "occupancy_rate": (len(type_occupied) / len(type_slots)) * 100 if type_slots else 0
+                "total": type_total,
+                "occupied": type_occupied,
+                "reserved": type_reserved,
+                "empty": type_total - type_occupied - type_reserved,
+                "occupancy_rate": (type_occupied / type_total) * 100 if type_total else 0
             }
         
         # Recent assignments (occupied slots with items)
         recent_assignments = []
-        for slot in occupied_slots[:10]:  # Show first 10
+        first_occupied = [slot for summary in zone_summaries.values() for slot in summary["first_occupied"]]
+        for slot in first_occupied[:10]:  # Show first 10
             if slot.assigned_item_id and slot.assigned_item_id in warehouse.items:
                 item = warehouse.items[slot.assigned_item_id]
                 recent_assignments.append({
                     "slot_id": slot.slot_id,
                     "item_id": item.item_id,
                     "item_name": item.name,
-                    "item_category": item.category
+                    "item_category": item.category,
+                    "quantity": slot.contents.get(item.item_id, 0)
                 })
         
         return {
@@ -206,9 +472,12 @@ def get_warehouse_status() -> Dict[str, Any]:
             "action": "warehouse_status",
             "summary": {
                 "total_slots": total_slots,
-                "occupied_slots": len(occupied_slots),
-                "empty_slots": len(empty_slots),
-                "overall_occupancy_rate": (len(occupied_slots) / total_slots) * 100
+                "occupied_slots": occupied_count,
+                "empty_slots": total_slots - occupied_count - reserved_count,
+                "reserved_slots": reserved_count,
+                "overall_occupancy_rate": (occupied_count / total_slots) * 100 if total_slots else 0,
+                "weight_utilization_rate": (used_weight / total_weight) * 100 if total_weight else 0,
+                "volume_utilization_rate": (used_volume / total_volume) * 100 if total_volume else 0
             },
             "zone_breakdown": zone_stats,
             "slot_type_breakdown": type_stats,
@@ -223,32 +492,154 @@ def get_warehouse_status() -> Dict[str, Any]:
         }
 
 
-# Tool registry for the agent
+def plan_reslotting(snapshot: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Tool to plan a velocity-driven re-slotting without applying it.
+    
+    Args:
+        snapshot: Layout snapshot to plan over (defaults to the live warehouse)
+    
+    Returns:
+        Dict with the ordered move list and a plan summary
+    """
+    try:
+        plan = run_reslotting_plan(snapshot if snapshot is not None else snapshot_layout(warehouse))
+        return {
+            "success": True,
+            "message": f"Planned {plan['summary']['total_moves']} moves relocating "
+                       f"{plan['summary']['items_relocated']} items",
+            "action": "plan_reslotting",
+            "moves": plan["moves"],
+            "unresolved": plan["unresolved"],
+            "summary": plan["summary"]
+        }
+    
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error planning re-slotting: {str(e)}",
+            "action": "plan_reslotting"
+        }
+
+
+# Tool registry for the agent.
+# "kind" says where a tool runs under execute_tool_async:
+#   inline - fast in-memory tool, called directly on the event loop
+#   async  - coroutine function, awaited
+#   io     - blocking call, run in the thread pool; every mutating tool is io, because
+#            warehouse mutators wait for the journal's fsync before returning
+#   cpu    - heavy computation, run in the process pool; "prepare" turns the call's
+#            arguments into picklable ones (e.g. a snapshot instead of the live warehouse)
+# "timeout" (seconds) and "max_concurrency" bound each tool independently.
+# "read_only" marks tools that never change warehouse state; only those can be run through
+# the generic tool endpoint (mutations go through their own endpoints).
+# "parameter_schemas" overrides the JSON schema generated from a parameter's description string.
 AVAILABLE_TOOLS = {
     "change_slot_assignment": {
         "function": change_slot_assignment,
+        "kind": "io",
         "description": "Assign or reassign an item to a specific warehouse slot",
         "parameters": {
             "slot_id": "string - The ID of the slot (e.g., A-01-01-01)",
-            "item_id": "string - The ID of the item (e.g., ITEM_001)"
+            "item_id": "string - The ID of the item (e.g., ITEM_001)",
+            "quantity": "integer (optional) - Number of units to stock (default 1)"
+        }
+    },
+    "batch_change_slot_assignments": {
+        "function": batch_change_slot_assignments,
+        "kind": "io",
+        "description": "Apply an ordered list of item-to-slot moves, e.g. a re-slotting plan",
+        "parameters": {
+            "moves": "array - Ordered moves, each with item_id and slot_id (or to_slot) and optional from_slot and quantity",
+            "stop_on_error": "boolean (optional) - Stop at the first failed move (default true)"
+        },
+        "parameter_schemas": {
+            "moves": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "item_id": {"type": "string"},
+                        "slot_id": {"type": "string"},
+                        "from_slot": {"type": "string"},
+                        "quantity": {"type": "integer"}
+                    },
+                    "required": ["item_id", "slot_id"]
+                }
+            }
+        }
+    },
+    "reserve_slot": {
+        "function": reserve_slot,
+        "kind": "io",
+        "description": "Hold a slot for an item or request ID so no one else is offered it until the hold expires",
+        "parameters": {
+            "holder": "string - Item, operator or request ID that owns the hold",
+            "slot_id": "string (optional) - Slot to reserve; defaults to the best slot for item_id",
+            "item_id": "string (optional) - Item the slot is being held for",
+            "ttl_seconds": "number (optional) - Hold duration in seconds (default 300)"
+        }
+    },
+    "confirm_reservation": {
+        "function": confirm_reservation,
+        "kind": "io",
+        "description": "Convert a slot reservation into an assignment",
+        "parameters": {
+            "reservation_id": "string - The reservation ID (e.g., RSV_000001)",
+            "item_id": "string (optional) - Item to assign; defaults to the reserved item"
+        }
+    },
+    "release_reservation": {
+        "function": release_reservation,
+        "kind": "io",
+        "description": "Cancel a slot reservation",
+        "parameters": {
+            "reservation_id": "string - The reservation ID (e.g., RSV_000001)"
         }
     },
     "find_available_slots": {
         "function": find_available_slots,
+        "read_only": True,
         "description": "Find available warehouse slots, optionally filtered by item compatibility, zone, or slot type",
         "parameters": {
             "item_id": "string (optional) - Item ID to find compatible slots for",
             "zone": "string (optional) - Zone filter (A, B, or C)",
-            "slot_type": "string (optional) - Slot type (standard, cold_storage, hazmat, oversized)"
+            "slot_type": "string (optional) - Slot type (standard, cold_storage, hazmat, oversized)",
+            "quantity": "integer (optional) - Units of item_id that must fit (default 1)",
+            "level": "integer (optional) - Level filter",
+            "aisle_min": "string (optional) - Lowest aisle, inclusive (e.g., 01)",
+            "aisle_max": "string (optional) - Highest aisle, inclusive (e.g., 03)",
+            "sort_by": "array (optional) - Sort keys such as velocity, travel_cost, -remaining_volume, level",
+            "limit": "integer (optional) - Page size (default 20)",
+            "offset": "integer (optional) - Matches to skip (default 0)",
+            "include_total": "boolean (optional) - Also count every match (slower)",
+            "overlay_id": "string (optional) - What-if overlay to search instead of live state"
         }
     },
     "get_warehouse_status": {
         "function": get_warehouse_status,
+        "read_only": True,
         "description": "Get overall warehouse status, occupancy rates, and statistics",
-        "parameters": {}
+        "parameters": {
+            "overlay_id": "string (optional) - What-if overlay to report on instead of live state"
+        }
+    },
+    "plan_reslotting": {
+        "function": plan_reslotting,
+        "read_only": True,
+        "description": "Plan a velocity-driven re-slotting of the warehouse (returns moves, does not apply them)",
+        "parameters": {},
+        "kind": "cpu",
+        "timeout": 120.0,
+        "max_concurrency": 1,
+        "prepare": lambda kwargs: {**kwargs, "snapshot": snapshot_layout(warehouse)}
     }
 }
 
+DEFAULT_TOOL_KIND = "inline"
+DEFAULT_TOOL_TIMEOUT = 30.0
+DEFAULT_TOOL_CONCURRENCY = 8
+
 
 def execute_tool(tool_name: str, **kwargs) -> Dict[str, Any]:
     """Execute a tool by name with given parameters"""
@@ -260,4 +651,211 @@ def execute_tool(tool_name: str, **kwargs) -> Dict[str, Any]:
         }
     
     tool_function = AVAILABLE_TOOLS[tool_name]["function"]
-    return tool_function(**kwargs) 
\ No newline at end of file
+    return tool_function(**kwargs)
+
+
+_schema_cache: Dict[str, Any] = {"key": None, "schemas": [], "read_only": []}
+
+
+def _parameter_schema(description: str) -> tuple:
+    """Turn "integer (optional) - Page size" into (JSON schema, required)"""
+    declared, _, text = description.partition(" - ")
+    required = "(optional)" not in declared
+    type_name = declared.replace("(optional)", "").strip()
+    schema: Dict[str, Any] = {"type": type_name, "description": text.strip()}
+    if type_name == "array":
+        schema["items"] = {"type": "string"}
+    return schema, required
+
+
+def openai_tool_schemas(read_only: bool = False) -> List[Dict[str, Any]]:
+    """
+    OpenAI function-calling schemas for AVAILABLE_TOOLS (only the read-only ones if asked),
+    rebuilt only when tools are added or removed
+    """
+    key = tuple(AVAILABLE_TOOLS)
+    if _schema_cache["key"] != key:
+        schemas = []
+        read_only_schemas = []
+        for name, spec in AVAILABLE_TOOLS.items():
+            properties = {}
+            required = []
+            for parameter, description in spec["parameters"].items():
+                schema, is_required = _parameter_schema(description)
+                properties[parameter] = spec.get("parameter_schemas", {}).get(parameter, schema)
+                if is_required:
+                    required.append(parameter)
+            schemas.append({
+                "type": "function",
+                "function": {
+                    "name": name,
+                    "description": spec["description"],
+                    "parameters": {"type": "object", "properties": properties, "required": required}
+                }
+            })
+            if tool_is_read_only(spec):
+                read_only_schemas.append(schemas[-1])
+        _schema_cache["key"] = key
+        _schema_cache["schemas"] = schemas
+        _schema_cache["read_only"] = read_only_schemas
+    return _schema_cache["read_only" if read_only else "schemas"]
+
+
+def tool_kind(spec: Dict[str, Any]) -> str:
+    """Declared kind of a registered tool; coroutine functions default to async"""
+    if "kind" in spec:
+        return spec["kind"]
+    return "async" if inspect.iscoroutinefunction(spec["function"]) else DEFAULT_TOOL_KIND
+
+
+def tool_is_read_only(spec: Dict[str, Any]) -> bool:
+    """Whether a registered tool is declared not to change warehouse state (undeclared tools are not)"""
+    return spec.get("read_only", False)
+
+
+def _timed_call(tool_function, kwargs: Dict[str, Any]) -> tuple:
+    """Run a tool in a worker, reporting when it started and how long it ran"""
+    started = time.time()
+    result = tool_function(**kwargs)
+    return started, time.time() - started, result
+
+
+class ToolRunner:
+    """
+    Dispatches tools by kind without blocking the event loop.
+
+    Each tool gets its own semaphore (``max_concurrency``) and timeout. Blocking tools go to
+    a thread pool created on first use; CPU-bound tools go to the process pool returned by
+    ``process_pool``, which is owned (and shut down) by its provider. Every result carries
+    ``timing`` split into queue wait (semaphore and pool queue) and execution time.
+    """
+
+    def __init__(self, process_pool: Callable[[], ProcessPoolExecutor], io_workers: int = 8):
+        self.process_pool = process_pool
+        self.io_workers = io_workers
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def _pool(self, kind: str):
+        if kind == "cpu":
+            return self.process_pool()
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="tool")
+        return self._threads
+
+    def _semaphore(self, tool_name: str, spec: Dict[str, Any]) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(tool_name)
+        if semaphore is None:
+            semaphore = self._semaphores[tool_name] = asyncio.Semaphore(
+                spec.get("max_concurrency", DEFAULT_TOOL_CONCURRENCY))
+        return semaphore
+
+    async def run(self, tool_name: str, timeout: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+        """Execute a tool by name according to its declared kind"""
+        spec = AVAILABLE_TOOLS.get(tool_name)
+        if spec is None:
+            return execute_tool(tool_name, **kwargs)
+        
+        kind = tool_kind(spec)
+        timeout = timeout or spec.get("timeout", DEFAULT_TOOL_TIMEOUT)
+        stats = self.stats.setdefault(tool_name, {"calls": 0, "timeouts": 0, "cancelled": 0, "errors": 0, "running": 0,
+                                                  "queue_seconds": 0.0, "exec_seconds": 0.0})
+        stats["calls"] += 1
+        submitted = time.time()
+        deadline = time.monotonic() + timeout
+        tool_function = spec["function"]
+        
+        try:
+            semaphore = self._semaphore(tool_name, spec)
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            return self._timed_out(tool_name, kind, timeout, submitted, stats, started=False)
+        
+        future = None
+        stats["running"] += 1
+        try:
+            if kind == "inline":
+                started = time.time()
+                result = tool_function(**kwargs)
+                exec_seconds = time.time() - started
+            elif kind == "async":
+                started = time.time()
+                result = await asyncio.wait_for(tool_function(**kwargs), deadline - time.monotonic())
+                exec_seconds = time.time() - started
+            else:
+                if "prepare" in spec:
+                    # Preparing may snapshot the warehouse, which walks every slot
+                    kwargs = await asyncio.to_thread(spec["prepare"], kwargs)
+                future = self._pool(kind).submit(_timed_call, tool_function, kwargs)
+                started, exec_seconds, result = await asyncio.wait_for(
+                    asyncio.wrap_future(future), deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            # A queued pool call is cancelled; one already running finishes in its worker and is discarded
+            started = future is None or not future.cancel()
+            return self._timed_out(tool_name, kind, timeout, submitted, stats, started)
+        except asyncio.CancelledError:
+            # The caller went away: drop the call if it has not started yet
+            stats["cancelled"] += 1
+            if future is not None:
+                future.cancel()
+            raise
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            stats["running"] -= 1
+            semaphore.release()
+        
+        queue_seconds = max(started - submitted, 0.0)
+        stats["queue_seconds"] += queue_seconds
+        stats["exec_seconds"] += exec_seconds
+        result = dict(result)
+        result["timing"] = {
+            "kind": kind,
+            "queue_ms": round(queue_seconds * 1000, 3),
+            "exec_ms": round(exec_seconds * 1000, 3)
+        }
+        return result
+
+    def _timed_out(self, tool_name: str, kind: str, timeout: float, submitted: float,
+                   stats: Dict[str, Any], started: bool) -> Dict[str, Any]:
+        stats["timeouts"] += 1
+        return {
+            "success": False,
+            "message": f"Tool '{tool_name}' timed out after {timeout:g}s"
+                       + (" while running" if started else " while queued"),
+            "action": tool_name,
+            "timed_out": True,
+            "timing": {"kind": kind, "queue_ms": round((time.time() - submitted) * 1000, 3), "exec_ms": None}
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-tool call counts with average queue wait and execution time"""
+        summary = {}
+        for tool_name, stats in self.stats.items():
+            completed = stats["calls"] - stats["timeouts"] - stats["cancelled"] - stats["errors"] - stats["running"]
+            summary[tool_name] = {
+                "kind": tool_kind(AVAILABLE_TOOLS[tool_name]),
+                "calls": stats["calls"],
+                "running": stats["running"],
+                "timeouts": stats["timeouts"],
+                "cancelled": stats["cancelled"],
+                "errors": stats["errors"],
+                "avg_queue_ms": round(stats["queue_seconds"] * 1000 / completed, 3) if completed else None,
+                "avg_exec_ms": round(stats["exec_seconds"] * 1000 / completed, 3) if completed else None
+            }
+        return summary
+
+    def shutdown(self) -> None:
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+
+
+# Global tool runner instance; CPU-bound tools share the re-slotting planner's process pool
+tool_runner = ToolRunner(reslotting_jobs.process_pool)
+
+
+async def execute_tool_async(tool_name: str, **kwargs) -> Dict[str, Any]:
+    """Execute a tool by name without blocking the event loop"""
+    return await tool_runner.run(tool_name, **kwargs)
@@ -0,0 +1,266 @@
+import json
+import math
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Pareto cut-offs for ABC classification (share of total decayed pick volume)
+CLASS_A_SHARE = 0.80
+CLASS_B_SHARE = 0.95
+
+# Landmark shifts are rare; renormalise once the exponent gets this large
+MAX_EXPONENT = 500.0
+
+# Events stamped further than this in the future are rejected (millisecond epochs, broken clocks)
+MAX_CLOCK_SKEW_SECONDS = 300.0
+
+
+PickEvent = Tuple[str, float, float]  # (item_id, quantity, timestamp)
+
+
+class VelocityTracker:
+    """
+    Per-item pick velocity kept as exponentially decayed counters.
+
+    Scores use forward decay: every pick adds ``quantity * 2 ** ((ts - landmark) / half_life)``,
+    so an event is a single dict update and scores of different items stay directly comparable
+    without touching every counter as time passes. Raw pick history is never stored.
+    """
+
+    def __init__(self, half_life_seconds: float = 24 * 3600.0, max_items: int = 200_000,
+                 reclassify_every: int = 50_000, reclassify_interval_seconds: float = 30.0):
+        self.half_life_seconds = half_life_seconds
+        self.max_items = max_items
+        # Thresholds are recomputed (a full sort) every N events or every interval, never per read
+        self.reclassify_every = reclassify_every
+        self.reclassify_interval_seconds = reclassify_interval_seconds
+        self.landmark = time.time()
+        self.scores: Dict[str, float] = {}
+        self.events_ingested = 0
+        self.events_rejected = 0
+        self._events_since_classify = 0
+        self._classified_at = 0.0
+        self._threshold_a = math.inf
+        self._threshold_b = math.inf
+        self._class_counts = {"A": 0, "B": 0, "C": 0}
+        # Ingestion runs off the event loop while API reads rank and classify the same counters
+        self._lock = threading.RLock()
+
+    def ingest(self, events: Iterable[PickEvent]) -> int:
+        """
+        Fold a batch of (item_id, quantity, timestamp) pick events into the counters.
+
+        Events with a negative or non-finite quantity, or a timestamp that is not finite or
+        lies beyond now + ``MAX_CLOCK_SKEW_SECONDS``, are skipped and counted as rejected.
+        """
+        inv_half_life = 1.0 / self.half_life_seconds
+        count = rejected = 0
+
+        with self._lock:
+            scores = self.scores
+            landmark = self.landmark
+            latest = time.time() + MAX_CLOCK_SKEW_SECONDS
+            for item_id, quantity, ts in events:
+                if not (0.0 <= quantity < math.inf and -math.inf < ts <= latest):
+                    rejected += 1
+                    continue
+                exponent = (ts - landmark) * inv_half_life
+                if exponent > MAX_EXPONENT:
+                    self._renormalize(ts)
+                    landmark = self.landmark
+                    exponent = (ts - landmark) * inv_half_life
+                scores[item_id] = scores.get(item_id, 0.0) + quantity * 2.0 ** exponent
+                count += 1
+
+            self.events_ingested += count
+            self.events_rejected += rejected
+            self._events_since_classify += count
+
+            if len(scores) > self.max_items:
+                self._evict()
+            elif self._events_since_classify >= self.reclassify_every:
+                self._reclassify()
+        return count
+
+    def record_pick(self, item_id: str, quantity: float = 1.0, ts: Optional[float] = None) -> None:
+        """Record a single pick event"""
+        self.ingest(((item_id, quantity, time.time() if ts is None else ts),))
+
+    def velocity(self, item_id: str, now: Optional[float] = None) -> float:
+        """Decayed pick count for an item as of ``now``"""
+        score = self.scores.get(item_id)
+        if not score:
+            return 0.0
+        now = time.time() if now is None else now
+        return score * 2.0 ** ((self.landmark - now) / self.half_life_seconds)
+
+    def classify(self, item_id: str) -> Optional[str]:
+        """Return the ABC class of an item, or None if it has no pick history"""
+        score = self.scores.get(item_id)
+        if not score:
+            return None
+        self._maybe_reclassify()
+        # Thresholds are in landmark units, so a fast mover is promoted as soon as it crosses one
+        if score >= self._threshold_a:
+            return "A"
+        if score >= self._threshold_b:
+            return "B"
+        return "C"
+
+    def reclassify(self) -> None:
+        """Recompute the A/B score thresholds from the current counters"""
+        with self._lock:
+            self._reclassify()
+
+    def _maybe_reclassify(self) -> None:
+        """Reclassify if there are new events and the thresholds are unset or older than the interval"""
+        if not self._events_since_classify:
+            return
+        if self._threshold_a == math.inf or time.time() - self._classified_at >= self.reclassify_interval_seconds:
+            with self._lock:
+                if self._events_since_classify:
+                    self._reclassify()
+
+    def _reclassify(self) -> None:
+        self._events_since_classify = 0
+        self._classified_at = time.time()
+        ordered = sorted(self.scores.values(), reverse=True)
+        total = sum(ordered)
+        if not ordered or total <= 0:
+            self._threshold_a = self._threshold_b = math.inf
+            self._class_counts = {"A": 0, "B": 0, "C": 0}
+            return
+
+        threshold_a = threshold_b = None
+        counts = {"A": 0, "B": 0, "C": 0}
+        running = 0.0
+        for score in ordered:
+            if threshold_a is None:
+                counts["A"] += 1
+                running += score
+                if running >= total * CLASS_A_SHARE:
+                    threshold_a = score
+            elif threshold_b is None:
+                counts["B"] += 1
+                running += score
+                if running >= total * CLASS_B_SHARE:
+                    threshold_b = score
+            else:
+                counts["C"] += 1
+
+        self._threshold_a = threshold_a if threshold_a is not None else ordered[-1]
+        self._threshold_b = threshold_b if threshold_b is not None else self._threshold_a
+        self._class_counts = counts
+
+    def summary(self) -> Dict[str, object]:
+        """Counters and class sizes (as of the last classification) for reporting"""
+        self._maybe_reclassify()
+        return {
+            "tracked_items": len(self.scores),
+            "events_ingested": self.events_ingested,
+            "events_rejected": self.events_rejected,
+            "half_life_seconds": self.half_life_seconds,
+            "class_counts": dict(self._class_counts),
+            "classified_at": self._classified_at or None
+        }
+
+    def top_items(self, limit: int = 20) -> List[Dict[str, object]]:
+        """Fastest movers with their current velocity and class"""
+        now = time.time()
+        with self._lock:
+            ranked = sorted(self.scores.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        return [
+            {"item_id": item_id, "velocity": self.velocity(item_id, now), "velocity_class": self.classify(item_id)}
+            for item_id, _ in ranked
+        ]
+
+    def _renormalize(self, ts: float) -> None:
+        """Move the landmark forward so forward-decay exponents stay bounded"""
+        factor = 2.0 ** ((self.landmark - ts) / self.half_life_seconds)
+        for item_id in self.scores:
+            self.scores[item_id] *= factor
+        if self._threshold_a != math.inf:
+            self._threshold_a *= factor
+        if self._threshold_b != math.inf:
+            self._threshold_b *= factor
+        self.landmark = ts
+
+    def _evict(self) -> None:
+        """Drop the slowest movers so memory stays bounded by ``max_items``"""
+        keep = int(self.max_items * 0.9)
+        ordered = sorted(self.scores.items(), key=lambda kv: kv[1], reverse=True)
+        self.scores = dict(ordered[:keep])
+        self.reclassify()
+
+
+def parse_pick_line(line: str) -> Optional[PickEvent]:
+    """
+    Parse one pick event line.
+
+    Accepts JSON objects ({"item_id": ..., "quantity": ..., "ts": ...}) or
+    CSV rows (item_id,quantity,ts). Blank or malformed lines return None, as do
+    lines without an item ID, with a negative or non-finite quantity, or with a
+    timestamp that is not finite or lies beyond now + ``MAX_CLOCK_SKEW_SECONDS``.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        if line[0] == "{":
+            record = json.loads(line)
+            item_id = record["item_id"]
+            quantity = float(record.get("quantity", 1))
+            ts = record.get("ts", record.get("timestamp"))
+        else:
+            parts = line.split(",")
+            item_id = parts[0].strip()
+            quantity = float(parts[1]) if len(parts) > 1 and parts[1].strip() else 1.0
+            ts = parts[2] if len(parts) > 2 and parts[2].strip() else None
+        now = time.time()
+        ts = float(ts) if ts is not None else now
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+    if not isinstance(item_id, str) or not item_id:
+        return None
+    if not (0.0 <= quantity < math.inf and -math.inf < ts <= now + MAX_CLOCK_SKEW_SECONDS):
+        return None
+    return (item_id, quantity, ts)
+
+
+def iter_pick_events(lines: Iterable[str]) -> Iterator[PickEvent]:
+    """Parse a stream of lines into pick events, skipping malformed ones"""
+    for line in lines:
+        event = parse_pick_line(line)
+        if event is not None:
+            yield event
+
+
+def ingest_pick_file(tracker: VelocityTracker, path: str, batch_size: int = 10_000) -> int:
+    """Stream a JSONL/CSV pick file into the tracker without loading it into memory"""
+    total = 0
+    batch: List[PickEvent] = []
+    with open(path, "r", encoding="utf-8") as handle:
+        for event in iter_pick_events(handle):
+            batch.append(event)
+            if len(batch) >= batch_size:
+                total += tracker.ingest(batch)
+                batch = []
+    if batch:
+        total += tracker.ingest(batch)
+    return total
+
+
+def aisle_rank(aisle) -> int:
+    """Order of an aisle label: numeric labels by number, others by a base-36 reading of their letters and digits"""
+    try:
+        return int(aisle)
+    except (TypeError, ValueError):
+        pass
+    key = "".join(char for char in str(aisle) if char.isascii() and char.isalnum())
+    return int(key, 36) if key else 0
+
+
+def slot_travel_cost(slot) -> Tuple[int, int, int]:
+    """Pick-path cost of a slot: front aisles and waist-high levels are cheapest"""
+    return (aisle_rank(slot.aisle), slot.level, slot.position)
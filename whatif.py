@@ -0,0 +1,428 @@
+import itertools
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from models import (CAPACITY_EPSILON, Slot, SlotStatus, WarehouseData, allowed_zones_for_item, is_compatible,
+                    is_type_compatible, warehouse)
+
+
+MAX_OVERLAYS = 1000
+IDLE_TTL_SECONDS = 60 * 60
+# Idle overlays are swept on store access at most this often
+SWEEP_INTERVAL_SECONDS = 60.0
+
+
+class _OverlaySlots(Mapping):
+    """Slots as seen through an overlay: its private copies, else the live slot"""
+
+    def __init__(self, overlay: "WarehouseOverlay"):
+        self._copies = overlay._slots
+        self._live = overlay.warehouse.slots
+
+    def __getitem__(self, slot_id: str) -> Slot:
+        slot = self._copies.get(slot_id)
+        return slot if slot is not None else self._live[slot_id]
+
+    def __contains__(self, slot_id: object) -> bool:
+        return slot_id in self._live
+
+    def __iter__(self):
+        return iter(self._live)
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+
+class _OverlayStatusSet:
+    """One status's slot IDs: the live set corrected for slots the overlay has copied"""
+
+    __slots__ = ("_live", "_copies", "_status")
+
+    def __init__(self, live, copies: Dict[str, Slot], status: SlotStatus):
+        self._live = live
+        self._copies = copies
+        self._status = status
+
+    def __iter__(self):
+        copies = self._copies
+        for slot_id in self._live:
+            if slot_id not in copies:
+                yield slot_id
+        for slot_id, slot in copies.items():
+            if slot.status == self._status:
+                yield slot_id
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, slot_id: object) -> bool:
+        slot = self._copies.get(slot_id)
+        return slot.status == self._status if slot is not None else slot_id in self._live
+
+
+class _OverlayStatusIndex(Mapping):
+    def __init__(self, overlay: "WarehouseOverlay"):
+        self._copies = overlay._slots
+        self._live = overlay.warehouse.slots_by_status
+
+    def __getitem__(self, status: SlotStatus) -> _OverlayStatusSet:
+        return _OverlayStatusSet(self._live[status], self._copies, status)
+
+    def __iter__(self):
+        return iter(SlotStatus)
+
+    def __len__(self) -> int:
+        return len(SlotStatus)
+
+
+class WarehouseOverlay:
+    """
+    Copy-on-write what-if view of the live warehouse.
+
+    A slot is copied (shallowly, with its contents) the first time the overlay changes it;
+    everything else is read through from live state, so memory grows with the changes only.
+    It offers the read API ``SlotQuery`` and ``get_warehouse_status`` use, plus the stock
+    mutators, and can be committed atomically or thrown away.
+    """
+
+    def __init__(self, overlay_id: str, warehouse: WarehouseData, label: Optional[str] = None):
+        self.overlay_id = overlay_id
+        self.warehouse = warehouse
+        self.label = label
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.base_version = warehouse.version
+        self._slots: Dict[str, Slot] = {}                 # copied slots, in the order first changed
+        self._base: Dict[str, Dict[str, int]] = {}        # live contents when copied, checked on commit
+        self._item_slots: Dict[str, Set[str]] = {}        # placements of items the overlay touched
+        self.operations = 0
+
+        # Read-through views so SlotQuery and the status tool can run against the overlay
+        self.items = warehouse.items
+        self.velocity = warehouse.velocity
+        self.slots = _OverlaySlots(self)
+        self.slots_by_status = _OverlayStatusIndex(self)
+        self.slots_by_zone = warehouse.slots_by_zone
+        self.slots_by_aisle = warehouse.slots_by_aisle
+        self.slots_by_level = warehouse.slots_by_level
+        self.slots_by_type = warehouse.slots_by_type
+        self.slot_order = warehouse.slot_order
+
+    # Copy-on-write
+
+    def _writable(self, slot_id: str) -> Slot:
+        slot = self._slots.get(slot_id)
+        if slot is None:
+            live = self.warehouse.slots[slot_id]
+            with self.warehouse.shard_for(slot_id).lock:
+                slot = live.model_copy(update={"contents": dict(live.contents)})
+            self._base[slot_id] = dict(slot.contents)
+            self._slots[slot_id] = slot
+        return slot
+
+    def _placements(self, item_id: str) -> Set[str]:
+        slot_ids = self._item_slots.get(item_id)
+        if slot_ids is None:
+            slot_ids = self._item_slots[item_id] = set(self.warehouse.item_slots.get(item_id, ()))
+        return slot_ids
+
+    # Mutators (same rules and signatures as WarehouseData's)
+
+    def assign_item_to_slot(self, slot_id: str, item_id: str, quantity: int = 1) -> bool:
+        """Move an item to a slot in the overlay, replacing wherever it was stocked before"""
+        if slot_id not in self.slots or item_id not in self.items or self._reserved(slot_id):
+            return False
+        slot = self.slots[slot_id]
+        item = self.items[item_id]
+
+        # Capacity already used by this item in the target slot is freed by the move
+        existing = slot.contents.get(item_id, 0)
+        freed_weight = slot.remaining_weight + item.weight * existing
+        freed_volume = slot.remaining_volume + item.volume * existing
+        probe = slot.model_copy(update={"remaining_weight": freed_weight, "remaining_volume": freed_volume})
+        if not is_compatible(probe, item, quantity):
+            return False
+
+        self.unassign_item(item_id)
+        self._place(self._writable(slot_id), item_id, quantity)
+        return True
+
+    def add_item_to_slot(self, slot_id: str, item_id: str, quantity: int = 1) -> bool:
+        """Add units of an item to a slot in the overlay, keeping its other locations"""
+        if slot_id not in self.slots or item_id not in self.items or self._reserved(slot_id):
+            return False
+        if not is_compatible(self.slots[slot_id], self.items[item_id], quantity):
+            return False
+        self._place(self._writable(slot_id), item_id, quantity)
+        return True
+
+    def remove_item_from_slot(self, slot_id: str, item_id: str, quantity: Optional[int] = None) -> bool:
+        """Take units (all by default) of an item out of a slot in the overlay"""
+        if slot_id not in self.slots or item_id not in self.slots[slot_id].contents:
+            return False
+        slot = self._writable(slot_id)
+        stocked = slot.contents[item_id]
+        self._take(slot, item_id, stocked if quantity is None else min(quantity, stocked))
+        return True
+
+    def unassign_item(self, item_id: str) -> bool:
+        """Remove an item from every slot holding it in the overlay"""
+        slot_ids = self._placements(item_id)
+        if not slot_ids:
+            return False
+        for slot_id in list(slot_ids):
+            slot = self._writable(slot_id)
+            self._take(slot, item_id, slot.contents[item_id])
+        return True
+
+    def _reserved(self, slot_id: str) -> bool:
+        """Held slots cannot take stock: commit would refuse them as conflicts"""
+        return (self.warehouse.slots[slot_id].status == SlotStatus.RESERVED
+                or self.slots[slot_id].status == SlotStatus.RESERVED)
+
+    def _place(self, slot: Slot, item_id: str, quantity: int) -> None:
+        item = self.items[item_id]
+        slot.contents[item_id] = slot.contents.get(item_id, 0) + quantity
+        slot.remaining_weight -= item.weight * quantity
+        slot.remaining_volume -= item.volume * quantity
+        slot.status = SlotStatus.OCCUPIED
+        if slot.assigned_item_id is None:
+            slot.assigned_item_id = item_id
+        self._placements(item_id).add(slot.slot_id)
+        self._touch()
+
+    def _take(self, slot: Slot, item_id: str, quantity: int) -> None:
+        item = self.items[item_id]
+        left = slot.contents[item_id] - quantity
+        if left > 0:
+            slot.contents[item_id] = left
+        else:
+            del slot.contents[item_id]
+            self._placements(item_id).discard(slot.slot_id)
+            if slot.assigned_item_id == item_id:
+                slot.assigned_item_id = next(iter(slot.contents), None)
+        if slot.contents:
+            slot.remaining_weight += item.weight * quantity
+            slot.remaining_volume += item.volume * quantity
+        else:
+            slot.remaining_weight = slot.max_weight
+            slot.remaining_volume = slot.volume
+            slot.status = SlotStatus.EMPTY
+        self._touch()
+
+    def _touch(self) -> None:
+        self.operations += 1
+        self.last_used = time.time()
+
+    # Reads
+
+    def _is_compatible(self, slot: Slot, item, quantity: int = 1) -> bool:
+        return is_compatible(slot, item, quantity)
+
+    def find_suitable_slots_for_item(self, item_id: str, quantity: int = 1) -> List[Slot]:
+        """Live search with the overlay's changed slots re-checked, ranked like the live search"""
+        item = self.items.get(item_id)
+        if item is None:
+            return []
+        copies = self._slots
+        suitable = [slot for slot in self.warehouse.find_suitable_slots_for_item(item_id, quantity)
+                    if slot.slot_id not in copies]
+        allowed_zones = allowed_zones_for_item(item)
+        suitable.extend(slot for slot in copies.values()
+                        if (not allowed_zones or slot.zone in allowed_zones)
+                        and slot.status != SlotStatus.RESERVED and is_compatible(slot, item, quantity))
+        return self.warehouse.rank_by_velocity(item_id, sorted(suitable, key=lambda slot: self.slot_order(slot.slot_id)))
+
+    def status_summary(self) -> Dict[str, Any]:
+        """Live per-zone summary with each copied slot's live figures swapped for the overlay's"""
+        zones = self.warehouse.status_summary()
+        for slot_id, slot in self._slots.items():
+            summary = zones.get(slot.zone)
+            if summary is None:
+                continue
+            _count_slot(summary, self.warehouse.slots[slot_id], -1)
+            _count_slot(summary, slot, 1)
+        for zone, summary in zones.items():
+            first = [self.slots[slot.slot_id] for slot in summary["first_occupied"]]
+            first.extend(slot for slot in self._slots.values() if slot.zone == zone)
+            first = {slot.slot_id: slot for slot in first if slot.status == SlotStatus.OCCUPIED}
+            summary["first_occupied"] = sorted(first.values(), key=lambda slot: self.slot_order(slot.slot_id))[:10]
+        return zones
+
+    def changes(self) -> List[Dict[str, Any]]:
+        """Per slot and item: quantity in live state now versus in the overlay"""
+        changes = []
+        for slot_id, slot in self._slots.items():
+            live = self.warehouse.slots[slot_id].contents
+            for item_id in sorted(set(live) | set(slot.contents)):
+                before, after = live.get(item_id, 0), slot.contents.get(item_id, 0)
+                if before != after:
+                    changes.append({"slot_id": slot_id, "item_id": item_id, "live_quantity": before,
+                                    "overlay_quantity": after})
+        return changes
+
+    def conflicts(self) -> List[str]:
+        """
+        Copied slots whose live stock changed (or that got reserved) since they were copied,
+        or whose overlay stock grows but no longer fits the items' current attributes
+        """
+        conflicts = []
+        for slot_id, base in self._base.items():
+            live = self.warehouse.slots[slot_id]
+            reserved = live.status == SlotStatus.RESERVED and self._slots[slot_id].contents
+            if live.contents != base or reserved or not self._still_fits(self._slots[slot_id], live.contents):
+                conflicts.append(slot_id)
+        return conflicts
+
+    def _still_fits(self, slot: Slot, live_contents: Dict[str, int]) -> bool:
+        """Whether a copied slot's stock fits with live item attributes, if the overlay adds any"""
+        # An item edited since the overlay placed it (weight, dimensions, rules) may no longer fit
+        grown = [item_id for item_id, quantity in slot.contents.items() if quantity > live_contents.get(item_id, 0)]
+        if not grown:
+            return True
+        items = self.items
+        weight = sum(items[item_id].weight * quantity for item_id, quantity in slot.contents.items())
+        volume = sum(items[item_id].volume * quantity for item_id, quantity in slot.contents.items())
+        return (weight <= slot.max_weight + CAPACITY_EPSILON and volume <= slot.volume + CAPACITY_EPSILON
+                and all(is_type_compatible(slot, items[item_id]) for item_id in grown))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "overlay_id": self.overlay_id,
+            "label": self.label,
+            "created_at": self.created_at,
+            "last_used": self.last_used,
+            "base_version": self.base_version,
+            "live_version": self.warehouse.version,
+            "operations": self.operations,
+            "changed_slots": len(self._slots)
+        }
+
+    # Commit
+
+    def commit(self) -> Tuple[bool, List[str], int]:
+        """
+        Apply the overlay's stock to live state under the locks of every zone it touched.
+
+        Refused with the conflicting slots if any copied slot changed live since it was
+        copied or would no longer fit; otherwise every change is applied and journaled before
+        any other writer runs. It walks every changed slot under the zone locks, so call it off
+        the event loop; like ``set_stock`` it does not wait for the journal (callers do).
+        Returns (committed, conflicting slot IDs, records applied).
+        """
+        warehouse = self.warehouse
+        zones = {slot.zone for slot in self._slots.values()}
+        applied = 0
+        with warehouse.locked(zones):
+            conflicts = self.conflicts()
+            if conflicts:
+                return False, conflicts, 0
+            # Removals first, so every slot's capacity only ever shrinks to its final value
+            changes = sorted(self.changes(), key=lambda change: change["overlay_quantity"] > change["live_quantity"])
+            for change in changes:
+                warehouse.set_stock(change["slot_id"], change["item_id"], change["overlay_quantity"])
+                applied += 1
+        return True, [], applied
+
+
+def _count_slot(summary: Dict[str, Any], slot: Slot, sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) one slot's contribution to a shard status summary"""
+    type_stats = summary["by_type"].setdefault(slot.slot_type.value, {"total": 0, "occupied": 0, "reserved": 0})
+    if slot.status == SlotStatus.OCCUPIED:
+        summary["occupied"] += sign
+        type_stats["occupied"] += sign
+        summary["used_weight"] += sign * (slot.max_weight - slot.remaining_weight)
+        summary["used_volume"] += sign * (slot.volume - slot.remaining_volume)
+    elif slot.status == SlotStatus.RESERVED:
+        summary["reserved"] += sign
+        type_stats["reserved"] += sign
+
+
+class OverlayStore:
+    """Open what-if overlays by ID; idle ones expire and the count is capped"""
+
+    def __init__(self, warehouse: WarehouseData):
+        self.warehouse = warehouse
+        self._overlays: Dict[str, WarehouseOverlay] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.committed = 0
+        self.discarded = 0
+        self.expired = 0
+        self._swept_at = time.time()
+
+    def create(self, label: Optional[str] = None) -> WarehouseOverlay:
+        """Open an overlay; raises ValueError when MAX_OVERLAYS are already open"""
+        with self._lock:
+            self._expire(time.time())
+            if len(self._overlays) >= MAX_OVERLAYS:
+                raise ValueError(f"Too many open what-if overlays ({MAX_OVERLAYS}); commit or discard some")
+            overlay = WarehouseOverlay(f"WIF_{next(self._ids):06d}", self.warehouse, label)
+            self._overlays[overlay.overlay_id] = overlay
+        return overlay
+
+    def get(self, overlay_id: str) -> Optional[WarehouseOverlay]:
+        self._sweep()
+        overlay = self._overlays.get(overlay_id)
+        if overlay is not None and overlay.last_used + IDLE_TTL_SECONDS <= time.time():
+            return None
+        return overlay
+
+    def commit(self, overlay_id: str) -> Tuple[bool, List[str], int]:
+        """Commit and close an overlay; a conflicting overlay stays open for inspection"""
+        overlay = self._live(overlay_id)
+        committed, conflicts, applied = overlay.commit()
+        if committed:
+            with self._lock:
+                self._overlays.pop(overlay_id, None)
+                self.committed += 1
+        return committed, conflicts, applied
+
+    def discard(self, overlay_id: str) -> WarehouseOverlay:
+        overlay = self._live(overlay_id)
+        with self._lock:
+            self._overlays.pop(overlay_id, None)
+            self.discarded += 1
+        return overlay
+
+    def recent(self) -> List[WarehouseOverlay]:
+        self._sweep()
+        now = time.time()
+        return [overlay for overlay in list(self._overlays.values()) if overlay.last_used + IDLE_TTL_SECONDS > now]
+
+    def stats(self) -> Dict[str, int]:
+        self._sweep()
+        overlays = list(self._overlays.values())
+        return {
+            "open": len(overlays),
+            "changed_slots": sum(len(overlay._slots) for overlay in overlays),
+            "committed": self.committed,
+            "discarded": self.discarded,
+            "expired": self.expired
+        }
+
+    def _live(self, overlay_id: str) -> WarehouseOverlay:
+        overlay = self.get(overlay_id)
+        if overlay is None:
+            raise ValueError(f"What-if overlay {overlay_id} not found or expired")
+        return overlay
+
+    def _sweep(self) -> None:
+        """Drop idle overlays, at most once per SWEEP_INTERVAL_SECONDS"""
+        now = time.time()
+        if now - self._swept_at >= SWEEP_INTERVAL_SECONDS:
+            with self._lock:
+                self._expire(now)
+
+    def _expire(self, now: float) -> None:
+        self._swept_at = now
+        for overlay_id, overlay in list(self._overlays.items()):
+            if overlay.last_used + IDLE_TTL_SECONDS <= now:
+                del self._overlays[overlay_id]
+                self.expired += 1
+
+
+# Global what-if overlay store
+overlays = OverlayStore(warehouse)